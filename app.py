@@ -1,7 +1,7 @@
 """Aplicação Flask principal do projeto Cosmo-Casa.
 
 Responsabilidades:
-- Registrar blueprints de Professor (admin), Aluno e Missão;
+- Registrar blueprints de Professor (admin), Aluno, Missão e API pública;
 - Expor rotas de índice e seleção de missão (landing e seleção);
 - Manter dados de contexto (naves, módulos, eventos) para páginas e simulação;
 - Fornecer alias de imagens estáticas para compatibilidade com caminhos de front-end.
@@ -31,246 +31,26 @@ import logging
 # Inicializa a aplicação Flask
 app = Flask(__name__)
 # Usa SECRET_KEY do ambiente em produção; mantém fallback para desenvolvimento
-app.secret_key = os.getenv('SECRET_KEY', 'minha_nasa_minha_vida_secret_key_2024')
+# (a mesma chave assina os bilhetes aceitos pelo servidor WebSocket)
+from services.bilhetes import CHAVE_SECRETA
+app.secret_key = CHAVE_SECRETA
 
 from services.db import db_manager  # Gerencia SQLite e operações de persistência
 from routes.professor import professor_bp
 from routes.aluno import aluno_bp
 from routes.missao import missao_bp
+from routes.api import api_bp
 from services.data import NAVES_ESPACIAIS, MODULOS_HABITAT, EVENTOS_ALEATORIOS  # Catálogos estáticos para UI/simulações
+from services.fisica import (  # Física das naves (mantida aqui por compatibilidade de importação)
+    GRAVIDADE_TERRA, CONSTANTE_GRAVITACIONAL, MASA_TERRA, RAIO_TERRA,
+    calcular_delta_v, calcular_distancia_maxima_sem_carga, calcular_carga_maxima_para_destino
+)
 logging.basicConfig(level=logging.INFO)
 
 
 # Removido o uso de json_store: sistema unificado em SQLite
 
 
-# --- DEFINIÇÃO DAS ROTAS ---
-
-# --- CONSTANTES FÍSICAS PARA CÁLCULOS ---
-# Mantidas para cálculos auxiliares de nave/trajetória (educacional)
-GRAVIDADE_TERRA = 9.81  # m/s²
-CONSTANTE_GRAVITACIONAL = 6.67430e-11  # m³/kg/s²
-MASA_TERRA = 5.972e24  # kg
-RAIO_TERRA = 6371000  # m
-
-# --- BANCO DE DADOS DAS NAVES (com parâmetros de propulsão realistas) ---
-NAVES_ESPACIAIS = {
-    'falcon9': {
-        'nome': 'Falcon 9',
-        'operador': 'EUA / SpaceX',
-        'imagem': 'Falcon9.png',
-        'descricao': 'Foguete de dois estágios reutilizável com excelente relação empuxo-peso. Ideal para cargas pesadas em órbita baixa.',
-        'capacidade_carga': 22.8,  # toneladas para LEO
-        'perfil_missao': 'Dois Estágios',
-        # Parâmetros de propulsão adicionados
-        'empuxo_total': 7607,  # kN (1º estágio: 7.607 kN)
-        'impulso_especifico': 282,  # segundos (vacuum)
-        'massa_seca': 28.2,  # toneladas (dry mass)
-        'massa_combustivel': 433.1,  # toneladas (propellant mass)
-        'delta_v_total': 9300,  # m/s (total capability)
-        'taxa_empuxo_peso': 1.8  # T/W ratio
-    },
-    'pslv': {
-        'nome': 'PSLV',
-        'operador': 'Índia / ISRO',
-        'imagem': 'PSLV.jpg',
-        'descricao': 'Foguete confiável com múltiplos estágios e capacidade de inserção em órbitas polares e sincronizadas com o sol.',
-        'capacidade_carga': 3.8,  # toneladas para LEO
-        'perfil_missao': 'Múltiplas Queimas',
-        'empuxo_total': 4800,  # kN
-        'impulso_especifico': 262,  # segundos
-        'massa_seca': 18.5,  # toneladas
-        'massa_combustivel': 230.0,  # toneladas
-        'delta_v_total': 8200,  # m/s
-        'taxa_empuxo_peso': 1.4
-    },
-    'longmarch8a': {
-        'nome': 'Long-March8A',
-        'operador': 'China',
-        'imagem': 'foguete-longa-marcha.png',
-        'descricao': 'Foguete de médio porte com capacidade para múltiplas órbitas e fases de coasting estendidas.',
-        'capacidade_carga': 9.8,  # toneladas para LEO
-        'perfil_missao': 'Coasting Estendido',
-        'empuxo_total': 5800,  # kN
-        'impulso_especifico': 275,  # segundos
-        'massa_seca': 22.1,  # toneladas
-        'massa_combustivel': 320.5,  # toneladas
-        'delta_v_total': 8800,  # m/s
-        'taxa_empuxo_peso': 1.6
-    },
-    'gslv': {
-        'nome': 'GSLV',
-        'operador': 'Índia / ISRO',
-        'imagem': 'LVM3_M3.png',
-        'descricao': 'Foguete com estágio criogênico superior para inserção precisa em órbitas de transferência geossíncronas.',
-        'capacidade_carga': 2.5,  # toneladas para GTO
-        'perfil_missao': 'Estágio Criogênico',
-        'empuxo_total': 4200,  # kN
-        'impulso_especifico': 295,  # segundos (estágio criogênico)
-        'massa_seca': 16.8,  # toneladas
-        'massa_combustivel': 198.7,  # toneladas
-        'delta_v_total': 9500,  # m/s
-        'taxa_empuxo_peso': 1.3
-    }
-}
-
-# --- FUNÇÕES DE CÁLCULO DE PERFORMANCE ---
-def calcular_delta_v(massa_seca, massa_combustivel, impulso_especifico):
-    """
-    Calcula o Delta-V usando a Equação de Foguete de Tsiolkovsky
-    Δv = Isp * g0 * ln(m0/mf)
-    
-    Onde:
-    - Isp: Impulso específico (segundos)
-    - g0: Gravidade padrão na Terra (9.81 m/s²)
-    - m0: Massa inicial (seca + combustível)
-    - mf: Massa final (apenas seca)
-    """
-    massa_inicial = massa_seca + massa_combustivel
-    massa_final = massa_seca
-    
-    if massa_final <= 0:
-        return 0
-    
-    return impulso_especifico * GRAVIDADE_TERRA * math.log(massa_inicial / massa_final)
-
-def calcular_distancia_maxima_sem_carga(nave, destino='leo'):
-    """
-    Calcula a distância máxima que um foguete pode alcançar sem carga útil
-    considerando sua performance máxima (Delta-V total).
-    
-    Para órbitas: 
-    - LEO: ~7800 m/s Delta-V necessário
-    - GTO: ~10700 m/s Delta-V necessário
-    - Lua: ~10800 m/s Delta-V necessário
-    - Marte: ~13600 m/s Delta-V necessário
-    """
-    delta_v_disponivel = nave['delta_v_total']
-    
-    # Delta-V necessário para diferentes destinos (em m/s)
-    requisitos_delta_v = {
-        'leo': 7800,    # Órbita Terrestre Baixa
-        'gto': 10700,   # Órbita de Transferência Geossíncrona
-        'lua': 10800,   # Órbita Lunar/Trajetória Lua
-        'marte': 13600  # Trajetória Marte
-    }
-    
-    delta_v_necessario = requisitos_delta_v.get(destino.lower(), 7800)
-    
-    # Se o foguete tem Delta-V suficiente para o destino
-    if delta_v_disponivel >= delta_v_necessario:
-        # Calcular distância máxima baseada no Delta-V excedente
-        delta_v_excedente = delta_v_disponivel - delta_v_necessario
-        
-        # Converter Delta-V excedente em distância adicional
-        # (aproximação simplificada para órbitas)
-        distancia_base = {
-            'leo': 400,      # km de altitude
-            'gto': 35786,    # km (órbita geoestacionária)
-            'lua': 384400,   # km
-            'marte': 225e6   # km (média)
-        }
-        
-        distancia_adicional = (delta_v_excedente / 1000) * 10000  # Aproximação
-        return distancia_base.get(destino.lower(), 0) + distancia_adicional
-    
-    # Se não tem Delta-V suficiente, calcular fração alcançável
-    fracao_alcancavel = delta_v_disponivel / delta_v_necessario
-    
-    distancias_maximas = {
-        'leo': 400 * fracao_alcancavel,
-        'gto': 35786 * fracao_alcancavel,
-        'lua': 384400 * fracao_alcancavel,
-        'marte': 225e6 * fracao_alcancavel
-    }
-    
-    return distancias_maximas.get(destino.lower(), 0)
-
-def calcular_carga_maxima_para_destino(nave, destino, distancia_destino):
-    """
-    Calcula a carga máxima possível para um destino específico
-    baseado na distância máxima sem carga.
-    
-    Usa a relação: carga_max = capacidade_nominal * (1 - (distancia_destino / distancia_max_sem_carga))
-    """
-    distancia_max_sem_carga = calcular_distancia_maxima_sem_carga(nave, destino)
-    
-    if distancia_max_sem_carga <= 0:
-        return 0
-    
-    # Fator de redução baseado na distância
-    fator_reducao = 1 - (distancia_destino / distancia_max_sem_carga)
-    
-    # Limitar entre 0 e 1
-    fator_reducao = max(0, min(1, fator_reducao))
-    
-    # Capacidade nominal da nave (em kg)
-    capacidade_nominal = nave['capacidade_carga'] * 1000  # Convertendo para kg
-    
-    return capacidade_nominal * fator_reducao
-
-# --- HABITAT MODULES DATABASE (with images and tooltips) ---
-MODULOS_HABITAT = {
-    'suporte_vida': {"nome": "Life Support", "massa": 800, "energia": 15, "agua": 50,
-                     "imagem": "suporte_vida.svg", "obs": "Essential. Connects to Housing, Sanitation, and Food Production."},
-    'habitacional': {"nome": "Private Quarters", "massa": 200, "energia": 1, "agua": 5,
-                     "imagem": "Privado.svg", "obs": "Crew accommodations. Can be integrated with Leisure."},
-    'alimentacao': {"nome": "Food and Meals", "massa": 300, "energia": 3, "agua": 20,
-                    "imagem": "Cultura.svg", "obs": "Area for food preparation and consumption."},
-    'medico': {"nome": "Medical Module", "massa": 250, "energia": 2, "agua": 5,
-               "imagem": "Medicina.svg", "obs": "For medical emergencies and crew health monitoring."},
-    'exercicios': {"nome": "Exercise", "massa": 400, "energia": 5, "agua": 2,
-                   "imagem": "Exercicio.svg", "obs": "Equipment to mitigate muscle and bone loss."},
-    'pesquisa': {"nome": "Work and Research", "massa": 350, "energia": 4, "agua": 2,
-                 "imagem": "Pesquisa.svg", "obs": "Laboratory for conducting scientific experiments."},
-    'armazenamento': {"nome": "Storage", "massa": 150, "energia": 0.5, "agua": 0,
-                      "imagem": "Armazenagem.svg", "obs": "Stock of supplies, tools, and samples."},
-    'sanitario': {"nome": "Sanitation and Hygiene", "massa": 250, "energia": 2, "agua": 30,
-                  "imagem": "Sanitário.svg", "obs": "Bathroom, shower, and water recycling systems."},
-    'inflavel': {"nome": "Expandable Inflatable", "massa": 500, "energia": 2, "agua": 5,
-                 "imagem": "Inflavel.svg", "obs": "Large-volume module when inflated, highly versatile."},
-    'airlock': {"nome": "Airlock", "massa": 300, "energia": 2, "agua": 2,
-                "imagem": "AirLock.svg", "obs": "Depressurization chamber for extravehicular activities (EVAs)."},
-    'hidroponia': {"nome": "Food Production (Hydroponics)", "massa": 500, "energia": 8, "agua": 40,
-                   "imagem": "Hidroponia.svg", "obs": "Growing plants in a controlled environment to supplement the diet."},
-    'impressao3d': {"nome": "3D Printing/Manufacturing", "massa": 300, "energia": 5, "agua": 2,
-                    "imagem": "Impressora.svg", "obs": "Manufacturing spare parts and tools on demand."}
-}
-
-# --- RANDOM EVENTS DATABASE ---
-EVENTOS_ALEATORIOS = [
-    {
-        "nome": "Solar Storm",
-        "descricao": "A radiation wave hits the spacecraft. Modules with low shielding may suffer damage.",
-        "efeito": "risco_avaria_modulo"
-    },
-    {
-        "nome": "Minor Mechanical Failure",
-        "descricao": "A subsystem experiences a minor failure, consuming extra resources for repair and causing a slight delay.",
-        "efeito": "atraso_e_consumo_extra"
-    },
-    {
-        "nome": "Micrometeoroid Impact",
-        "descricao": "Small space debris collides with the hull. The spacecraft's shielding is tested.",
-        "efeito": "risco_perda_carga"
-    },
-    {
-        "nome": "Power Surge",
-        "descricao": "A fluctuation in the power systems forces resource diversion for stabilization.",
-        "efeito": "consumo_extra"
-    },
-    {
-        "nome": "All Calm",
-        "descricao": "The journey proceeds without incidents. The crew uses the calm to check systems.",
-        "efeito": "nenhum"
-    },
-    {
-        "nome": "Optimized Navigation",
-        "descricao": "The flight team finds a more efficient trajectory, saving propellant and slightly advancing arrival.",
-        "efeito": "bonus_economia"
-    }
-]
-
 # --- DEFINIÇÃO DAS ROTAS ---
 
 # Rota para a página inicial ('/') com endpoint 'index' para compatibilidade
@@ -324,6 +104,7 @@ def tela_selecao():
 app.register_blueprint(professor_bp, url_prefix='/professor')
 app.register_blueprint(aluno_bp)
 app.register_blueprint(missao_bp)
+app.register_blueprint(api_bp, url_prefix='/api')
 
 # Proteção global redundante para rotas da missão
 # Garante bloqueio mesmo que alguma configuração de blueprint/before_request não seja aplicada.
@@ -344,6 +125,15 @@ def _global_guard_missao():
         # Em qualquer falha, não bloquear demais rotas
         return None
 
+# Servido por asgi.py, o WebSocket atende na mesma origem (caminho /ws) e o ws.js
+# não usa a porta separada do websocket_server.py
+app.config.setdefault('WS_MESMA_ORIGEM', False)
+
+
+@app.context_processor
+def _configuracao_tempo_real():
+    return {'ws_mesma_origem': app.config['WS_MESMA_ORIGEM']}
+
 # Alias estático: atender /static/images/* usando arquivos de static/imagens/*
 IMAGENS_ALIAS_MAP = {
     # módulos principais
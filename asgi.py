@@ -0,0 +1,160 @@
+"""Ponto de entrada ASGI opcional: Flask e tempo real num só processo e numa só porta.
+
+Normalmente o Cosmo-Casa roda dois servidores: o Flask (`wsgi.py`/`app.py`) e
+o WebSocket (`websocket_server.py`, porta `WS_PORT`). Aqui os dois atendem no
+mesmo laço de eventos:
+
+- HTTP vai ao Flask pela ponte WSGI→ASGI (`a2wsgi`; na falta dela,
+  `asgiref`), que roda as views numa pool de threads;
+- WebSocket em `/ws` vai a `websocket_server.handler`, com o mesmo protocolo,
+  e `GET /metricas` responde como no servidor separado;
+- as páginas apontam o `ws.js` para a própria origem (`WS_MESMA_ORIGEM`), sem
+  a segunda porta;
+- caches da simulação e do ranking e os canais ficam no processo, e um evento
+  gravado pelo Flask acorda na hora o leitor do log
+  (`DatabaseManager.observadores_eventos`) em vez de esperar a sondagem.
+
+Requer `pip install a2wsgi uvicorn` (fora do requirements.txt). Rode
+`python asgi.py` (`HOST`, `PORT`) ou `uvicorn asgi:application`, sempre com um
+único worker: os canais vivem neste processo. Para vários núcleos, use os dois
+servidores e `WS_WORKERS`.
+"""
+
+import asyncio
+import json
+import os
+
+try:
+    from a2wsgi import WSGIMiddleware as PonteWSGI
+except ImportError:
+    try:
+        from asgiref.wsgi import WsgiToAsgi as PonteWSGI
+    except ImportError:
+        PonteWSGI = None
+
+import websocket_server
+from app import app
+from services.db import db_manager
+
+
+CAMINHO_WS = '/ws'
+# Eventos do Flask deste processo acordam o leitor; a sondagem só pega os de outros processos
+INTERVALO_SONDAGEM = float(os.getenv('ASGI_INTERVALO_EVENTOS', '1'))
+
+
+class ConexaoASGI:
+    """Conexão WebSocket ASGI com a parte da interface de `websockets` usada pelo handler."""
+
+    def __init__(self, scope, receive, send):
+        self.remote_address = tuple(scope['client']) if scope.get('client') else None
+        self._receive = receive
+        self._send = send
+        self.fechada = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.fechada:
+            mensagem = await self._receive()
+            if mensagem['type'] == 'websocket.receive':
+                texto = mensagem.get('text')
+                return texto if texto is not None else mensagem.get('bytes')
+            if mensagem['type'] == 'websocket.disconnect':
+                self.fechada = True
+        raise StopAsyncIteration
+
+    async def send(self, mensagem):
+        if self.fechada:
+            raise ConnectionError('WebSocket fechado')
+        campo = 'bytes' if isinstance(mensagem, bytes) else 'text'
+        await self._send({'type': 'websocket.send', campo: mensagem})
+
+    async def close(self, code=1000, reason=''):
+        if not self.fechada:
+            self.fechada = True
+            await self._send({'type': 'websocket.close', 'code': code, 'reason': reason})
+
+
+def criar_aplicacao(flask_app, db):
+    """Aplicação ASGI que serve `flask_app` por HTTP e o tempo real em `/ws`, lendo eventos de `db`."""
+    if PonteWSGI is None:
+        raise RuntimeError('asgi.py requer uma ponte WSGI→ASGI: pip install a2wsgi uvicorn')
+    flask_app.config['WS_MESMA_ORIGEM'] = True
+    ponte = PonteWSGI(flask_app)
+    estado = {'leitor': None, 'observador': None}
+
+    def iniciar():
+        # Também na primeira requisição, para servidores sem o protocolo lifespan
+        if estado['leitor'] is not None:
+            return
+        laco = asyncio.get_running_loop()
+        aviso = asyncio.Event()
+        estado['observador'] = lambda: laco.call_soon_threadsafe(aviso.set)
+        db.observadores_eventos.append(estado['observador'])
+        estado['leitor'] = asyncio.create_task(
+            websocket_server.acompanhar_eventos(db, INTERVALO_SONDAGEM, aviso)
+        )
+
+    async def encerrar():
+        if estado['leitor'] is None:
+            return
+        db.observadores_eventos.remove(estado['observador'])
+        estado['leitor'].cancel()
+        await asyncio.gather(estado['leitor'], return_exceptions=True)
+        estado['leitor'] = None
+
+    async def ciclo_de_vida(receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                iniciar()
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await encerrar()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def conexao_websocket(scope, receive, send):
+        if (await receive())['type'] != 'websocket.connect':
+            return
+        if scope['path'] != CAMINHO_WS:
+            # Fechar antes de aceitar: o servidor responde 403 ao handshake
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+        await send({'type': 'websocket.accept'})
+        await websocket_server.handler(ConexaoASGI(scope, receive, send))
+
+    async def responder_metricas(send):
+        corpo = (json.dumps(websocket_server.dados_metricas()) + '\n').encode()
+        await send({
+            'type': 'http.response.start', 'status': 200,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(corpo)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': corpo})
+
+    async def aplicacao(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await ciclo_de_vida(receive, send)
+            return
+        iniciar()
+        if scope['type'] == 'websocket':
+            await conexao_websocket(scope, receive, send)
+        elif scope['path'] == '/metricas' and scope['method'] == 'GET':
+            await responder_metricas(send)
+        else:
+            await ponte(scope, receive, send)
+
+    return aplicacao
+
+
+# Exporta a aplicação ASGI como "application" (como o wsgi.py)
+application = criar_aplicacao(app, db_manager)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit('asgi.py requer um servidor ASGI: pip install a2wsgi uvicorn')
+    uvicorn.run(application, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', '5000')))
@@ -11,9 +11,11 @@ Mantém a mesma API pública, separando responsabilidades de app.py.
 
 import sqlite3
 import logging
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, current_app
 
 from services.db import db_manager
+from services.bilhetes import emitir_acesso
+from services.canais import canal_sala
 from functools import wraps
 
 
@@ -152,8 +154,8 @@ def aluno_login(codigo_sala):
                         # Limpar qualquer estado anterior de viagem para garantir ida à seleção
                         try:
                             for k in [
-                                'missao_etapa','viagem_diario','viagem_destino','viagem_nave_id','viagem_nave',
-                                'viagem_modulos','viagem_chegada_ok','viagem_pontuacao','missao_score','chegada_ok',
+                                'missao_etapa','viagem_diario','viagem_destino','viagem_nave_id',
+                                'viagem_modulos','viagem_chegada_ok','viagem_pontuacao','viagem_id','viagem_semente','viagem_regras','viagem_perfil','viagem_turnos','missao_score','chegada_ok',
                                 'missao_feedback','erro_modulos'
                             ]:
                                 session.pop(k, None)
@@ -279,7 +281,8 @@ def aluno_entrar():
 def modulo_underscore_espaco(codigo_sala):
     """Página pós-login (Módulo_Underscore_Espaço).
 
-    Exibe dados essenciais da sala e oferece retorno à página inicial.
+    Exibe dados essenciais da sala, a atividade da turma ao vivo (canal da
+    sala no servidor WebSocket) e oferece retorno à página inicial.
     """
     sala = db_manager.buscar_sala_por_codigo(codigo_sala)
     if not sala:
@@ -291,7 +294,10 @@ def modulo_underscore_espaco(codigo_sala):
         return redirect(url_for('aluno.aluno_entrar'))
     
     nome_aluno = session.get('nome_aluno')
-    return render_template('Modulo_Underscore_Espaco.html', sala=sala, nome_aluno=nome_aluno)
+    return render_template(
+        'Modulo_Underscore_Espaco.html', sala=sala, nome_aluno=nome_aluno,
+        bilhete_canais=emitir_acesso([canal_sala(sala['id'])], segredo=current_app.secret_key)
+    )
 
 
 @aluno_bp.route('/api/registrar-resposta', methods=['POST'])
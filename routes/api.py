@@ -0,0 +1,169 @@
+"""Blueprint de API pública: dados calculados na inicialização, servidos em JSON.
+
+Responsabilidades:
+- Matriz nave × destino (margem de delta-v, fração alcançável, carga máxima),
+  pré-calculada em `services.fisica` e servida sem recomputação;
+- Desempenho por estágios das naves (`services.estagios`): delta-v, perdas
+  por gravidade e curva carga útil × delta-v, usado na montagem do transporte;
+- Janelas de lançamento (`services.janelas`): grades porkchop de C3 e delta-v
+  por datas de partida e chegada, em JSON ou SVG, recortadas da grade padrão
+  do destino (guardada em cache binário); intervalos fora dela exigem o
+  solver e ficam restritos a professores;
+- Respostas com ETag derivado do conteúdo, permitindo revalidação barata
+  (304) pelo navegador e por caches intermediários.
+
+Os dados vêm apenas dos catálogos estáticos, então não exigem sessão (exceto
+as janelas de lançamento fora da grade padrão).
+"""
+
+import json
+import logging
+from datetime import date
+
+from flask import Blueprint, Response, request, jsonify, session
+
+from services.fisica import MATRIZ_JSON, VERSAO_MATRIZ, DESTINOS, MATRIZ_VIABILIDADE
+from services.estagios import desempenho_frota
+from services.janelas import (
+    JANELAS_PADRAO, MAXIMO_CELULAS, grade_janelas, grafico_porkchop, chave_grade, dentro_das_efemerides,
+    recorte_da_padrao, VERSAO_EFEMERIDES
+)
+
+
+api_bp = Blueprint('api', __name__)
+
+
+def _json_em_cache(corpo, versao, mimetype='application/json'):
+    """Resposta pré-serializada (JSON por padrão) com ETag e cache público."""
+    resposta = Response(corpo, mimetype=mimetype)
+    resposta.set_etag(versao)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = 3600
+    return resposta.make_conditional(request)
+
+
+# Respostas por destino também ficam serializadas desde a inicialização
+_MATRIZ_POR_DESTINO = {
+    destino: json.dumps(
+        {'destino': destino, 'naves': {n: linha[destino] for n, linha in MATRIZ_VIABILIDADE.items()}},
+        ensure_ascii=False, sort_keys=True
+    )
+    for destino in DESTINOS
+}
+
+
+@api_bp.route('/viabilidade', methods=['GET'], endpoint='viabilidade')
+def viabilidade():
+    """Matriz completa nave × destino."""
+    return _json_em_cache(MATRIZ_JSON, VERSAO_MATRIZ)
+
+
+@api_bp.route('/viabilidade/<string:destino>', methods=['GET'], endpoint='viabilidade_destino')
+def viabilidade_destino(destino):
+    """Coluna da matriz para um destino."""
+    try:
+        corpo = _MATRIZ_POR_DESTINO.get((destino or '').lower())
+        if corpo is None:
+            return jsonify({'erro': 'Unknown destination'}), 404
+        return _json_em_cache(corpo, f"{VERSAO_MATRIZ}-{destino.lower()}")
+    except Exception:
+        logging.exception('Falha ao servir a matriz de viabilidade')
+        return jsonify({'erro': 'Internal error'}), 500
+
+
+@api_bp.route('/veiculos', methods=['GET'], endpoint='veiculos')
+def veiculos():
+    """Desempenho por estágios de todas as naves (calculado uma vez por versão do catálogo)."""
+    try:
+        versao, _, corpo = desempenho_frota()
+        return _json_em_cache(corpo, versao)
+    except Exception:
+        logging.exception('Falha ao calcular o desempenho das naves')
+        return jsonify({'erro': 'Internal error'}), 500
+
+
+@api_bp.route('/veiculos/<string:nave_id>', methods=['GET'], endpoint='veiculo')
+def veiculo(nave_id):
+    """Desempenho por estágios de uma nave."""
+    versao, resultados, _ = desempenho_frota()
+    dados = resultados.get(nave_id)
+    if dados is None:
+        return jsonify({'erro': 'Spacecraft not found'}), 404
+    corpo = json.dumps({'versao': versao, 'nave_id': nave_id, **dados}, ensure_ascii=False, sort_keys=True)
+    return _json_em_cache(corpo, f"{versao}-{nave_id}")
+
+
+def _intervalo_janelas(destino):
+    """Intervalo da grade a partir da query string (padrões do destino).
+
+    ValueError se inválido; PermissionError se exige o solver (fora da grade
+    padrão) e a sessão não é de professor.
+    """
+    partida, dias_partida, chegada, dias_chegada, passo = JANELAS_PADRAO[destino]
+    args = request.args
+    partida = date.fromisoformat(args.get('partida', partida.isoformat()))
+    chegada = date.fromisoformat(args.get('chegada', chegada.isoformat()))
+    dias_partida = int(args.get('dias_partida', dias_partida))
+    dias_chegada = int(args.get('dias_chegada', dias_chegada))
+    passo = int(args.get('passo', passo))
+    if not (1 <= passo <= 30 and 0 <= dias_partida <= 3650 and 0 <= dias_chegada <= 3650):
+        raise ValueError('range')
+    # Dias além do último múltiplo do passo não mudam a grade: mesma chave de cache
+    dias_partida -= dias_partida % passo
+    dias_chegada -= dias_chegada % passo
+    if (dias_partida // passo + 1) * (dias_chegada // passo + 1) > MAXIMO_CELULAS:
+        raise ValueError('grid too large')
+    if not dentro_das_efemerides(partida, dias_partida, chegada, dias_chegada):
+        raise ValueError('outside ephemeris range')
+    intervalo = destino, partida, dias_partida, chegada, dias_chegada, passo
+    # Cada grade nova custa o solver (segundos de CPU): na API pública, só recortes da padrão
+    if not recorte_da_padrao(*intervalo) and not (
+        session.get('user_role') in {'professor', 'admin'} or session.get('professor_id')
+    ):
+        raise PermissionError('custom range')
+    return intervalo
+
+
+@api_bp.route('/janelas/<string:destino>', methods=['GET'], endpoint='janelas')
+def janelas(destino):
+    """Grade porkchop (C3, delta-v e melhor janela) para o intervalo pedido."""
+    destino = (destino or '').lower()
+    if destino not in JANELAS_PADRAO:
+        return jsonify({'erro': 'No launch-window model for this destination'}), 404
+    try:
+        intervalo = _intervalo_janelas(destino)
+    except ValueError:
+        return jsonify({'erro': 'Invalid date range'}), 400
+    except PermissionError:
+        return jsonify({'erro': 'Custom date ranges are available to teachers only'}), 403
+    try:
+        versao = f"{VERSAO_EFEMERIDES}-{chave_grade(*intervalo)}"
+        if request.if_none_match.contains(versao):
+            return _json_em_cache('', versao)
+        corpo = json.dumps(grade_janelas(*intervalo), ensure_ascii=False)
+        return _json_em_cache(corpo, versao)
+    except Exception:
+        logging.exception('Falha ao calcular janelas de lançamento')
+        return jsonify({'erro': 'Internal error'}), 500
+
+
+@api_bp.route('/janelas/<string:destino>/grafico.svg', methods=['GET'], endpoint='janelas_grafico')
+def janelas_grafico(destino):
+    """Imagem SVG do porkchop de delta-v para o intervalo pedido."""
+    destino = (destino or '').lower()
+    if destino not in JANELAS_PADRAO:
+        return jsonify({'erro': 'No launch-window model for this destination'}), 404
+    try:
+        intervalo = _intervalo_janelas(destino)
+    except ValueError:
+        return jsonify({'erro': 'Invalid date range'}), 400
+    except PermissionError:
+        return jsonify({'erro': 'Custom date ranges are available to teachers only'}), 403
+    try:
+        versao = f"{VERSAO_EFEMERIDES}-{chave_grade(*intervalo)}-svg"
+        if request.if_none_match.contains(versao):
+            return _json_em_cache('', versao, mimetype='image/svg+xml')
+        return _json_em_cache(grafico_porkchop(*intervalo), versao, mimetype='image/svg+xml')
+    except Exception:
+        logging.exception('Falha ao desenhar janelas de lançamento')
+        return jsonify({'erro': 'Internal error'}), 500
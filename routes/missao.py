@@ -3,7 +3,13 @@
 Responsabilidades:
 - Seleção de nave e destino para criar contexto da missão;
 - Escolha e montagem dos módulos do habitat com conteúdo educativo;
-- Simulação em turnos de eventos aleatórios com impacto nos recursos;
+- Feedback instantâneo (JSON) do carregamento enquanto os módulos são escolhidos;
+- Simulação em turnos de eventos aleatórios com impacto nos recursos, incluindo
+  o modo resistência (milhares de turnos transmitidos em NDJSON);
+- Contribuição de cada módulo (valor de Shapley) exibida no resultado da viagem;
+- Trajetória orbital da transferência, com a posição real de cada turno;
+- Bilhete assinado para acompanhar a viagem ao vivo pelo servidor WebSocket;
+- Ranking da rodada atualizado ao vivo por deltas (canal `ranking`);
 - Exposição de assets estáticos associados (imagens, dados educativos).
 
 Design pedagógico:
@@ -11,16 +17,33 @@ Design pedagógico:
 - Eventos aleatórios ilustram trade-offs de engenharia e sustentabilidade.
 """
 
-import random
 import json
 import logging
 import os
 import sqlite3
-from flask import Blueprint, render_template, request, redirect, url_for, session, send_from_directory, current_app
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, session, send_from_directory, current_app, jsonify,
+    Response, stream_with_context
+)
 from .aluno import verificar_autenticacao_aluno
 
 from services.db import db_manager
-from services.data import NAVES_ESPACIAIS, MODULOS_HABITAT, EVENTOS_ALEATORIOS
+from services.data import NAVES_ESPACIAIS, MODULOS_HABITAT
+from services.regras import REGRAS, regras_para, mascara_de, ids_de, MASSA, capacidade_kg as capacidade_kg_nave
+from services.fisica import viabilidade
+from services.feedback import feedback_carregamento
+from services.contribuicoes import contribuicoes
+from services.eventos import sorteador_da_sala, sorteador_por_id
+from services.estado_viagem import EstadoModulos
+from services.recursos import grafico_recursos
+from services.trajetoria import grafico_trajetoria, posicao_turno
+from services.bilhetes import emitir_bilhete, emitir_acesso
+from services.ritmos import ROTULOS_RITMO
+from services.canais import CANAL_RANKING, canal_sala
+from services.simulacao import (
+    reproduzir_viagem, nova_semente, perfil_compacto, pagina_da_viagem, turnos_da_viagem, transmitir_ndjson,
+    TAMANHO_PAGINA_DIARIO, TURNOS_RESISTENCIA
+)
 
 
 missao_bp = Blueprint('missao', __name__)
@@ -97,7 +120,17 @@ def montagem_transporte(destino):
             session['missao_etapa'] = 'montagem'
         except Exception:
             pass
-        return render_template('montagem_transporte.html', naves=NAVES_ESPACIAIS, destino=destino, codigo_sala=request.args.get('codigo_sala'))
+        # Linha pré-calculada da matriz nave × destino e se a carga cabe os essenciais
+        regras = regras_para(destino_norm)
+        massa_essenciais = MASSA(regras.mascara_essenciais)
+        desempenho = {}
+        for nave_id in NAVES_ESPACIAIS:
+            linha = viabilidade(nave_id, destino_norm)
+            desempenho[nave_id] = dict(linha, leva_essenciais=regras.massa_ok(massa_essenciais, linha['carga_maxima_kg']))
+        return render_template(
+            'montagem_transporte.html', naves=NAVES_ESPACIAIS, destino=destino, desempenho=desempenho,
+            massa_essenciais=massa_essenciais, codigo_sala=request.args.get('codigo_sala')
+        )
     except Exception:
         logging.exception("Falha ao renderizar montagem_transporte")
         return "Erro ao preparar montagem de transporte", 500
@@ -129,12 +162,52 @@ def selecao_modulos(destino, nave_id):
             session['missao_nave'] = nave_key
         except Exception:
             pass
-        return render_template('selecao_modulos.html', destino=destino, nave=nave_selecionada, nave_id=nave_key, modulos=MODULOS_HABITAT, codigo_sala=request.args.get('codigo_sala'))
+        return render_template(
+            'selecao_modulos.html', destino=destino, nave=nave_selecionada, nave_id=nave_key, modulos=MODULOS_HABITAT,
+            capacidade_kg=capacidade_kg_nave(nave_selecionada, destino_norm), codigo_sala=request.args.get('codigo_sala'),
+            turnos_resistencia=TURNOS_RESISTENCIA.get(destino_norm)
+        )
     except Exception:
         logging.exception("Falha ao renderizar selecao_modulos")
         return "Error preparing module selection", 500
 
 
+def _sala_da_sessao():
+    """Sala do aluno logado (None se ausente ou em caso de erro)."""
+    try:
+        sala_id = session.get('sala_id')
+        return db_manager.buscar_sala_por_id(sala_id) if sala_id else None
+    except Exception:
+        logging.exception('Falha ao buscar sala da sessão')
+        return None
+
+
+def _sorteador_da_sessao():
+    """Sorteador de eventos da sala do aluno, em cache por id (sem ler a sala a cada chamada)."""
+    try:
+        sala_id = session.get('sala_id')
+        return sorteador_por_id(sala_id, db_manager.buscar_sala_por_id) if sala_id else sorteador_da_sala(None)
+    except Exception:
+        logging.exception('Falha ao buscar o perfil de eventos da sala da sessão')
+        return sorteador_da_sala(None)
+
+
+@missao_bp.route('/api/feedback-carga/<string:destino>/<string:nave_id>')
+def feedback_carga(destino, nave_id):
+    """Feedback do carregamento atual (`?modulos=a,b,c`) para a tela de seleção.
+
+    Leve o suficiente para ser chamado a cada clique: não simula a viagem e só
+    lê a sala do banco na primeira chamada (perfil de eventos em cache por id).
+    Módulos repetidos contam uma vez, como na pontuação.
+    """
+    ids = [m for m in (request.args.get('modulos') or '').split(',') if m]
+    fracao = _sorteador_da_sessao().fracao('risco_avaria_modulo')
+    feedback = feedback_carregamento((destino or '').lower(), nave_id, mascara_de(ids), fracao)
+    if feedback is None:
+        return jsonify({'erro': 'Spacecraft not found'}), 404
+    return jsonify(feedback)
+
+
 @missao_bp.route('/viagem/<string:destino>/<string:nave_id>', methods=['POST'])
 def viagem(destino, nave_id):
     """
@@ -153,129 +226,35 @@ def viagem(destino, nave_id):
         nave = NAVES_ESPACIAIS.get(nave_key)
 
         modulos_selecionados_ids = request.form.getlist('modulos_selecionados')
-        if not modulos_selecionados_ids:
-            session['erro_modulos'] = 'Select at least one module before launching the mission.'
+        # mascara_de ignora ids desconhecidos (tolerável no feedback); aqui um id
+        # adulterado mudaria o carregamento em silêncio, então é recusado
+        desconhecidos = set(modulos_selecionados_ids) - set(ids_de(mascara_de(modulos_selecionados_ids)))
+        if not modulos_selecionados_ids or desconhecidos:
+            session['erro_modulos'] = (
+                f"Unknown modules: {', '.join(sorted(desconhecidos))}." if desconhecidos
+                else 'Select at least one module before launching the mission.'
+            )
             codigo_sala = request.args.get('codigo_sala') or request.form.get('codigo_sala')
             if codigo_sala:
                 return redirect(url_for('missao.selecao_modulos', destino=destino, nave_id=nave_key, codigo_sala=codigo_sala))
             return redirect(url_for('missao.selecao_modulos', destino=destino, nave_id=nave_key))
 
-        modulos_a_bordo = {id: MODULOS_HABITAT[id] for id in modulos_selecionados_ids}
-
-        if destino == 'marte':
-            total_turnos = 60
-        elif destino == 'exoplaneta':
-            total_turnos = 250
-        else:
-            total_turnos = 15
-
+        regras = regras_para(destino)
         session['modulos_selecionados'] = modulos_selecionados_ids
 
-        # --- Parte 2: Geração do Diário de Bordo ---
-        ids_set = set(modulos_selecionados_ids)
-        ids_list = list(ids_set)
-        diario_de_bordo = []
-
-        def evento_personalizado(turno:int):
-            if random.random() < (0.3 if destino != 'exoplaneta' else 0.4):
-                base = random.choice([e for e in EVENTOS_ALEATORIOS if e.get('nome') != 'All Calm'])
-                evt = dict(base)
-                icones_eventos = {
-                    'Solar Storm': 'solar-storm.svg', 'Minor Mechanical Failure': 'wrench.svg',
-                    'Micrometeoroid Impact': 'meteor.svg', 'Power Surge': 'surge.svg',
-                    'Optimized Navigation': 'navigation.svg'
-                }
-                evt['icone'] = icones_eventos.get(base['nome'], 'event-default.svg')
-                if base['nome'] == 'Solar Storm':
-                    evt['descricao'] += ' Life support systems maintain stable levels for the crew.' if 'suporte_vida' in ids_set else ' The absence of Life Support worsens the crew response.'
-                elif base['nome'] == 'Minor Mechanical Failure' and 'impressao3d' in ids_set:
-                    evt['descricao'] += ' 3D Printing manufactures a spare part and reduces delay.'
-                elif base['nome'] == 'Micrometeoroid Impact' and 'armazenamento' in ids_set:
-                    evt['descricao'] += ' Cargo is well stowed; damage is minimal.'
-                elif base['nome'] == 'Power Surge' and 'controle' in ids_set:
-                    evt['descricao'] += ' The Control module quickly stabilizes systems.'
-                elif base['nome'] == 'Optimized Navigation' and 'exercicios' in ids_set:
-                    evt['descricao'] += ' A physically fit crew maintains procedures with precision.'
-                return evt
-            if ids_list:
-                mod_id = ids_list[(turno - 1) % len(ids_list)]
-                mod = MODULOS_HABITAT.get(mod_id, {"nome": mod_id})
-                nome_evt = f"Module Operation: {mod.get('nome')}"
-                dicas = {
-                    'hidroponia': 'Food production stabilizes morale and reduces stock consumption.', 'medico': 'Medical care addresses mild crew indisposition.',
-                    'airlock': 'EVA performed for external inspection; safe return to habitat.', 'impressao3d': 'Part manufactured for quick subsystem repair.',
-                    'sanitario': 'Water recycling system maintains adequate levels.', 'armazenamento': 'Supply reorganization optimizes access and safety.',
-                    'exercicios': 'Exercise routine mitigates microgravity fatigue.', 'inflavel': 'Expandable module increases useful volume for operations.',
-                    'pesquisa': 'Scientific experiment yields important mission data.', 'alimentacao': 'Balanced meal improves team cohesion.',
-                    'habitacional': 'Adequate rest improves team performance.', 'suporte_vida': 'Oxygen and pressure levels remain stable.'
-                }
-                icones_modulos = {
-                    'hidroponia': 'plant.svg', 'medico': 'medical.svg', 'airlock': 'airlock.svg',
-                    'impressao3d': 'printer3d.svg', 'sanitario': 'water-recycle.svg', 'armazenamento': 'storage.svg',
-                    'exercicios': 'dumbbell.svg', 'inflavel': 'expand.svg', 'pesquisa': 'flask.svg',
-                    'alimentacao': 'food.svg', 'habitacional': 'habitat.svg', 'suporte_vida': 'life-support.svg'
-                }
-                desc = dicas.get(mod_id, 'The module contributes positively to the mission progress.')
-                return {"nome": nome_evt, "descricao": desc, "efeito": "nenhum", "icone": icones_modulos.get(mod_id, 'module-default.svg')}
-            return {"nome": "Stable Routine", "descricao": "The crew follows standard procedures while systems operate normally.", "efeito": "nenhum", "icone": "calm.svg"}
-
-        for turno_atual in range(1, total_turnos + 1):
-            evento = evento_personalizado(turno_atual)
-            diario_de_bordo.append({"turno": turno_atual, "evento": evento})
-            if evento.get('efeito') == 'risco_avaria_modulo' and modulos_a_bordo:
-                modulo_avariado_id = random.choice(list(modulos_a_bordo.keys()))
-                modulos_a_bordo[modulo_avariado_id]['status'] = 'Avariado'
-
-        # --- Parte 3: Definição da Função de Cálculo e Execução ---
-        
-        def calcular_resultado_e_pontos(destino_val, nave_val, modulos_dict, diario):
-            dificuldade_base = {'lua': 50, 'marte': 120, 'exoplaneta': 300}.get(destino_val, 50)
-            essenciais_por_destino = {
-                'lua': {'suporte_vida', 'habitacional'},
-                'marte': {'suporte_vida', 'habitacional', 'medico'},
-                'exoplaneta': {'suporte_vida', 'habitacional', 'blindagem', 'controle', 'hidroponia'}
-            }
-            essenciais = essenciais_por_destino.get(destino_val, {'suporte_vida', 'habitacional'})
-            presentes = set(modulos_dict.keys())
-            faltantes = essenciais - presentes
-            pontos = dificuldade_base
-            pontos += 20 * len(essenciais.intersection(presentes))
-            pontos -= 25 * len(faltantes)
-            capacidade_kg = (nave_val.get('capacidade_carga', 0) or 0) * 1000 if nave_val else 0
-            massa_total = sum(m.get('massa', 0) for m in modulos_dict.values())
-            if capacidade_kg > 0:
-                ratio = (massa_total / capacidade_kg)
-                if destino_val == 'lua':
-                    if massa_total > capacidade_kg * 1.2: pontos -= 60
-                    elif massa_total > capacidade_kg: pontos -= 30
-                    elif 0.5 <= ratio <= 1.0: pontos += 20
-                elif destino_val == 'marte':
-                    if massa_total > capacidade_kg: pontos -= 50
-                    elif 0.6 <= ratio <= 0.95: pontos += 30
-                else:
-                    if massa_total > capacidade_kg * 0.95: pontos -= 60
-                    elif 0.6 <= ratio <= 0.9: pontos += 25
-            avariados = sum(1 for m in modulos_dict.values() if m.get('status') == 'Avariado')
-            penal_por_avaria = {'lua': 8, 'marte': 10, 'exoplaneta': 14}.get(destino_val, 10)
-            pontos -= avariados * penal_por_avaria
-            allowed_missing = {'lua': 2, 'marte': 1, 'exoplaneta': 0}.get(destino_val, 1)
-            tolerancia_avarias = {'lua': 3, 'marte': 2, 'exoplaneta': 1}.get(destino_val, 2)
-            if destino_val == 'lua': massa_ok = (capacidade_kg == 0) or (massa_total <= capacidade_kg * 1.2)
-            elif destino_val == 'marte': massa_ok = (capacidade_kg == 0) or (massa_total <= capacidade_kg)
-            else: massa_ok = (capacidade_kg == 0) or (massa_total <= capacidade_kg * 0.95)
-            # Aplicar regra de pontuação mínima para habilitar montagem do Habitat
-            pontos_final = max(pontos, 0)
-            min_points_required = dificuldade_base
-            chegou = (
-                (len(faltantes) <= allowed_missing) and
-                massa_ok and
-                (avariados <= tolerancia_avarias) and
-                (pontos_final >= min_points_required)
-            )
-            return chegou, pontos_final, massa_total, capacidade_kg
-
-        # Chamada da função de cálculo
-        chegada_ok, pontuacao, massa_total, capacidade_kg = calcular_resultado_e_pontos(destino, nave, modulos_a_bordo, diario_de_bordo)
+        # --- Parte 2: Simulação determinística (semente + regras + carregamento) ---
+        # Perfil de eventos da sala (tabela alias compilada e em cache)
+        sorteador = sorteador_da_sala(_sala_da_sessao())
+        semente, perfil = nova_semente(), perfil_compacto(sorteador)
+        # Modo resistência: milhares de turnos, percorridos sem materializar o diário
+        turnos = TURNOS_RESISTENCIA.get(regras.destino) if request.form.get('modo') == 'resistencia' else None
+        resultado = reproduzir_viagem(
+            REGRAS.versao, regras.destino, nave_key, mascara_de(modulos_selecionados_ids), semente, perfil, turnos
+        )
+        estado, balanco = resultado['estado'], resultado['balanco']
+        ids_a_bordo = ids_de(estado.a_bordo)
+        chegada_ok, pontuacao = resultado['chegada_ok'], resultado['pontuacao']
+        massa_total, capacidade_kg = resultado['massa_total'], resultado['capacidade_kg']
 
         # --- Lógica de Banco de Dados e Feedback ---
         
@@ -284,7 +263,7 @@ def viagem(destino, nave_id):
             try:
                 db_manager.atualizar_destino_e_nave(codigo_sala, destino, nave_key)
                 titulo = f"Mission {destino.capitalize()} — {nave['nome'] if nave else nave_id}"
-                descricao = f"Mission planned with {len(modulos_a_bordo)} selected modules."
+                descricao = f"Mission planned with {len(ids_a_bordo)} selected modules."
                 sala = db_manager.buscar_sala_por_codigo_any(codigo_sala)
                 if sala:
                     desafios = json.loads(sala.get('desafios_json') or '[]')
@@ -295,19 +274,19 @@ def viagem(destino, nave_id):
 
         if not chegada_ok:
             try:
-                essenciais_por_destino = {
-                    'lua': {'suporte_vida', 'habitacional'}, 'marte': {'suporte_vida', 'habitacional', 'medico'},
-                    'exoplaneta': {'suporte_vida', 'habitacional', 'blindagem', 'controle', 'hidroponia'}
-                }
-                essenciais = essenciais_por_destino.get(destino, set())
-                presentes = set(modulos_a_bordo.keys())
-                faltantes = list(essenciais - presentes)
+                faltantes = ids_de(regras.faltantes(estado.a_bordo))
                 causas = []
                 if faltantes: causas.append(f"Missing essential modules: {', '.join(faltantes)}.")
+                if estado.total_avariados > regras.tolerancia_avarias:
+                    causas.append(
+                        f"Damage above tolerance: {estado.total_avariados} modules damaged, "
+                        f"at most {regras.tolerancia_avarias} allowed."
+                    )
+                if balanco['penalidade']:
+                    causas.append(f"Energy or water shortages on {balanco['turnos_em_deficit']} turns cost {balanco['penalidade']} points.")
                 # Verificar pontuação mínima necessária para montar o Habitat
-                min_points_required = {'lua': 50, 'marte': 120, 'exoplaneta': 300}.get(destino, 50)
-                if pontuacao < min_points_required:
-                    causas.append(f"Insufficient score to assemble habitat: required at least {min_points_required}, achieved {int(pontuacao)}.")
+                if pontuacao < regras.pontos_minimos:
+                    causas.append(f"Insufficient score to assemble habitat: required at least {regras.pontos_minimos}, achieved {int(pontuacao)}.")
                 session['missao_feedback'] = "\n".join(["Game Over Analysis:"] + causas)
             except Exception:
                 logging.exception('Falha ao gerar feedback de Game Over')
@@ -323,14 +302,29 @@ def viagem(destino, nave_id):
         except Exception:
             logging.exception('Falha ao registrar pontuação da missão')
 
+        # Viagem persistida como (semente, versão das regras, carregamento)
+        viagem_id = None
+        try:
+            viagem_id = db_manager.registrar_viagem(
+                session.get('aluno_id'), session.get('sala_id'), regras.destino, nave_key, estado.a_bordo,
+                semente, REGRAS.versao, perfil, int(pontuacao), chegada_ok, turnos
+            )
+        except Exception:
+            logging.exception('Falha ao registrar a viagem')
+
         # --- Parte 4: Salvar tudo na sessão ---
-        session['viagem_diario'] = diario_de_bordo
+        # O diário não vai para a sessão: é regenerado (em cache) a partir da semente
+        session.pop('viagem_diario', None)
+        session['viagem_semente'] = semente
+        session['viagem_regras'] = REGRAS.versao
+        session['viagem_perfil'] = perfil
+        session['viagem_turnos'] = turnos
         session['viagem_destino'] = destino
         session['viagem_nave_id'] = nave_key
-        session['viagem_nave'] = nave
-        session['viagem_modulos'] = modulos_a_bordo
+        session['viagem_modulos'] = estado.como_dict()
         session['viagem_chegada_ok'] = chegada_ok
         session['viagem_pontuacao'] = pontuacao
+        session['viagem_id'] = viagem_id
         # Compatibilidade com páginas subsequentes (Habitat/finalização)
         session['chegada_ok'] = chegada_ok
         session['missao_score'] = pontuacao
@@ -426,15 +420,8 @@ def habitat_finalizar():
                 logging.exception('Fallback de aluno_id por nome/sala falhou')
         itens = session.get('modulos_selecionados') or []
         # Análise de sobrevivência com base nos itens selecionados
-        essenciais_por_destino = {
-            'lua': {'suporte_vida', 'habitacional'},
-            'marte': {'suporte_vida', 'habitacional', 'medico'},
-            'exoplaneta': {'suporte_vida', 'habitacional', 'blindagem', 'controle', 'hidroponia'}
-        }
         destino = session.get('missao_destino')
-        essenciais = essenciais_por_destino.get(destino, {'suporte_vida', 'habitacional'})
-        presentes = set(itens)
-        faltantes = list(essenciais - presentes)
+        faltantes = ids_de(regras_para(destino).faltantes(mascara_de(itens)))
         sobrevivencia_ok = len(faltantes) == 0
 
         detalhes = {
@@ -462,11 +449,25 @@ def habitat_finalizar():
         return "Erro ao finalizar Habitat", 500
 
 
+def _contribuicoes_da_viagem():
+    """Contribuições dos módulos da última viagem da sessão (None se indisponível)."""
+    try:
+        destino = session.get('viagem_destino')
+        nave_id = session.get('viagem_nave_id')
+        estado = EstadoModulos.de_dict(session.get('viagem_modulos'))
+        if not (destino and nave_id and estado.a_bordo):
+            return None
+        return contribuicoes(destino.lower(), nave_id, estado.a_bordo)
+    except Exception:
+        logging.exception('Falha ao calcular contribuições dos módulos')
+        return None
+
+
 @missao_bp.route('/game-over')
 def game_over():
     """Tela de Game Over caso a missão não tenha chegado ao destino."""
     try:
-        return render_template('game_over.html')
+        return render_template('game_over.html', contribuicoes=_contribuicoes_da_viagem())
     except Exception:
         logging.exception('Falha ao renderizar Game Over')
         return "Erro ao renderizar página", 500
@@ -546,43 +547,164 @@ def icons(filename):
 
 @missao_bp.route('/ranking-rodada')
 def ranking_rodada():
-    """Painel simples de ranking dos participantes da rodada (salas ativas)."""
+    """Painel simples de ranking dos participantes da rodada (salas ativas).
+
+    Depois de aberta, a página recebe só as posições alteradas pelo canal
+    `ranking` do servidor WebSocket, sem recarregar.
+    """
     try:
         try:
             ranking = db_manager.obter_ranking_salas_ativas(limit=100)
         except Exception:
             ranking = []
-        return render_template('ranking_rodada.html', ranking=ranking)
+        return render_template(
+            'ranking_rodada.html', ranking=ranking,
+            bilhete_canais=emitir_acesso([CANAL_RANKING], segredo=current_app.secret_key)
+        )
     except Exception:
         logging.exception('Falha ao renderizar ranking da rodada')
         return "Erro ao renderizar ranking", 500
-@missao_bp.route('/viagem/<string:destino>/<string:nave_id>', methods=['GET'], endpoint='viagem_get')
+
+
+def _chave_viagem_sessao():
+    """Argumentos de `reproduzir_viagem` para a viagem da sessão (None se ausente)."""
+    semente = session.get('viagem_semente')
+    if semente is None:
+        return None
+    estado = EstadoModulos.de_dict(session.get('viagem_modulos'))
+    return (
+        session.get('viagem_regras'), (session.get('viagem_destino') or '').lower(),
+        session.get('viagem_nave_id'), estado.a_bordo, semente, session.get('viagem_perfil') or '',
+        session.get('viagem_turnos')
+    )
+
+
+def _viagem_da_sessao():
+    """Resultado da viagem da sessão, regenerado pela semente (None se ausente)."""
+    try:
+        chave = _chave_viagem_sessao()
+        return reproduzir_viagem(*chave) if chave else None
+    except Exception:
+        logging.exception('Falha ao regenerar a viagem da sessão')
+        return None
+
+
+def formatador_diario(destino, total_turnos):
+    """Função que converte uma entrada do diário no formato JSON do cliente.
+
+    Inclui a posição na transferência; as URLs de ícones são resolvidas uma
+    vez por arquivo (precisa de contexto de requisição).
+    """
+    icones = {}
+
+    def formatar(e):
+        icone = e['evento'].get('icone')
+        if icone and icone not in icones:
+            icones[icone] = url_for('missao.icons', filename=icone)
+        posicao = posicao_turno(destino, e['turno'], total_turnos)
+        return {
+            'turno': e['turno'],
+            'nome': e['evento'].get('nome'),
+            'descricao': e['evento'].get('descricao'),
+            'icone': icones.get(icone),
+            'dia': posicao['dia'],
+            'distancia_km': posicao['distancia_km'],
+        }
+    return formatar
+
+
+def _entradas_diario(entradas, destino, total_turnos):
+    """Entradas do diário prontas para JSON, com a posição na transferência."""
+    return list(map(formatador_diario(destino, total_turnos), entradas))
+
+
+@missao_bp.route('/viagem/diario', methods=['GET'], endpoint='viagem_diario')
+def viagem_diario():
+    """Página do diário de bordo da viagem da sessão (JSON, `?pagina=N&tamanho=M`)."""
+    resultado = _viagem_da_sessao()
+    if resultado is None:
+        return jsonify({'erro': 'No voyage in progress'}), 404
+    try:
+        pagina = int(request.args.get('pagina', 1))
+        tamanho = int(request.args.get('tamanho', TAMANHO_PAGINA_DIARIO))
+    except ValueError:
+        return jsonify({'erro': 'Invalid page'}), 400
+    entradas, total_paginas = pagina_da_viagem(resultado, _chave_viagem_sessao(), pagina, tamanho)
+    destino = (session.get('viagem_destino') or '').lower()
+    return jsonify({
+        'pagina': pagina,
+        'total_paginas': total_paginas,
+        'total_turnos': resultado['total_turnos'],
+        'corpo_central': grafico_trajetoria(destino)['corpo_central'],
+        'entradas': _entradas_diario(entradas, destino, resultado['total_turnos']),
+    })
+
+
+@missao_bp.route('/viagem/stream', methods=['GET'], endpoint='viagem_stream')
+def viagem_stream():
+    """Diário completo da viagem da sessão em NDJSON, transmitido em partes.
+
+    Os turnos são gerados conforme são enviados (memória constante mesmo no
+    modo resistência); a última linha traz o resumo da viagem.
+    """
+    chave = _chave_viagem_sessao()
+    resultado = reproduzir_viagem(*chave) if chave else None
+    if resultado is None:
+        return jsonify({'erro': 'No voyage in progress'}), 404
+    formatar = formatador_diario(chave[1], resultado['total_turnos'])
+    partes = transmitir_ndjson(turnos_da_viagem(*chave), formatar, resultado)
+    return Response(stream_with_context(partes), mimetype='application/x-ndjson')
+
+
 @missao_bp.route('/viagem/<string:destino>/<string:nave_id>', methods=['GET'], endpoint='viagem_get')
 def viagem_get(destino, nave_id):
     """Exibe a página da viagem, buscando os dados da sessão."""
     try:
-        # Pega todos os dados da sessão que a simulação preparou
-        diario = session.get('viagem_diario')
+        # Dados da sessão; o diário é regenerado pela semente (apenas a 1ª página vai no HTML)
+        resultado = _viagem_da_sessao()
         destino_sess = session.get('viagem_destino')
-        nave = session.get('viagem_nave')
-        modulos = session.get('viagem_modulos')
+        nave = NAVES_ESPACIAIS.get(session.get('viagem_nave_id'))
+        estado = EstadoModulos.de_dict(session.get('viagem_modulos'))
+        modulos = estado.itens()
         chegada_ok = session.get('viagem_chegada_ok')
         pontuacao = session.get('viagem_pontuacao')
 
         # Verificação rigorosa: se qualquer dado essencial estiver faltando, redireciona para a seleção de módulos
-        if not all([diario, destino_sess, nave, modulos, chegada_ok is not None, pontuacao is not None]):
+        if not all([resultado, destino_sess, nave, modulos, chegada_ok is not None, pontuacao is not None]):
             logging.error("Dados da viagem faltando na sessão. Redirecionando para a seleção de módulos.")
             return redirect(url_for('missao.retry_modulos'))
 
+        total_turnos = resultado['total_turnos']
+        primeira_pagina, total_paginas = pagina_da_viagem(resultado, _chave_viagem_sessao(), 1)
+        recursos = resultado['balanco']
+        sala_id = session.get('sala_id')
+
         # Se todos os dados estiverem OK, renderiza a página
         return render_template(
-            'viagem.html', 
-            diario=diario, 
-            destino=destino_sess, 
-            nave=nave, 
-            modulos=modulos, 
-            chegada_ok=chegada_ok, 
-            pontuacao=pontuacao
+            'viagem.html',
+            diario=_entradas_diario(primeira_pagina, destino_sess.lower(), total_turnos),
+            total_turnos=total_turnos,
+            resistencia=bool(session.get('viagem_turnos')),
+            total_paginas=total_paginas,
+            destino=destino_sess,
+            nave=nave,
+            modulos=modulos,
+            chegada_ok=chegada_ok,
+            pontuacao=pontuacao,
+            contribuicoes=_contribuicoes_da_viagem(),
+            recursos=recursos,
+            grafico_recursos=grafico_recursos(recursos),
+            # Transferência orbital propagada uma vez por destino (cache)
+            trajetoria=grafico_trajetoria(destino_sess.lower()),
+            rotulos_ritmo=ROTULOS_RITMO,
+            # O servidor WebSocket regenera os turnos a partir do bilhete assinado
+            bilhete_ws=emitir_bilhete(
+                _chave_viagem_sessao(), session.get('viagem_id'), session.get('aluno_id'), session.get('sala_id'),
+                ritmo=(_sala_da_sessao() or {}).get('ritmo_viagem'), segredo=current_app.secret_key
+            ),
+            # Atividade da turma (respostas e viagens dos colegas) pelo canal da sala
+            bilhete_canais=emitir_acesso([canal_sala(sala_id)], segredo=current_app.secret_key) if sala_id else None,
+            viagem_id=session.get('viagem_id')
         )
     except Exception as e:
         logging.exception(f'Falha CRÍTICA ao exibir a página da viagem (GET): {e}')
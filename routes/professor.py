@@ -4,7 +4,13 @@ Responsabilidades e fluxo:
 - Dashboard com visão de salas ativas/inativas, ranking e métricas;
 - CRUD de salas: criar, fechar/reabrir, excluir, exportar CSV;
 - Gestão de desafios: criar, editar, selecionar e registrar para a sala;
-- Detalhes da sala com alunos, progresso e links de acesso.
+- Detalhes da sala com alunos, progresso e links de acesso;
+- Soluções de referência (fronteira de Pareto) por nave e destino;
+- Análise de contribuição dos módulos (valores de Shapley) de um carregamento;
+- Perfil de eventos por sala (pesos de sorteio dos eventos da viagem);
+- Auditoria de viagens: diário e pontuação regenerados a partir da semente;
+- Atividade dos alunos ao vivo no dashboard (canal dos professores do WebSocket)
+  e no modo projetor da sala (canal da sala).
 
 Notas de usabilidade (para docentes):
 - O botão "Trocar senha" permanece visível para o usuário admin, facilitando
@@ -17,11 +23,25 @@ import sqlite3
 import logging
 from datetime import datetime
 
-from flask import Blueprint, render_template, request, redirect, url_for, Response, session, flash
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, Response, session, flash, jsonify, stream_with_context,
+    current_app
+)
 import os
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from services.db import db_manager
+from services.otimizador import fronteira_pareto, comparar_com_referencia
+from services.contribuicoes import contribuicoes
+from services.regras import mascara_de, ids_de
+from services.eventos import NOMES_EVENTOS, PESO_MAXIMO, normalizar_perfil, perfil_da_sala, invalidar_perfil
+from services.data import NAVES_ESPACIAIS
+from services.bilhetes import emitir_acesso
+from services.canais import CANAL_PROFESSORES, canal_sala
+from services.ritmos import ROTULOS_RITMO, nome_ritmo
+from services.simulacao import (
+    reproduzir_viagem, pagina_da_viagem, turnos_da_viagem, transmitir_ndjson, TAMANHO_MAXIMO_PAGINA
+)
 
 
 professor_bp = Blueprint('professor', __name__)
@@ -286,6 +306,7 @@ def dashboard():
         estatisticas_salas=estatisticas_salas,
         must_change_admin=must_change_admin,
         professor_nome=professor_nome,
+        bilhete_canais=emitir_acesso([CANAL_PROFESSORES], segredo=current_app.secret_key),
     )
 
 
@@ -623,6 +644,29 @@ def sala_detalhes(codigo_sala):
         except Exception:
             logging.exception('Falha ao obter flag must_change do admin (detalhes)')
 
+        # Soluções de referência para a nave/destino da sala (cacheadas)
+        referencias = []
+        try:
+            if sala_db.get('nave_id') and sala_db.get('destino'):
+                referencias = fronteira_pareto(sala_db.get('nave_id'), sala_db.get('destino'))[:5]
+        except Exception:
+            logging.exception('Falha ao obter soluções de referência')
+
+        # Perfil de eventos da sala (pesos e probabilidade resultante por evento)
+        perfil = perfil_da_sala(sala_db)
+        total_pesos = sum(perfil.values()) or 1
+        perfil_eventos = [
+            {'indice': i, 'nome': nome, 'peso': perfil[nome], 'pct': int(round(100 * perfil[nome] / total_pesos))}
+            for i, nome in enumerate(NOMES_EVENTOS)
+        ]
+
+        # Viagens recentes da sala (auditáveis pela semente)
+        try:
+            viagens = db_manager.listar_viagens_por_sala(sala_db['id'], limit=50)
+        except Exception:
+            logging.exception('Falha ao listar viagens da sala')
+            viagens = []
+
         sala_view = {
             'codigo_sala': sala_db.get('codigo_sala'),
             'nome_sala': sala_db.get('nome_sala'),
@@ -632,7 +676,8 @@ def sala_detalhes(codigo_sala):
             'ativa': sala_db.get('ativa'),
             'alunos': alunos,
             'desafios': desafios,
-            'desafio_selecionado_index': sala_db.get('desafio_selecionado_index')
+            'desafio_selecionado_index': sala_db.get('desafio_selecionado_index'),
+            'ritmo_viagem': nome_ritmo(sala_db.get('ritmo_viagem')),
         }
         return render_template(
             'professor_sala_detalhes.html',
@@ -640,6 +685,11 @@ def sala_detalhes(codigo_sala):
             alunos=alunos,
             turma_stats=turma_stats,
             desempenho_desafios=desempenho_desafios,
+            referencias=referencias,
+            perfil_eventos=perfil_eventos,
+            peso_maximo_evento=PESO_MAXIMO,
+            rotulos_ritmo=ROTULOS_RITMO,
+            viagens=viagens,
             must_change_admin=must_change_admin,
             professor_nome=professor_nome,
         )
@@ -648,6 +698,161 @@ def sala_detalhes(codigo_sala):
     return "Sala não encontrada", 404
 
 
+@professor_bp.route('/sala/<codigo_sala>/projetor', endpoint='professor_sala_projetor')
+def sala_projetor(codigo_sala):
+    """Modo projetor: atividade da turma ao vivo em tela cheia, pelo canal da sala."""
+    sala = db_manager.buscar_sala_por_codigo_any(codigo_sala)
+    if not sala:
+        return "Sala não encontrada", 404
+    try:
+        alunos = db_manager.buscar_alunos_por_sala(sala['id'])
+    except Exception:
+        alunos = []
+    return render_template(
+        'sala_projetor.html',
+        sala=sala,
+        # O progresso das viagens chega só com o id do aluno
+        nomes_alunos={a['id']: a['nome'] for a in alunos},
+        bilhete_canais=emitir_acesso([canal_sala(sala['id'])], segredo=current_app.secret_key),
+    )
+
+
+@professor_bp.route('/api/referencias/<destino>/<nave_id>', endpoint='professor_api_referencias')
+def api_referencias(destino, nave_id):
+    """Fronteira de Pareto de carregamentos para a nave e o destino.
+
+    Com `?modulos=a,b,c`, compara também o carregamento informado com as
+    soluções de referência (percentual da melhor pontuação esperada).
+    """
+    fronteira = fronteira_pareto(nave_id, destino)
+    if not fronteira:
+        return jsonify({'erro': 'Nave desconhecida'}), 404
+    resposta = {'destino': destino, 'nave_id': nave_id, 'fronteira': fronteira}
+    modulos = request.args.get('modulos')
+    if modulos is not None:
+        ids = [m.strip() for m in modulos.split(',') if m.strip()]
+        resposta['comparacao'] = comparar_com_referencia(nave_id, destino, ids)
+    return jsonify(resposta)
+
+
+@professor_bp.route('/api/contribuicoes/<destino>/<nave_id>', endpoint='professor_api_contribuicoes')
+def api_contribuicoes(destino, nave_id):
+    """Contribuição de cada módulo de `?modulos=a,b,c` para pontuação e chegada."""
+    ids = [m.strip() for m in (request.args.get('modulos') or '').split(',') if m.strip()]
+    resultado = contribuicoes((destino or '').lower(), nave_id, mascara_de(ids))
+    if resultado is None:
+        return jsonify({'erro': 'Nave desconhecida'}), 404
+    return jsonify({'destino': destino, 'nave_id': nave_id, **resultado})
+
+
+@professor_bp.route('/sala/<codigo_sala>/perfil-eventos', methods=['POST'], endpoint='professor_sala_perfil_eventos')
+def sala_perfil_eventos(codigo_sala):
+    """Salva (ou restaura ao padrão) os pesos de sorteio dos eventos da sala.
+
+    Campos `peso_<i>` seguem a ordem de `NOMES_EVENTOS`; `restaurar=1` volta
+    ao perfil uniforme. O sorteador em cache da sala é invalidado.
+    """
+    sala = db_manager.buscar_sala_por_codigo_any(codigo_sala)
+    if not sala:
+        return "Sala não encontrada", 404
+    try:
+        if request.form.get('restaurar'):
+            perfil_json = None
+        else:
+            perfil = normalizar_perfil({
+                nome: request.form.get(f'peso_{i}', 0) for i, nome in enumerate(NOMES_EVENTOS)
+            })
+            perfil_json = json.dumps(perfil, ensure_ascii=False, sort_keys=True)
+        db_manager.atualizar_perfil_eventos(codigo_sala, perfil_json)
+        invalidar_perfil(sala['id'])
+    except ValueError as e:
+        flash(str(e))
+    except Exception:
+        logging.exception('Falha ao salvar perfil de eventos')
+    return redirect(url_for('professor.professor_sala_detalhes', codigo_sala=codigo_sala))
+
+
+@professor_bp.route('/sala/<codigo_sala>/ritmo-viagem', methods=['POST'], endpoint='professor_sala_ritmo_viagem')
+def sala_ritmo_viagem(codigo_sala):
+    """Salva o ritmo padrão com que o servidor WebSocket transmite as viagens da sala."""
+    sala = db_manager.buscar_sala_por_codigo_any(codigo_sala)
+    if not sala:
+        return "Sala não encontrada", 404
+    try:
+        db_manager.atualizar_ritmo_viagem(codigo_sala, nome_ritmo(request.form.get('ritmo')))
+    except Exception:
+        logging.exception('Falha ao salvar ritmo das viagens')
+    return redirect(url_for('professor.professor_sala_detalhes', codigo_sala=codigo_sala))
+
+
+@professor_bp.route('/viagem/<int:viagem_id>', endpoint='professor_viagem')
+def viagem_auditoria(viagem_id):
+    """Diário e pontuação de uma viagem, regenerados a partir da semente gravada.
+
+    A viagem é reproduzida com a versão das regras e o perfil de eventos em
+    vigor quando foi feita; a pontuação regenerada é conferida com a gravada.
+    """
+    viagem = db_manager.buscar_viagem(viagem_id)
+    if not viagem:
+        return "Viagem não encontrada", 404
+    erro = None
+    resultado = None
+    entradas = ()
+    try:
+        chave = _chave_viagem(viagem)
+        resultado = reproduzir_viagem(*chave)
+        if resultado is None:
+            erro = f"Rules version {viagem['versao_regras']} is no longer available; this voyage cannot be replayed."
+        else:
+            # Viagens de resistência não têm diário em memória: só o começo vai na página
+            entradas, _ = pagina_da_viagem(resultado, chave, 1, TAMANHO_MAXIMO_PAGINA) \
+                if resultado['diario'] is None else (resultado['diario'], 1)
+    except Exception:
+        logging.exception('Falha ao reproduzir a viagem %s', viagem_id)
+        erro = 'Failed to replay this voyage.'
+    confere = resultado is not None and int(resultado['pontuacao']) == viagem['pontuacao']
+    return render_template(
+        'professor_viagem.html',
+        viagem=viagem,
+        nave=NAVES_ESPACIAIS.get(viagem['nave_id']),
+        modulos=ids_de(viagem['mascara']),
+        resultado=resultado,
+        entradas=entradas,
+        confere=confere,
+        erro=erro,
+        professor_nome=session.get('professor_nome') or 'Administrador',
+    )
+
+
+def _chave_viagem(viagem):
+    """Argumentos de `reproduzir_viagem` para uma viagem gravada."""
+    return (
+        viagem['versao_regras'], viagem['destino'], viagem['nave_id'], viagem['mascara'],
+        viagem['semente'], viagem['perfil_eventos'] or '', viagem.get('turnos')
+    )
+
+
+@professor_bp.route('/viagem/<int:viagem_id>/diario.ndjson', endpoint='professor_viagem_diario')
+def viagem_diario_ndjson(viagem_id):
+    """Diário completo de uma viagem gravada em NDJSON, gerado enquanto é enviado."""
+    viagem = db_manager.buscar_viagem(viagem_id)
+    if not viagem:
+        return jsonify({'erro': 'Voyage not found'}), 404
+    chave = _chave_viagem(viagem)
+    resultado = reproduzir_viagem(*chave)
+    if resultado is None:
+        return jsonify({'erro': 'Rules version no longer available'}), 410
+
+    def formatar(entrada):
+        return {'turno': entrada['turno'], 'nome': entrada['evento'].get('nome'),
+                'descricao': entrada['evento'].get('descricao')}
+
+    partes = transmitir_ndjson(turnos_da_viagem(*chave), formatar, resultado)
+    resposta = Response(stream_with_context(partes), mimetype='application/x-ndjson')
+    resposta.headers['Content-Disposition'] = f'attachment; filename=viagem_{viagem_id}.ndjson'
+    return resposta
+
+
 @professor_bp.route('/desafio/registrar', endpoint='professor_registrar_desafio')
 def registrar_desafio():
     """Registra destino e nave para a sala e cria um desafio básico."""
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Calibra a dificuldade por destino para metas de taxa de sucesso.
+
+Uso: python scripts/calibrar_regras.py [lua=0.8] [marte=0.5] [exoplaneta=0.2] [--verificar] [--simular]
+
+- Sem metas, usa as metas padrão (80% Lua, 50% Marte, 20% exoplaneta);
+- --verificar confere cada resultado com viagens sorteadas;
+- --simular apenas mostra o resultado, sem gravar o arquivo de regras.
+
+Grava uma nova versão em services/regras_missao.json, carregada pelo motor de
+regras na próxima inicialização do servidor.
+"""
+
+import sys
+import os
+import time
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.data import REGRAS_MISSAO
+from services.regras import RegrasDestino, ARQUIVO_REGRAS
+from services.calibracao import (
+    METAS_PADRAO, PARAMETROS, calibrar_destino, carregamentos_razoaveis, simular_taxa, gravar_calibracao
+)
+
+
+def main():
+    metas = dict(METAS_PADRAO)
+    flags = {a for a in sys.argv[1:] if a.startswith('--')}
+    for arg in sys.argv[1:]:
+        if arg.startswith('--'):
+            continue
+        destino, _, valor = arg.partition('=')
+        if destino not in REGRAS_MISSAO or not valor:
+            print(f"Argumento inválido: {arg} (use destino=meta, destinos: {', '.join(REGRAS_MISSAO)})")
+            sys.exit(1)
+        metas[destino] = float(valor)
+
+    ajustes, taxas = {}, {}
+    inicio = time.time()
+    for destino, meta in metas.items():
+        parametros, taxa, avaliadas = calibrar_destino(destino, meta)
+        ajustes[destino] = parametros
+        taxas[destino] = taxa
+        atuais = {p: REGRAS_MISSAO[destino].get(p) for p in PARAMETROS}
+        print(f"{destino}: meta {meta:.0%}, prevista {taxa:.1%} ({avaliadas} combinações)")
+        for p in PARAMETROS:
+            print(f"    {p}: {atuais[p]} -> {parametros[p]}")
+        if '--verificar' in flags:
+            regras = RegrasDestino(destino, {**REGRAS_MISSAO[destino], **parametros})
+            print(f"    simulada: {simular_taxa(regras, carregamentos_razoaveis(regras)):.1%}")
+    print(f"Calibração concluída em {time.time() - inicio:.1f}s")
+
+    if '--simular' in flags:
+        return
+    versao = gravar_calibracao(ajustes, metas, taxas)
+    print(f"Versão {versao} gravada em {ARQUIVO_REGRAS}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do servidor WebSocket (websocket_server.py).
+
+Uso: python scripts/carga_websocket.py [--salas 50] [--alunos-por-sala 30]
+     [--professores 2] [--taxa-conexao 200] [--viagens-por-segundo 5]
+     [--respostas-por-segundo 10] [--ritmo tempo_real] [--binario]
+     [--duracao 30] [--processos 1] [--url ws://host:porta/ws --banco caminho.db]
+     [--relatorio relatorio.json]
+
+Abre milhares de clientes em um único laço asyncio e simula uma manhã de aulas:
+
+- alunos assinam o canal da sala e professores o canal dos professores,
+  conectando a `--taxa-conexao` por segundo;
+- clientes sorteados iniciam viagens (`start_trip`) a `--viagens-por-segundo`,
+  no ritmo escolhido (`services.ritmos`), em JSON ou nos quadros binários;
+- respostas de desafios são gravadas no SQLite a `--respostas-por-segundo`
+  e chegam aos clientes pelo log de eventos, como as do Flask.
+
+Sem `--url`, sobe o servidor em um subprocesso (porta livre, banco em pasta
+temporária), para que ele não divida a CPU com o gerador; `--processos N` o
+sobe com N processos (`WS_WORKERS`, `services.broker`). Com `--url`, mede um
+servidor já em execução; as respostas só são geradas se `--banco` apontar para
+o mesmo arquivo SQLite dele. Os bilhetes são assinados com a `SECRET_KEY` do
+ambiente, que deve ser a do servidor.
+
+O relatório traz a latência de conexão, a latência de entrega das respostas
+(gravação no banco → cada assinante), o atraso dos turnos em relação ao ritmo,
+o início das viagens e a CPU e a memória do servidor (`/metricas`), amostradas
+a cada segundo. Com `--relatorio`, grava também um JSON com parâmetros,
+revisão do git e resultados, para comparar versões.
+
+Milhares de conexões exigem um limite de arquivos abertos alto (`ulimit -n`);
+o script tenta elevá-lo até o máximo permitido.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Adicionar o diretório pai ao path
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+import websockets
+
+from services.bilhetes import emitir_bilhete, emitir_acesso
+from services.canais import canal_sala, CANAL_PROFESSORES
+from services.db import DatabaseManager
+from services.protocolo import QUADRO_TURNOS
+from services.regras import REGRAS, mascara_de
+from services.ritmos import RITMOS, perfil_ritmo
+
+
+DESTINOS = ('lua', 'marte', 'exoplaneta')
+MODULOS_VIAGEM = ('suporte_vida', 'habitacional', 'alimentacao', 'medico', 'controle', 'armazenamento')
+PREFIXO_DESAFIO = 'carga-'
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description='Teste de carga do servidor WebSocket do Cosmo-Casa.')
+    parser.add_argument('--salas', type=int, default=50)
+    parser.add_argument('--alunos-por-sala', type=int, default=30)
+    parser.add_argument('--professores', type=int, default=2)
+    parser.add_argument('--taxa-conexao', type=float, default=200, help='conexões abertas por segundo')
+    parser.add_argument('--viagens-por-segundo', type=float, default=5)
+    parser.add_argument('--respostas-por-segundo', type=float, default=10)
+    parser.add_argument('--ritmo', choices=sorted(RITMOS), default='tempo_real')
+    parser.add_argument('--intervalo-turnos', type=float, default=2.0,
+                        help='segundos entre turnos no tempo real (WS_INTERVALO_TURNOS do servidor)')
+    parser.add_argument('--binario', action='store_true', help='negocia os quadros binários de turnos')
+    parser.add_argument('--duracao', type=float, default=30, help='segundos de carga após conectar todos')
+    parser.add_argument('--processos', type=int, default=1,
+                        help='processos do servidor (WS_WORKERS) quando o script o sobe')
+    parser.add_argument('--url', help='servidor já em execução (sem ela, sobe um subprocesso)')
+    parser.add_argument('--banco', help='arquivo SQLite do servidor de --url (para gerar respostas)')
+    parser.add_argument('--relatorio', help='grava o relatório em JSON neste arquivo')
+    parser.add_argument('--semente', type=int, default=1)
+    return parser.parse_args()
+
+
+def percentis(valores):
+    """p50/p90/p99/máximo em milissegundos (None sem amostras)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+
+    def p(fracao):
+        return round(1000 * ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))], 2)
+
+    return {'amostras': len(ordenados), 'p50': p(0.50), 'p90': p(0.90), 'p99': p(0.99),
+            'max': round(1000 * ordenados[-1], 2)}
+
+
+def elevar_limite_arquivos():
+    try:
+        import resource
+    except ImportError:
+        return None
+    flexivel, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (rigido, rigido))
+        return rigido
+    except (ValueError, OSError):
+        return flexivel
+
+
+def revisao_git():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def ler_metricas(url_metricas):
+    with urllib.request.urlopen(url_metricas, timeout=5) as resposta:
+        return json.loads(resposta.read())
+
+
+class Coleta:
+    """Amostras e contadores do teste."""
+
+    def __init__(self):
+        self.conexao = []
+        self.entrega = []
+        self.inicio_viagem = []
+        self.atraso_turno = []
+        self.falhas_conexao = 0
+        self.desconectados = 0
+        self.mensagens = 0
+        self.bytes = 0
+        self.viagens_iniciadas = 0
+        self.viagens_concluidas = 0
+        self.respostas = {}        # desafio_id → instante da gravação
+        self.entregas_esperadas = 0
+        self.amostras_servidor = []
+        self.cpu_gerador = None
+
+
+class Cliente:
+    """Uma conexão simulada (aluno ou professor) e sua viagem em curso."""
+
+    def __init__(self, sala_id, aluno_id, canal):
+        self.sala_id = sala_id
+        self.aluno_id = aluno_id
+        self.canal = canal
+        self.ws = None
+        self.pedido_viagem = None   # instante do start_trip
+        self.proximo_quadro = None  # instante previsto do próximo quadro de turnos
+        self.intervalo = 0.0
+
+    @property
+    def viajando(self):
+        return self.pedido_viagem is not None
+
+    def receber_turnos(self, coleta, agora):
+        # O primeiro quadro sai junto com o trip_start; os seguintes, um intervalo após o anterior
+        if self.proximo_quadro is not None:
+            coleta.atraso_turno.append(max(0.0, agora - self.proximo_quadro))
+            self.proximo_quadro = agora + self.intervalo
+
+
+async def conectar(cliente, url, args, coleta):
+    inicio = time.perf_counter()
+    try:
+        cliente.ws = await websockets.connect(url, max_queue=None, open_timeout=30, close_timeout=1)
+    except Exception:
+        coleta.falhas_conexao += 1
+        return False
+    coleta.conexao.append(time.perf_counter() - inicio)
+    if args.binario:
+        await cliente.ws.send(json.dumps({'action': 'hello', 'formato': 'binario', 'versao': 1}))
+    await cliente.ws.send(json.dumps({'action': 'subscribe', 'ticket': emitir_acesso([cliente.canal])}))
+    return True
+
+
+async def ler(cliente, coleta):
+    """Lê as mensagens do cliente até a conexão fechar, registrando as latências."""
+    try:
+        async for mensagem in cliente.ws:
+            agora = time.perf_counter()
+            coleta.mensagens += 1
+            coleta.bytes += len(mensagem) if isinstance(mensagem, bytes) else len(mensagem.encode())
+            if isinstance(mensagem, bytes):
+                if mensagem[:1] == bytes((QUADRO_TURNOS,)):
+                    cliente.receber_turnos(coleta, agora)
+                continue
+            dados = json.loads(mensagem)
+            tipo = dados.get('type')
+            if tipo in ('trip_event', 'trip_events'):
+                cliente.receber_turnos(coleta, agora)
+            elif tipo == 'trip_start' and cliente.viajando:
+                cliente.proximo_quadro = agora
+                coleta.inicio_viagem.append(agora - cliente.pedido_viagem)
+            elif tipo in ('trip_complete', 'error') and cliente.viajando:
+                coleta.viagens_concluidas += tipo == 'trip_complete'
+                cliente.pedido_viagem = cliente.proximo_quadro = None
+            elif str(dados.get('desafio_id', '')).startswith(PREFIXO_DESAFIO):
+                gravada = coleta.respostas.get(dados['desafio_id'])
+                if gravada is not None:
+                    coleta.entrega.append(agora - gravada)
+    except websockets.ConnectionClosed:
+        coleta.desconectados += 1
+
+
+async def iniciar_viagens(clientes, args, coleta, parar, rng):
+    contador = 0
+    ritmo = perfil_ritmo(args.ritmo, args.intervalo_turnos)
+    while not parar.is_set():
+        await asyncio.sleep(1 / args.viagens_por_segundo)
+        livres = [c for c in clientes if c.ws is not None and c.sala_id is not None and not c.viajando]
+        if not livres:
+            continue
+        cliente = rng.choice(livres)
+        contador += 1
+        modulos = rng.sample(MODULOS_VIAGEM, rng.randint(2, len(MODULOS_VIAGEM)))
+        chave = (REGRAS.versao, rng.choice(DESTINOS), 'falcon9', mascara_de(modulos), rng.getrandbits(31), '', None)
+        cliente.pedido_viagem = time.perf_counter()
+        cliente.proximo_quadro = None
+        cliente.intervalo = ritmo.intervalo
+        coleta.viagens_iniciadas += 1
+        try:
+            await cliente.ws.send(json.dumps({
+                'action': 'start_trip', 'pace': args.ritmo,
+                'ticket': emitir_bilhete(chave, 10_000_000 + contador, cliente.aluno_id, cliente.sala_id),
+            }))
+        except websockets.ConnectionClosed:
+            cliente.pedido_viagem = None
+
+
+async def gravar_respostas(db, salas, args, coleta, parar, rng):
+    contador = 0
+    while not parar.is_set():
+        await asyncio.sleep(1 / args.respostas_por_segundo)
+        sala_id, aluno_id = rng.choice(salas)
+        contador += 1
+        desafio_id = f'{PREFIXO_DESAFIO}{contador}'
+        await asyncio.to_thread(db.registrar_resposta_desafio, aluno_id, sala_id, desafio_id, '{}', 1, contador % 100)
+        coleta.respostas[desafio_id] = time.perf_counter()
+        coleta.entregas_esperadas += args.alunos_por_sala + args.professores
+
+
+async def amostrar_servidor(url_metricas, coleta, parar, por_segundo=1):
+    # Com vários processos, cada pedido cai em um deles: várias amostras por segundo
+    while not parar.is_set():
+        try:
+            amostra = await asyncio.to_thread(ler_metricas, url_metricas)
+            coleta.amostras_servidor.append((time.perf_counter(), amostra))
+        except Exception:
+            pass
+        await asyncio.sleep(1 / por_segundo)
+
+
+def preparar_banco(caminho, args):
+    """Professor, salas e um aluno por sala (autor das respostas simuladas)."""
+    db = DatabaseManager(caminho)
+    professor_id = db.criar_professor('Carga', f'carga-{os.getpid()}@teste', 'x')
+    salas = []
+    for i in range(args.salas):
+        sala = db.buscar_sala_por_codigo(db.criar_sala_virtual(professor_id, f'Carga {i}', 'marte', 'falcon9', '[]'))
+        salas.append((sala['id'], db.adicionar_aluno(sala['id'], f'Aluno {i}')))
+    return db, salas
+
+
+def iniciar_servidor(pasta, args):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+    # O servidor roda na pasta temporária (banco próprio): caminhos do PYTHONPATH absolutos
+    caminhos = [os.path.abspath(c) for c in os.environ.get('PYTHONPATH', '').split(os.pathsep) if c]
+    ambiente = {
+        **os.environ, 'PYTHONPATH': os.pathsep.join(caminhos), 'COSMO_DB_PATH': os.path.join(pasta, 'salas_virtuais.db'),
+        'WS_PORT': str(porta), 'WS_INTERVALO_TURNOS': str(args.intervalo_turnos),
+        'WS_WORKERS': str(args.processos), 'WS_BROKER': os.path.join(pasta, 'hub.sock'),
+    }
+    log = open(os.path.join(pasta, 'websocket_server.log'), 'w')
+    processo = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, 'websocket_server.py')], cwd=pasta, env=ambiente,
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f'ws://127.0.0.1:{porta}/ws'
+    for _ in range(100):
+        try:
+            ler_metricas(url.replace('ws://', 'http://').replace('/ws', '/metricas'))
+            return processo, url
+        except OSError:
+            if processo.poll() is not None:
+                break
+            time.sleep(0.1)
+    processo.kill()
+    raise RuntimeError(f'O servidor não subiu; veja {log.name}')
+
+
+async def executar(url, db, salas, args):
+    rng = random.Random(args.semente)
+    coleta = Coleta()
+    parar = asyncio.Event()
+    url_metricas = url.replace('ws://', 'http://').replace('wss://', 'https://').replace('/ws', '/metricas')
+
+    # Sem banco (servidor externo), ids de sala fictícios: só para canais e bilhetes
+    salas_clientes = salas or [(i + 1, None) for i in range(args.salas)]
+    clientes = [
+        Cliente(sala_id, aluno_id, canal_sala(sala_id))
+        for sala_id, aluno_id in salas_clientes for _ in range(args.alunos_por_sala)
+    ] + [Cliente(None, None, CANAL_PROFESSORES) for _ in range(args.professores)]
+
+    amostrador = asyncio.create_task(amostrar_servidor(url_metricas, coleta, parar, 2 * args.processos))
+    leitores = []
+    inicio = time.perf_counter()
+    for i, cliente in enumerate(clientes):
+        if await conectar(cliente, url, args, coleta):
+            leitores.append(asyncio.create_task(ler(cliente, coleta)))
+        atraso = inicio + (i + 1) / args.taxa_conexao - time.perf_counter()
+        if atraso > 0:
+            await asyncio.sleep(atraso)
+    tempo_rampa = time.perf_counter() - inicio
+    print(f'{len(leitores)} clientes conectados em {tempo_rampa:.1f}s; carga por {args.duracao:.0f}s...')
+
+    geradores = [asyncio.create_task(iniciar_viagens(clientes, args, coleta, parar, rng))]
+    if db is not None and salas:
+        geradores.append(asyncio.create_task(gravar_respostas(db, salas, args, coleta, parar, rng)))
+    inicio_carga = time.perf_counter()
+    cpu_gerador = time.process_time()
+    await asyncio.sleep(args.duracao)
+    parar.set()
+    # Últimas entregas em trânsito
+    await asyncio.sleep(1)
+    duracao_carga = time.perf_counter() - inicio_carga
+    coleta.cpu_gerador = 100 * (time.process_time() - cpu_gerador) / duracao_carga
+    for tarefa in geradores + [amostrador]:
+        tarefa.cancel()
+    await asyncio.gather(*geradores, amostrador, return_exceptions=True)
+
+    conectados = [c for c in clientes if c.ws is not None]
+    await asyncio.gather(*(c.ws.close() for c in conectados), return_exceptions=True)
+    for tarefa in leitores:
+        tarefa.cancel()
+    await asyncio.gather(*leitores, return_exceptions=True)
+    return coleta, len(conectados), tempo_rampa, duracao_carga
+
+
+def resumo_servidor(amostras):
+    """CPU e memória somadas entre os processos do servidor; contadores da última amostra de cada um."""
+    por_processo = {}
+    for instante, amostra in amostras:
+        por_processo.setdefault(amostra.get('trabalhador'), []).append((instante, amostra))
+    por_processo = {p: a for p, a in por_processo.items() if len(a) >= 2 and 'processo' in a[0][1]}
+    if not por_processo:
+        return None
+    cpu, memoria_max, memoria_final = 0.0, 0, 0
+    for serie in por_processo.values():
+        (t0, primeira), (t1, ultima) = serie[0], serie[-1]
+        cpu += 100 * (ultima['processo']['cpu_s'] - primeira['processo']['cpu_s']) / (t1 - t0)
+        memorias = [a['processo']['memoria_kb'] or 0 for _, a in serie]
+        memoria_max += max(memorias)
+        memoria_final += memorias[-1]
+    ultimas = [serie[-1][1] for serie in por_processo.values()]
+    return {
+        'processos': len(por_processo),
+        'cpu_percentual_medio': round(cpu, 1),
+        'memoria_kb_max': memoria_max or None,
+        'memoria_kb_final': memoria_final or None,
+        'maior_fila': max(u.get('maior_fila_registrada', 0) for u in ultimas),
+        **{c: sum(u.get(c, 0) for u in ultimas) for c in ('enviadas', 'coalescidas', 'descartadas', 'desconectadas_lentas')},
+    }
+
+
+def imprimir(relatorio):
+    r = relatorio['resultados']
+    print('\n=== Relatório de capacidade do servidor WebSocket ===')
+    print(f"Revisão: {relatorio['revisao'] or '?'}  Clientes: {r['clientes_conectados']} "
+          f"(falhas: {r['falhas_conexao']}, quedas: {r['desconectados']})")
+    for rotulo, chave in (('Conexão', 'latencia_conexao_ms'), ('Entrega de respostas', 'latencia_entrega_ms'),
+                          ('Início de viagem', 'inicio_viagem_ms'), ('Atraso dos turnos', 'atraso_turnos_ms')):
+        p = r[chave]
+        print(f'{rotulo:22} ' + (f"p50 {p['p50']:8.2f}  p90 {p['p90']:8.2f}  p99 {p['p99']:8.2f}  "
+                                   f"max {p['max']:8.2f} ms  ({p['amostras']} amostras)" if p else 'sem amostras'))
+    print(f"Entregas de respostas: {r['entregas_recebidas']}/{r['entregas_esperadas']}")
+    print(f"Viagens: {r['viagens_iniciadas']} iniciadas, {r['viagens_concluidas']} concluídas")
+    print(f"Mensagens recebidas: {r['mensagens_recebidas']} ({r['mensagens_por_segundo']}/s, "
+          f"{r['bytes_recebidos'] / 1e6:.1f} MB)")
+    s = r['servidor']
+    if s:
+        memoria = f"{s['memoria_kb_max'] / 1024:.1f} MB" if s['memoria_kb_max'] else '?'
+        print(f"Servidor ({s['processos']} processo(s)): CPU média {s['cpu_percentual_medio']}%, memória máxima {memoria}, "
+              f"maior fila {s['maior_fila']}, descartadas {s['descartadas']}, "
+              f"consumidores lentos {s['desconectadas_lentas']}")
+    print(f"Gerador de carga: CPU média {r['cpu_gerador_percentual']}% (perto de 100%, o gargalo é ele)")
+
+
+def main():
+    args = argumentos()
+    limite = elevar_limite_arquivos()
+    total = args.salas * args.alunos_por_sala + args.professores
+    if limite is not None and total + 64 > limite:
+        print(f'Aviso: {total} clientes e limite de {limite} arquivos abertos (ulimit -n)')
+
+    processo = None
+    pasta = tempfile.mkdtemp(prefix='carga-ws-')
+    try:
+        if args.url:
+            url = args.url
+            db, salas = preparar_banco(args.banco, args) if args.banco else (None, [])
+        else:
+            db, salas = preparar_banco(os.path.join(pasta, 'salas_virtuais.db'), args)
+            processo, url = iniciar_servidor(pasta, args)
+        coleta, conectados, tempo_rampa, duracao = asyncio.run(executar(url, db, salas, args))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=10)
+    # Em caso de erro, a pasta fica (com o log do servidor) para inspeção
+    shutil.rmtree(pasta, ignore_errors=True)
+
+    relatorio = {
+        'revisao': revisao_git(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('relatorio', 'banco')},
+        'resultados': {
+            'clientes_conectados': conectados,
+            'falhas_conexao': coleta.falhas_conexao,
+            'desconectados': coleta.desconectados,
+            'tempo_rampa_s': round(tempo_rampa, 2),
+            'latencia_conexao_ms': percentis(coleta.conexao),
+            'latencia_entrega_ms': percentis(coleta.entrega),
+            'inicio_viagem_ms': percentis(coleta.inicio_viagem),
+            'atraso_turnos_ms': percentis(coleta.atraso_turno),
+            'entregas_esperadas': coleta.entregas_esperadas,
+            'entregas_recebidas': len(coleta.entrega),
+            'viagens_iniciadas': coleta.viagens_iniciadas,
+            'viagens_concluidas': coleta.viagens_concluidas,
+            'mensagens_recebidas': coleta.mensagens,
+            'mensagens_por_segundo': round(coleta.mensagens / duracao),
+            'bytes_recebidos': coleta.bytes,
+            'servidor': resumo_servidor(coleta.amostras_servidor),
+            # Perto de 100%, o gerador é o gargalo (e as latências medem a ele, não ao servidor)
+            'cpu_gerador_percentual': round(coleta.cpu_gerador, 1),
+        },
+    }
+    imprimir(relatorio)
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f'Relatório gravado em {args.relatorio}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Testes dos perfis de eventos por sala (services/eventos.py).
+Verifica a tabela alias, a validação de perfis, o cache por sala e a
+reprodução determinística da viagem a partir da semente (services/simulacao.py).
+"""
+
+import sys
+import os
+import json
+import random
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.eventos import (
+    TabelaAlias, SorteadorEventos, normalizar_perfil, sorteador_da_sala, sorteador_por_id, invalidar_perfil,
+    PERFIL_PADRAO
+)
+from services.simulacao import (
+    simular_viagem, perfil_compacto, sorteador_compacto, reproduzir_viagem, pagina_diario, pagina_da_viagem,
+    turnos_da_viagem, ViagemEmCurso, LIMITE_DIARIO_EM_MEMORIA, TURNOS_RESISTENCIA, TURNOS_POR_PONTO
+)
+from services.regras import REGRAS, regras_da_versao, regras_para, mascara_de, ORDEM_MODULOS
+from services.data import NAVES_ESPACIAIS
+
+
+def test_tabela_alias_exata():
+    """Probabilidades implícitas na tabela alias iguais aos pesos normalizados."""
+    pesos = [5, 1, 0, 3, 11]
+    tabela = TabelaAlias(pesos)
+    n = len(pesos)
+    implicitas = [0.0] * n
+    for i in range(n):
+        implicitas[i] += tabela.prob[i] / n
+        implicitas[tabela.alias[i]] += (1.0 - tabela.prob[i]) / n
+    for p, peso in zip(implicitas, pesos):
+        assert abs(p - peso / sum(pesos)) < 1e-12
+    rng = random.Random(7)
+    contagem = [0] * n
+    for _ in range(20000):
+        contagem[tabela.sortear(rng)] += 1
+    assert contagem[2] == 0
+    print('✅ Tabela alias exata')
+
+
+def test_perfis():
+    """Validação de perfis, frações por efeito e cache por sala."""
+    perfil = normalizar_perfil({'Solar Storm': 7, 'Power Surge': 3})
+    sorteador = SorteadorEventos(perfil)
+    assert abs(sorteador.fracao('risco_avaria_modulo') - 0.7) < 1e-12
+    assert {e['nome'] for e in sorteador.eventos} == {'Solar Storm', 'Power Surge'}
+    for invalido in ({'Solar Storm': 0}, {'Inexistente': 1}, {'Solar Storm': -1}, []):
+        try:
+            normalizar_perfil(invalido)
+            assert False, invalido
+        except ValueError:
+            pass
+
+    sala = {'id': 42, 'perfil_eventos_json': json.dumps(perfil)}
+    assert sorteador_da_sala(sala) is sorteador_da_sala(dict(sala))
+    editada = {'id': 42, 'perfil_eventos_json': json.dumps(PERFIL_PADRAO)}
+    assert sorteador_da_sala(editada).fracao('risco_avaria_modulo') == 0.2
+    anterior = sorteador_da_sala(editada)
+    invalidar_perfil(42)
+    assert sorteador_da_sala(editada) is not anterior
+
+    # Pelo id (feedback a cada clique): o banco só é lido fora do cache, com ou sem perfil
+    leituras = []
+    salas = {42: sala, 43: {'id': 43, 'perfil_eventos_json': None}}
+
+    def buscar(sala_id):
+        leituras.append(sala_id)
+        return salas[sala_id]
+    invalidar_perfil(42)
+    for _ in range(3):
+        assert sorteador_por_id(42, buscar).fracao('risco_avaria_modulo') == 0.7
+        assert sorteador_por_id(43, buscar) is sorteador_da_sala(None)
+    assert leituras == [42, 43]
+    invalidar_perfil(42)
+    sorteador_por_id(42, buscar)
+    assert leituras == [42, 43, 42]
+    print('✅ Perfis de eventos conferem')
+
+
+def test_viagem_reproduzivel():
+    """Mesma semente, regras e carregamento: mesmo diário e mesma pontuação."""
+    assert regras_da_versao(REGRAS.versao) is REGRAS
+    assert regras_da_versao('inexistente') is None
+    perfil = normalizar_perfil({'Solar Storm': 7, 'Micrometeoroid Impact': 2})
+    texto = perfil_compacto(SorteadorEventos(perfil))
+    assert sorteador_compacto(texto).perfil == perfil
+    assert perfil_compacto(SorteadorEventos(PERFIL_PADRAO)) == ''
+
+    regras = regras_para('marte')
+    nave = NAVES_ESPACIAIS['falcon9']
+    mascara = mascara_de(['suporte_vida', 'habitacional', 'medico', 'blindagem', 'controle'])
+    a = simular_viagem(regras, nave, mascara, 12345, sorteador_compacto(texto))
+    b = simular_viagem(regras, nave, mascara, 12345, sorteador_compacto(texto))
+    assert a['diario'] == b['diario'] and a['pontuacao'] == b['pontuacao']
+    assert a['estado'].avariados == b['estado'].avariados
+    assert len(a['diario']) == regras.turnos
+    c = simular_viagem(regras, nave, mascara, 54321, sorteador_compacto(texto))
+    assert c['diario'] != a['diario']
+
+    # Reprodução em cache e paginação do diário
+    r = reproduzir_viagem(REGRAS.versao, 'marte', 'falcon9', mascara, 12345, texto)
+    assert reproduzir_viagem(REGRAS.versao, 'marte', 'falcon9', mascara, 12345, texto) is r
+    assert list(r['diario']) == a['diario']
+    paginas = []
+    primeira, total_paginas = pagina_diario(r['diario'], 1, 7)
+    for p in range(1, total_paginas + 1):
+        paginas.extend(pagina_diario(r['diario'], p, 7)[0])
+    assert len(primeira) == 7 and paginas == list(r['diario'])
+    assert pagina_diario(r['diario'], total_paginas + 1, 7)[0] == ()
+    print('✅ Viagem reproduzível pela semente')
+
+
+def test_viagem_resistencia():
+    """Gerador com agregados: mesmo balanço e diário da simulação completa, em qualquer duração."""
+    regras = regras_para('lua')
+    nave = NAVES_ESPACIAIS['falcon9']
+    sorteador = sorteador_compacto('')
+    for semente in range(30):
+        mascara = mascara_de(random.Random(semente).sample(ORDEM_MODULOS, 4))
+        completa = simular_viagem(regras, nave, mascara, semente, sorteador, 400)
+        viagem = ViagemEmCurso(regras, nave, mascara, semente, sorteador, 400)
+        assert list(viagem) == completa['diario']
+        agregado = viagem.resultado()
+        assert agregado['balanco']['turnos_em_deficit'] == completa['balanco']['turnos_em_deficit']
+        assert agregado['pontuacao'] == completa['pontuacao']
+
+    # Acima do limite o diário não é guardado; páginas e retomada percorrem o gerador
+    turnos = LIMITE_DIARIO_EM_MEMORIA + 500
+    mascara = mascara_de(['suporte_vida', 'habitacional', 'controle'])
+    chave = (REGRAS.versao, 'lua', 'falcon9', mascara, 7, '', turnos)
+    r = reproduzir_viagem(*chave)
+    assert r['diario'] is None and r['total_turnos'] == turnos
+    diario = simular_viagem(regras, nave, mascara, 7, sorteador, turnos)['diario']
+    entradas, total_paginas = pagina_da_viagem(r, chave, 3, 50)
+    assert list(entradas) == diario[100:150] and total_paginas == turnos // 50
+    assert list(turnos_da_viagem(*chave, inicio=turnos - 5)) == diario[-5:]
+
+    # Pontos de retomada: partir do mais próximo dá os mesmos turnos e o mesmo resultado
+    pontos = {}
+    completa = ViagemEmCurso(regras, nave, mascara, 7, sorteador, turnos)
+    assert completa.avancar_ate(turnos, pontos) and list(pontos) == [TURNOS_POR_PONTO]
+    retomada = ViagemEmCurso(regras, nave, mascara, 7, sorteador, turnos).avancar_ate(turnos - 5, pontos)
+    assert list(retomada) == diario[-5:] and retomada.resultado()['pontuacao'] == r['pontuacao']
+    assert retomada.resultado()['balanco'] == r['balanco'] == completa.resultado()['balanco']
+
+    # Avarias na taxa da duração calibrada: um bom carregamento chega como no modo normal
+    mascara = mascara_de(['suporte_vida', 'habitacional'])
+    chegadas, chegadas_normais = 0, 0
+    for semente in range(20):
+        viagem = ViagemEmCurso(regras, nave, mascara, semente, sorteador, TURNOS_RESISTENCIA['lua'])
+        resultado = viagem.avancar_ate(viagem.total_turnos).resultado()
+        assert resultado['estado'].total_avariados <= len(viagem.ids_a_bordo)
+        chegadas += resultado['chegada_ok']
+        chegadas_normais += simular_viagem(regras, nave, mascara, semente, sorteador)['chegada_ok']
+    assert chegadas >= 14 and abs(chegadas - chegadas_normais) <= 4, (chegadas, chegadas_normais)
+
+    # Energia e água escaladas à duração: déficit na mesma proporção dos turnos que no modo normal
+    turnos = TURNOS_RESISTENCIA['lua']
+    for mascara in (mascara_de(['suporte_vida', 'habitacional']), mascara_de(ORDEM_MODULOS)):
+        for semente in range(3):
+            viagem = ViagemEmCurso(regras, nave, mascara, semente, sorteador, turnos)
+            longo = viagem.avancar_ate(turnos).resultado()['balanco']
+            normal = simular_viagem(regras, nave, mascara, semente, sorteador)['balanco']
+            proporcoes = (longo['turnos_em_deficit'] / turnos, normal['turnos_em_deficit'] / regras.turnos)
+            assert abs(proporcoes[0] - proporcoes[1]) < 0.1, proporcoes
+            assert longo['penalidade'] == normal['penalidade']
+    print(f'✅ Modo resistência em memória constante ({chegadas}/20 chegadas na Lua)')
+
+
+def main():
+    print('=== Testes dos perfis de eventos ===')
+    test_tabela_alias_exata()
+    test_perfis()
+    test_viagem_reproduzivel()
+    test_viagem_resistencia()
+    print('🎉 Perfis de eventos OK')
+
+
+if __name__ == '__main__':
+    main()
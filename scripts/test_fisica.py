@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Testes da física das naves (services/fisica.py): matriz nave × destino
+pré-calculada comparada com as funções de cálculo de referência, motor por
+estágios, transferências orbitais (services/trajetoria.py) e janelas de
+lançamento (services/janelas.py).
+"""
+
+import math
+import sys
+import os
+import tempfile
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.data import NAVES_ESPACIAIS
+from services.fisica import (
+    MATRIZ_VIABILIDADE, DESTINOS, REQUISITOS_DELTA_V, calcular_delta_v,
+    calcular_carga_maxima_para_destino, calcular_distancia_maxima_sem_carga
+)
+from services.regras import capacidade_kg
+from services.estagios import VeiculoEstagiado, desempenho_frota
+from services.trajetoria import TRANSFERENCIAS, trajetoria, posicao_turno, grafico_trajetoria, MU_SOL, UA_KM
+import services.cache
+from services.janelas import (
+    lambert, calcular_grade, grade_janelas, dentro_das_efemerides, recorte_da_padrao, _serializar, _desserializar
+)
+from datetime import date
+
+
+def test_funcoes_de_referencia():
+    # Tsiolkovsky: razão de massas e ⇒ Δv = Isp·g0
+    assert abs(calcular_delta_v(1.0, 1.718281828, 300) - 300 * 9.81) < 0.01
+    nave = {'delta_v_total': 20000, 'capacidade_carga': 2.0}
+    assert calcular_distancia_maxima_sem_carga(nave, 'lua') > 384400
+    assert calcular_carga_maxima_para_destino(nave, 'lua') == 2000
+    print('✅ Funções de referência conferem')
+
+
+def test_matriz():
+    for nave_id, nave in NAVES_ESPACIAIS.items():
+        for destino in DESTINOS:
+            linha = MATRIZ_VIABILIDADE[nave_id][destino]
+            assert abs(linha['carga_maxima_kg'] - calcular_carga_maxima_para_destino(nave, destino)) < 0.1
+            assert linha['margem_delta_v'] == nave['delta_v_total'] - REQUISITOS_DELTA_V[destino]
+            assert capacidade_kg(nave, destino) == linha['carga_maxima_kg'] <= capacidade_kg(nave)
+        cargas = [MATRIZ_VIABILIDADE[nave_id][d]['carga_maxima_kg'] for d in ('lua', 'marte', 'exoplaneta')]
+        assert cargas == sorted(cargas, reverse=True)
+    print('✅ Matriz nave × destino confere')
+
+
+def test_estagios():
+    # Um estágio só: igual à fórmula de Tsiolkovsky de referência
+    unico = VeiculoEstagiado([{'nome': 'S1', 'massa_seca': 2.0, 'massa_combustivel': 8.0, 'impulso_especifico': 300, 'empuxo': 200}])
+    assert abs(unico.delta_v_estagios(0)[0] - calcular_delta_v(2.0, 8.0, 300)) < 1e-6
+
+    versao, frota, _ = desempenho_frota()
+    assert desempenho_frota()[1] is frota  # cache por versão do catálogo
+    for nave_id, dados in frota.items():
+        nave = NAVES_ESPACIAIS[nave_id]
+        # Valores arredondados ao m/s
+        assert abs(dados['delta_v_util'] - (dados['delta_v_ideal'] - dados['perdas_gravidade'])) <= 1
+        assert abs(sum(e['delta_v'] for e in dados['estagios']) - dados['delta_v_ideal']) <= len(dados['estagios'])
+        curva = dados['curva']['delta_v_ideal']
+        assert curva == sorted(curva, reverse=True) and curva[0] > dados['delta_v_ideal'] > curva[-1]
+        assert dados['decola'] and dados['carga_max_decolagem_kg'] > nave['capacidade_carga'] * 1000
+    print('✅ Motor por estágios confere')
+
+
+def test_trajetoria():
+    """Hohmann chega ao raio de destino a ~180° no tempo analítico."""
+    for destino in ('lua', 'marte'):
+        dados = TRANSFERENCIAS[destino]
+        traj = trajetoria(destino)
+        a = (dados['raio_origem_km'] + dados['raio_destino_km']) / 2
+        duracao = math.pi * math.sqrt(a ** 3 / dados['mu'])
+        assert abs(traj['tempos'][-1] - duracao) < 1e-6 * duracao
+        raio = math.hypot(traj['xs'][-1], traj['ys'][-1])
+        assert abs(raio - dados['raio_destino_km']) < 1e-3 * dados['raio_destino_km'], (destino, raio)
+        assert traj['xs'][-1] < 0 and abs(traj['ys'][-1]) < 0.02 * raio
+        assert trajetoria(destino) is traj  # cache por destino
+    escape = trajetoria('exoplaneta')
+    assert math.hypot(escape['xs'][-1], escape['ys'][-1]) >= TRANSFERENCIAS['exoplaneta']['raio_destino_km']
+
+    distancias = [posicao_turno('marte', turno, 60)['distancia_km'] for turno in range(1, 61)]
+    assert distancias == sorted(distancias)  # do periélio ao afélio, sempre se afastando
+    assert grafico_trajetoria('lua')['caminho'].count(' ') > 10
+    print('✅ Transferências orbitais conferem')
+
+
+def test_janelas():
+    """Lambert reproduz a Hohmann; a grade sobrevive ao formato binário."""
+    r1, r2 = UA_KM, 1.524 * UA_KM
+    a = (r1 + r2) / 2
+    angulo = math.radians(179.99)
+    v1, _ = lambert(MU_SOL, (r1, 0.0), (r2 * math.cos(angulo), r2 * math.sin(angulo)),
+                    math.pi * math.sqrt(a ** 3 / MU_SOL))
+    assert abs(math.hypot(*v1) - math.sqrt(MU_SOL * (2 / r1 - 1 / a))) < 1e-3
+
+    partidas, chegadas, c3, delta_v = calcular_grade('marte', date(2026, 10, 1), 60, date(2027, 6, 1), 120, 20)
+    assert len(c3) == len(partidas) * len(chegadas)
+    validos = [v for v in c3 if not math.isnan(v)]
+    assert validos and 5 < min(validos) < 20  # janela de 2026: C3 típico ~9 km²/s²
+    lido = _desserializar(_serializar(len(partidas), len(chegadas), c3, delta_v), len(partidas), len(chegadas))
+    assert lido is not None and lido[1].tobytes() == delta_v.tobytes()
+
+    # Caso trivial da Lua: o custo depende só do tempo de voo
+    _, _, _, lua = calcular_grade('lua', date(2026, 11, 1), 3, date(2026, 11, 1), 10, 1)
+    linhas = [list(lua[i:i + 11]) for i in range(0, len(lua), 11)]
+    assert abs(linhas[0][5] - linhas[1][6]) < 1 and abs(linhas[1][6] - linhas[3][8]) < 1
+
+    # Recortes da grade padrão saem dela sem solver e conferem com o cálculo direto
+    recorte = (date(2026, 8, 11), 60, date(2027, 2, 10), 120, 20)
+    assert recorte_da_padrao('marte', *recorte)
+    assert not recorte_da_padrao('marte', date(2026, 8, 12), 60, date(2027, 2, 10), 120, 20)
+    assert not recorte_da_padrao('marte', date(2026, 8, 11), 60, date(2027, 2, 10), 120, 7)
+    assert not recorte_da_padrao('marte', date(2026, 7, 27), 60, date(2027, 2, 10), 120, 20)
+    _, _, _, direto = calcular_grade('marte', *recorte)
+    assert grade_janelas('marte', *recorte)['delta_v'] == [
+        [None if math.isnan(v) else round(v) for v in direto[i:i + 7]] for i in range(0, len(direto), 7)
+    ]
+
+    # Intervalos personalizados não vão para o disco; datas fora das efemérides são recusadas
+    with tempfile.TemporaryDirectory() as pasta:
+        services.cache.DIRETORIO_CACHE, anterior = pasta, services.cache.DIRETORIO_CACHE
+        try:
+            assert not recorte_da_padrao('lua', date(2026, 10, 30), 2, date(2026, 11, 3), 4, 1)
+            assert grade_janelas('lua', date(2026, 10, 30), 2, date(2026, 11, 3), 4, 1)['melhor']
+            assert os.listdir(pasta) == []
+        finally:
+            services.cache.DIRETORIO_CACHE = anterior
+    assert dentro_das_efemerides(date(2026, 8, 1), 180, date(2027, 1, 1), 360)
+    assert not dentro_das_efemerides(date(9999, 12, 1), 100, date(2027, 1, 1), 10)
+    assert not dentro_das_efemerides(date(2026, 8, 1), 10, date(1700, 1, 1), 10)
+    print('✅ Janelas de lançamento conferem')
+
+
+def main():
+    print('=== Testes da física das naves ===')
+    test_funcoes_de_referencia()
+    test_matriz()
+    test_estagios()
+    test_trajetoria()
+    test_janelas()
+    print('🎉 Física das naves OK')
+
+
+if __name__ == '__main__':
+    main()
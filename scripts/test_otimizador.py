@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Testes das análises de carregamento: solver de referência (services/otimizador.py)
+e contribuições por módulo (services/contribuicoes.py), comparados com força bruta,
+e previsão (services/probabilidades.py) comparada com viagens simuladas.
+"""
+
+import sys
+import os
+from itertools import combinations
+from math import factorial
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.otimizador import calcular_fronteira, _solucao
+from services.contribuicoes import contribuicoes
+from services.probabilidades import prever
+from services.regras import regras_para, mascara_de, MASCARA_TOTAL, capacidade_kg
+from services.simulacao import simular_viagem, sorteador_compacto
+from services.data import NAVES_ESPACIAIS
+
+
+def _objetivos(s):
+    return (s['pontuacao_esperada'], s['massa'], s['energia'], s['agua'])
+
+
+def test_fronteira_exata():
+    """Fronteira por branch-and-bound igual à da força bruta (Marte, 2500 kg)."""
+    regras = regras_para('marte')
+    fronteira = calcular_fronteira(regras, 2500)
+    todas = sorted(
+        (_solucao(regras, m, 2500) for m in range(1, MASCARA_TOTAL + 1)),
+        key=lambda s: (-s['pontuacao_esperada'], s['massa'], s['energia'], s['agua'])
+    )
+    esperada = []
+    for s in todas:
+        if not any(f['massa'] <= s['massa'] and f['energia'] <= s['energia'] and f['agua'] <= s['agua'] for f in esperada):
+            esperada.append(s)
+    assert sorted(map(_objetivos, fronteira)) == sorted(map(_objetivos, esperada))
+    print(f'✅ Fronteira exata ({len(fronteira)} soluções)')
+
+
+def test_contribuicoes_shapley():
+    """Valores de Shapley agregados iguais à enumeração das coalizões."""
+    ids = ['suporte_vida', 'habitacional', 'medico', 'impressao3d', 'lazer', 'armazenamento']
+    regras = regras_para('marte')
+    capacidade = capacidade_kg(NAVES_ESPACIAIS['gslv'], 'marte')
+    resultado = contribuicoes('marte', 'gslv', mascara_de(ids))
+    n = len(ids)
+    for c in resultado['modulos']:
+        outros = [m for m in ids if m != c['id']]
+        phi = 0.0
+        for k in range(n):
+            peso = factorial(k) * factorial(n - k - 1) / factorial(n)
+            for coalizao in combinations(outros, k):
+                sem = mascara_de(coalizao)
+                com = sem | mascara_de([c['id']])
+                phi += peso * (prever(regras, com, capacidade)['pontuacao_esperada'] - prever(regras, sem, capacidade)['pontuacao_esperada'])
+        assert abs(phi - c['pontos']) < 0.01, (c['id'], phi, c['pontos'])
+    # Eficiência: contribuições somam total - base
+    soma = sum(c['pontos'] for c in resultado['modulos'])
+    assert abs(soma - (resultado['total']['pontos'] - resultado['base']['pontos'])) < 0.05
+    print('✅ Contribuições (Shapley) exatas')
+
+
+def test_previsao_com_recursos():
+    """Pontuação esperada acompanha a média simulada, inclusive a penalidade de água e energia.
+
+    No exoplaneta só com os essenciais a água acaba; com o sanitário ela
+    dura a viagem toda, e a previsão deve ordenar os dois como a simulação.
+    """
+    regras = regras_para('exoplaneta')
+    nave = NAVES_ESPACIAIS['falcon9']
+    capacidade = capacidade_kg(nave, 'exoplaneta')
+    essenciais = regras.mascara_essenciais
+    medias = {}
+    for mascara in (essenciais, essenciais | mascara_de(['sanitario'])):
+        pontos = [
+            simular_viagem(regras, nave, mascara, semente, sorteador_compacto(''))['pontuacao']
+            for semente in range(150)
+        ]
+        simulada = sum(pontos) / len(pontos)
+        prevista = prever(regras, mascara, capacidade)['pontuacao_esperada']
+        assert abs(prevista - simulada) < 3, (mascara, prevista, simulada)
+        medias[mascara] = prevista
+    assert medias[essenciais | mascara_de(['sanitario'])] > medias[essenciais] + 10
+    assert 'sanitario' in calcular_fronteira(regras, capacidade)[0]['modulos']
+    print('✅ Previsão com penalidade de recursos igual à simulação')
+
+
+def main():
+    print('=== Testes das análises de carregamento ===')
+    test_fronteira_exata()
+    test_contribuicoes_shapley()
+    test_previsao_com_recursos()
+    print('🎉 Análises de carregamento OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Testes do motor de regras compilado (services/regras.py).
+Verifica máscaras de módulos, diagnóstico de essenciais, pontuação por destino
+o feedback instantâneo da tela de seleção (services/feedback.py) e a
+calibração de dificuldade (services/calibracao.py).
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.regras import (
+    regras_para, mascara_de, ids_de, MASSA, MASCARA_TOTAL, RegrasCompiladas, carregar_regras
+)
+from services.data import MODULOS_HABITAT, REGRAS_MISSAO
+from services.calibracao import calibrar_destino, gravar_calibracao
+from services.feedback import feedback_carregamento
+from services.estado_viagem import EstadoModulos
+from services.fisica import viabilidade
+from services.recursos import balanco_recursos, tabela_consumo, EFEITOS
+
+
+def test_mascaras_e_massa():
+    """Máscara ida-e-volta e soma de massa por tabela."""
+    ids = ['suporte_vida', 'medico', 'impressao3d']
+    mascara = mascara_de(ids + ['inexistente'])
+    assert ids_de(mascara) == ids
+    assert MASSA(mascara) == sum(MODULOS_HABITAT[i]['massa'] for i in ids)
+    assert MASSA(MASCARA_TOTAL) == sum(m['massa'] for m in MODULOS_HABITAT.values())
+    print('✅ Máscaras e massa conferem')
+
+
+def test_essenciais_faltantes():
+    """Diagnóstico de essenciais ausentes por destino."""
+    regras = regras_para('exoplaneta')
+    faltantes = ids_de(regras.faltantes(mascara_de(['suporte_vida', 'habitacional'])))
+    assert faltantes == ['blindagem', 'hidroponia', 'controle']
+    assert regras_para('destino_desconhecido').destino == 'lua'
+    print('✅ Essenciais faltantes conferem')
+
+
+def test_pontuacao_lua():
+    """Lua: essenciais presentes e carga na faixa ideal chegam ao destino."""
+    # Regras declaradas (sem a calibração do arquivo de regras)
+    regras = RegrasCompiladas(REGRAS_MISSAO)['lua']
+    mascara = mascara_de(['suporte_vida', 'habitacional'])
+    # 1000 kg em 1500 kg de capacidade: razão 0.67 (faixa ideal, +20)
+    chegou, pontos, massa, capacidade = regras.avaliar(mascara, 1500)
+    assert (chegou, pontos, massa, capacidade) == (True, 50 + 40 + 20, 1000, 1500)
+    # Sobrecarga acima de 120% bloqueia a chegada e penaliza a pontuação
+    chegou, pontos, _, _ = regras.avaliar(mascara, 800, avariados=1)
+    assert not chegou and pontos == 50 + 40 - 60 - 8
+    print('✅ Pontuação lunar confere')
+
+
+def test_feedback_carregamento():
+    """Feedback da seleção: faltantes, razão de capacidade e faixa de pontuação."""
+    feedback = feedback_carregamento('marte', 'gslv', mascara_de(['suporte_vida', 'habitacional']))
+    # Capacidade para Marte (não a nominal de 2500 kg): delta-v da GSLV cobre ~70% do trajeto
+    capacidade = viabilidade('gslv', 'marte')['carga_maxima_kg']
+    assert feedback['massa'] == 1000 and feedback['capacidade_kg'] == capacidade < 2500
+    assert feedback['razao_capacidade'] == round(1000 / capacidade, 3) and not feedback['na_faixa_ideal']
+    assert [f['id'] for f in feedback['faltantes']] == ['medico']
+    p = feedback['pontuacao']
+    assert p['min'] <= p['esperada'] <= p['max'] == 120 + 40 - 25
+    assert 0.0 < feedback['probabilidade_sucesso'] < 1.0
+    assert feedback_carregamento('marte', 'nave_inexistente', 0) is None
+    print('✅ Feedback da seleção confere')
+
+
+def test_calibracao():
+    """Calibração atinge a meta e a versão gravada é aplicada ao carregar as regras."""
+    parametros, taxa, avaliadas = calibrar_destino('marte', 0.5)
+    assert abs(taxa - 0.5) <= 0.02 and avaliadas > 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'regras.json')
+        versao = gravar_calibracao({'marte': parametros}, {'marte': 0.5}, {'marte': taxa}, caminho)
+        with open(caminho, encoding='utf-8') as f:
+            assert json.load(f)['versao_atual'] == versao
+        dados = carregar_regras(caminho)
+        assert dados['marte']['tolerancia_avarias'] == parametros['tolerancia_avarias']
+        assert dados['lua'] == REGRAS_MISSAO['lua']
+        assert carregar_regras(os.path.join(tmp, 'inexistente.json')) == REGRAS_MISSAO
+    print('✅ Calibração confere')
+
+
+def test_catalogo_imutavel():
+    modulo = MODULOS_HABITAT['suporte_vida']
+    for alteracao in (lambda: MODULOS_HABITAT.__setitem__('x', modulo),
+                      lambda: setattr(modulo, 'status', 'Avariado'),
+                      lambda: setattr(modulo, 'massa', 0)):
+        try:
+            alteracao()
+        except (TypeError, AttributeError):
+            continue
+        raise AssertionError('Catálogo deveria ser somente leitura')
+    assert modulo['massa'] == modulo.massa == modulo.get('massa')
+
+    estado = EstadoModulos(mascara_de(['suporte_vida', 'habitacional']))
+    estado.avariar('suporte_vida')
+    estado.avariar('lazer')  # fora da carga: ignorado
+    assert estado.total_avariados == 1
+    assert [s for _, _, s in estado.itens()] == ['Avariado', 'Operacional']
+    assert EstadoModulos.de_dict(estado.como_dict()).avariados == estado.avariados
+    assert 'status' not in modulo and EstadoModulos(estado.a_bordo).total_avariados == 0
+    print('✅ Catálogo imutável e avarias por viagem conferem')
+
+
+def test_balanco_recursos():
+    import random
+    rng = random.Random(7)
+    regras = regras_para('exoplaneta')
+    for ids in (['suporte_vida', 'habitacional', 'blindagem', 'controle', 'hidroponia', 'sanitario'],
+                list(MODULOS_HABITAT)):
+        mascara = mascara_de(ids)
+        efeitos = [rng.choice(EFEITOS) for _ in range(regras.turnos)]
+        balanco = balanco_recursos(regras, mascara, efeitos)
+
+        # Referência: laço turno a turno
+        saldo, consumo = tabela_consumo(regras, mascara)
+        energia, agua = [regras.recursos['bateria']], [regras.recursos['agua_inicial']]
+        for efeito in efeitos:
+            energia.append(min(regras.recursos['bateria'], energia[-1] + saldo[efeito]))
+            agua.append(agua[-1] - consumo[efeito])
+        deficit = sum(1 for e, a in zip(energia[1:], agua[1:]) if e < 0 or a < 0)
+        assert balanco['turnos_em_deficit'] == deficit
+        assert all(abs(x - y) < 1e-6 for x, y in zip(balanco['energia'], energia))
+        assert all(abs(x - y) < 1e-6 for x, y in zip(balanco['agua'], agua))
+    assert balanco['penalidade'] == regras.recursos['penal_max_deficit']  # todos os módulos: déficit constante
+    print('✅ Balanço de recursos confere')
+
+
+def main():
+    print('=== Testes do motor de regras ===')
+    test_mascaras_e_massa()
+    test_essenciais_faltantes()
+    test_pontuacao_lua()
+    test_feedback_carregamento()
+    test_calibracao()
+    test_catalogo_imutavel()
+    test_balanco_recursos()
+    print('🎉 Regras da missão OK')
+
+
+if __name__ == '__main__':
+    main()
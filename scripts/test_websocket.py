@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Testes do servidor WebSocket (websocket_server.py): bilhetes assinados
+(services/bilhetes.py), transmissão da viagem regenerada no servidor e
+canais por sala (services/canais.py) alimentados pelo log do SQLite,
+retomada após reconexão (services/sessoes.py), ritmos de transmissão
+(services/ritmos.py), quadros binários negociados (services/protocolo.py), ranking ao vivo por deltas versionados (services/placar.py) e filas de
+saída com coalescência e desconexão de consumidores lentos (services/filas.py)
+e vários processos ligados pelo broker local (services/broker.py), além do
+ponto de entrada ASGI de processo único (asgi.py, se a2wsgi e uvicorn estão
+instalados). O servidor sobe em uma porta livre dentro do próprio processo.
+"""
+
+import asyncio
+import json
+import sys
+import os
+import socket
+import subprocess
+import tempfile
+import time
+import urllib.request
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+import websocket_server
+from services.bilhetes import emitir_bilhete, ler_bilhete, emitir_acesso, ler_acesso
+from services.broker import ClienteBroker, HubCanais
+from services.canais import Canais, canal_sala, CANAL_PROFESSORES, CANAL_RANKING
+from services.placar import PlacarAoVivo
+from services.filas import FilaEnvio, MetricasEnvio
+from services.sessoes import SessoesViagem
+from services.ritmos import perfil_ritmo, nome_ritmo, RITMOS
+from services.protocolo import codificar_turnos, decodificar_turnos
+from services.db import DatabaseManager
+from services.regras import REGRAS, mascara_de
+from services.simulacao import reproduzir_viagem
+
+
+CHAVE = (REGRAS.versao, 'marte', 'falcon9', mascara_de(['suporte_vida', 'habitacional', 'controle']), 99, '', None)
+
+
+def test_bilhetes():
+    bilhete = emitir_bilhete(CHAVE, 7, 3, 2)
+    dados = ler_bilhete(bilhete)
+    assert dados == {'chave': CHAVE, 'viagem_id': 7, 'aluno_id': 3, 'sala_id': 2, 'ritmo': None}
+    assert ler_bilhete(emitir_bilhete(CHAVE, ritmo='acelerado'))['ritmo'] == 'acelerado'
+    assert ler_bilhete(bilhete[:-2] + ('A' if bilhete[-2] != 'A' else 'B') + bilhete[-1]) is None
+    assert ler_bilhete(emitir_bilhete(CHAVE, segredo='outra-chave')) is None
+    assert ler_bilhete(bilhete, validade=-1) is None
+    assert ler_bilhete(None) is None and ler_bilhete('') is None
+    assert ler_acesso(emitir_acesso(['sala:2', CANAL_PROFESSORES])) == [CANAL_PROFESSORES, 'sala:2']
+    assert ler_acesso(bilhete) == [] and ler_acesso(emitir_acesso(['sala:2'], segredo='outra')) == []
+    print('✅ Bilhetes assinados')
+
+
+async def _transmissao():
+    websocket_server.INTERVALO_TURNOS = 0
+    async with websockets.serve(websocket_server.handler, '127.0.0.1', 0) as servidor:
+        porta = servidor.sockets[0].getsockname()[1]
+        async with websockets.connect(f'ws://127.0.0.1:{porta}/ws') as ws:
+            await ws.send(json.dumps({'action': 'start_trip', 'ticket': 'adulterado'}))
+            assert json.loads(await ws.recv())['type'] == 'error'
+
+            await ws.send(json.dumps({'action': 'start_trip', 'ticket': emitir_bilhete(CHAVE, 7)}))
+            mensagens = []
+            while not mensagens or mensagens[-1]['type'] != 'trip_complete':
+                mensagens.append(json.loads(await asyncio.wait_for(ws.recv(), 5)))
+    return mensagens
+
+
+def test_transmissao():
+    mensagens = asyncio.run(_transmissao())
+    resultado = reproduzir_viagem(*CHAVE)
+    assert mensagens[0] == {
+        'type': 'trip_start', 'viagem_id': 7, 'total_turnos': resultado['total_turnos'], 'desde': 0,
+    }
+    eventos = [m['data'] for m in mensagens[1:-1]]
+    assert [(e['turno'], e['nome']) for e in eventos] == [
+        (d['turno'], d['evento']['nome']) for d in resultado['diario']
+    ]
+    assert mensagens[-1]['pontuacao'] == int(resultado['pontuacao'])
+    print('✅ Viagem transmitida pelo servidor')
+
+
+async def _retomada():
+    websocket_server.INTERVALO_TURNOS = 0.5
+    bilhete = emitir_bilhete(CHAVE, 8)
+    async with websockets.serve(websocket_server.handler, '127.0.0.1', 0) as servidor:
+        url = f'ws://127.0.0.1:{servidor.sockets[0].getsockname()[1]}/ws'
+        async with websockets.connect(url, max_queue=None) as ws:
+            await ws.send(json.dumps({'action': 'start_trip', 'ticket': bilhete}))
+            assert json.loads(await ws.recv())['type'] == 'trip_start'
+            primeiro = json.loads(await asyncio.wait_for(ws.recv(), 5))['data']['turno']
+        # Queda da rede: o ritmo da sessão sobrevive à mudança do padrão do servidor
+        websocket_server.INTERVALO_TURNOS = 0
+        async with websockets.connect(url, max_queue=None) as ws:
+            await ws.send(json.dumps({'action': 'resume_trip', 'ticket': bilhete, 'desde': primeiro}))
+            inicio = json.loads(await asyncio.wait_for(ws.recv(), 5))
+            sessao = websocket_server.sessoes.sessoes[('viagem', 8)]
+            assert sessao.ritmo.intervalo == 0.5
+            sessao.definir_ritmo(websocket_server.ritmo_de('tempo_real'))
+            mensagens = []
+            while not mensagens or mensagens[-1]['type'] != 'trip_complete':
+                mensagens.append(json.loads(await asyncio.wait_for(ws.recv(), 5)))
+            # Sem `desde`, a retomada usa o cursor da sessão (aqui, a viagem já concluída)
+            await ws.send(json.dumps({'action': 'resume_trip', 'ticket': bilhete}))
+            final = [json.loads(await asyncio.wait_for(ws.recv(), 5)) for _ in range(2)]
+        # Reconexão em outro processo (sessão desconhecida): o ritmo enviado pelo cliente vale
+        websocket_server.sessoes.sessoes.clear()
+        async with websockets.connect(url, max_queue=None) as ws:
+            await ws.send(json.dumps({'action': 'resume_trip', 'ticket': bilhete, 'desde': primeiro, 'pace': 'acelerado'}))
+            await asyncio.wait_for(ws.recv(), 5)
+            lote = json.loads(await asyncio.wait_for(ws.recv(), 5))
+            assert websocket_server.sessoes.sessoes[('viagem', 8)].ritmo.nome == 'acelerado'
+    assert lote['type'] == 'trip_events' and lote['data'][0]['turno'] == primeiro + 1
+    return primeiro, inicio, mensagens, final
+
+
+def test_retomada():
+    primeiro, inicio, mensagens, final = asyncio.run(_retomada())
+    resultado = reproduzir_viagem(*CHAVE)
+    total = resultado['total_turnos']
+    assert inicio == {'type': 'trip_start', 'viagem_id': 8, 'total_turnos': total, 'desde': primeiro}
+    assert [m['data']['turno'] for m in mensagens[:-1]] == [
+        d['turno'] for d in resultado['diario'] if d['turno'] > primeiro
+    ]
+    assert mensagens[-1]['type'] == 'trip_complete'
+    assert final[0]['desde'] == total and final[1]['type'] == 'trip_complete'
+
+    sessoes = SessoesViagem(validade=0)
+    dados = ler_bilhete(emitir_bilhete(CHAVE, 9))
+    sessao = sessoes.abrir(dados, perfil_ritmo('tempo_real', 2))
+    sessao.avancar(5)
+    assert sessoes.retomar(dados, None) is sessao and sessao.cursor == 5 and sessao.ritmo.intervalo == 2
+    outra = sessoes.retomar(ler_bilhete(emitir_bilhete(CHAVE[:4] + (100,) + CHAVE[5:], 9)), None)
+    assert outra is not sessao and outra.cursor == 0
+    time.sleep(0.01)
+    assert sessoes.limpar() == 1 and not sessoes.sessoes
+    print('✅ Viagem retomada após reconexão')
+
+
+async def _ritmos():
+    websocket_server.INTERVALO_TURNOS = 0.5
+    async with websockets.serve(websocket_server.handler, '127.0.0.1', 0) as servidor:
+        url = f'ws://127.0.0.1:{servidor.sockets[0].getsockname()[1]}/ws'
+        quadros = {}
+        async with websockets.connect(url, max_queue=None) as ws:
+            # Ritmo da sala (no bilhete) e ritmo pedido pelo cliente
+            for viagem_id, ritmo_sala, pedido in ((10, 'acelerado', None), (11, 'acelerado', 'instantaneo')):
+                await ws.send(json.dumps({
+                    'action': 'start_trip', 'ticket': emitir_bilhete(CHAVE, viagem_id, ritmo=ritmo_sala), 'pace': pedido,
+                }))
+                mensagens = []
+                while not mensagens or mensagens[-1]['type'] != 'trip_complete':
+                    mensagens.append(json.loads(await asyncio.wait_for(ws.recv(), 10)))
+                quadros[viagem_id] = mensagens
+
+            # Avanço rápido: do tempo real ao instantâneo no meio da transmissão
+            bilhete = emitir_bilhete(CHAVE, 12)
+            await ws.send(json.dumps({'action': 'start_trip', 'ticket': bilhete}))
+            mensagens = [json.loads(await ws.recv()), json.loads(await asyncio.wait_for(ws.recv(), 5))]
+            inicio = time.perf_counter()
+            await ws.send(json.dumps({'action': 'set_pace', 'ticket': bilhete, 'pace': 'instantaneo'}))
+            while mensagens[-1]['type'] != 'trip_complete':
+                mensagens.append(json.loads(await asyncio.wait_for(ws.recv(), 5)))
+            quadros[12] = mensagens
+            avanco = time.perf_counter() - inicio
+
+            await ws.send(json.dumps({'action': 'set_pace', 'ticket': emitir_bilhete(CHAVE, 13), 'pace': 'acelerado'}))
+            assert json.loads(await asyncio.wait_for(ws.recv(), 5))['type'] == 'error'
+    return quadros, avanco
+
+
+def test_ritmos():
+    assert nome_ritmo('turbo') == 'tempo_real' and perfil_ritmo(None, 2).intervalo == 2
+    assert perfil_ritmo('instantaneo', 2) == RITMOS['instantaneo']
+    quadros, avanco = asyncio.run(_ritmos())
+    turnos_esperados = [d['turno'] for d in reproduzir_viagem(*CHAVE)['diario']]
+
+    def turnos(mensagens):
+        recebidos = []
+        for m in mensagens:
+            if m['type'] == 'trip_event':
+                recebidos.append(m['data']['turno'])
+            elif m['type'] == 'trip_events':
+                recebidos.extend(e['turno'] for e in m['data'])
+        return recebidos
+
+    lotes = [len(m['data']) for m in quadros[10] if m['type'] == 'trip_events']
+    assert lotes and max(lotes) == RITMOS['acelerado'].turnos_por_quadro
+    assert len(quadros[11]) == 2 + -(-len(turnos_esperados) // RITMOS['instantaneo'].turnos_por_quadro)
+    assert quadros[12][1]['type'] == 'trip_event' and quadros[12][-2]['type'] == 'trip_events'
+    for mensagens in quadros.values():
+        assert turnos(mensagens) == turnos_esperados
+    assert avanco < 0.4, avanco
+    print(f'✅ Ritmos de transmissão (avanço rápido em {avanco * 1000:.0f} ms)')
+
+
+async def _binario():
+    websocket_server.INTERVALO_TURNOS = 0
+    bilhete = emitir_bilhete(CHAVE, 14)
+    async with websockets.serve(websocket_server.handler, '127.0.0.1', 0) as servidor:
+        url = f'ws://127.0.0.1:{servidor.sockets[0].getsockname()[1]}/ws'
+        recebidas = {}
+        for formato in ('json', 'binario'):
+            async with websockets.connect(url, max_queue=None) as ws:
+                await ws.send(json.dumps({'action': 'hello', 'formato': formato, 'versao': 1}))
+                await ws.send(json.dumps({'action': 'start_trip', 'ticket': bilhete}))
+                mensagens = []
+                while not mensagens or mensagens[-1] != 'fim':
+                    m = await asyncio.wait_for(ws.recv(), 5)
+                    mensagens.append('fim' if isinstance(m, str) and '"trip_complete"' in m else m)
+                recebidas[formato] = mensagens[:-1]
+    return recebidas
+
+
+def test_binario():
+    recebidas = asyncio.run(_binario())
+    esperados = [websocket_server.evento_publico(e) for e in reproduzir_viagem(*CHAVE)['diario']]
+
+    # Sem negociação (formato desconhecido): JSON, como os clientes antigos
+    eventos_json = [json.loads(m) for m in recebidas['json'][1:]]
+    assert [m['data'] for m in eventos_json] == esperados
+
+    tabelas, inicio, *quadros = recebidas['binario']
+    assert json.loads(tabelas)['type'] == 'tables' and json.loads(inicio)['type'] == 'trip_start'
+    assert all(isinstance(q, bytes) for q in quadros)
+    assert [e for q in quadros for e in decodificar_turnos(q)] == esperados
+    bytes_json = sum(len(m.encode()) for m in recebidas['json'][1:])
+    bytes_binario = sum(len(q) for q in quadros)
+    assert bytes_json >= 10 * bytes_binario, (bytes_json, bytes_binario)
+
+    # Turnos fora das tabelas não são codificados (seguem em JSON)
+    assert codificar_turnos([{'turno': 1, 'evento': {'nome': 'Unknown', 'descricao': '', 'efeito': 'nenhum'}}]) is None
+    print(f'✅ Quadros binários: {bytes_json} → {bytes_binario} bytes por viagem (+{len(tabelas.encode())} de tabelas por conexão)')
+
+
+def test_canais():
+    """Uma serialização por mensagem, entregue à união dos assinantes."""
+    entregas = []
+    canais = Canais(lambda conexoes, texto, chave, descartavel: entregas.append((set(conexoes), texto)))
+    canais.assinar('a', 'sala:1')
+    canais.assinar('b', 'sala:1')
+    canais.assinar('p', CANAL_PROFESSORES)
+    canais.assinar('p', 'sala:1')
+    assert canais.publicar({'type': 'x'}, 'sala:1', CANAL_PROFESSORES) == 3
+    assert entregas == [({'a', 'b', 'p'}, '{"type": "x"}')]
+    assert canais.publicar({'type': 'x'}, 'sala:9') == 0 and len(entregas) == 1
+    canais.cancelar('p')
+    assert canais.publicar('{}', CANAL_PROFESSORES) == 0 and CANAL_PROFESSORES not in canais.assinantes
+    print('✅ Canais com difusão única')
+
+
+async def _broker(endereco):
+    hub = await HubCanais(endereco).iniciar()
+    entregas = {'a': [], 'b': []}
+    processos = {}
+    for nome in entregas:
+        canais = Canais(lambda conexoes, texto, chave, descartavel, nome=nome: entregas[nome].append((set(conexoes), texto)))
+        cliente = await ClienteBroker(endereco, canais.entregar).conectar()
+        canais.ponte = cliente.enviar
+        processos[nome] = (canais, cliente, asyncio.create_task(cliente.receber()))
+    canais_a, canais_b = processos['a'][0], processos['b'][0]
+    canais_a.assinar('a1', 'sala:1')
+    canais_b.assinar('b1', 'sala:1')
+    canais_b.assinar('b2', 'sala:2')
+    # Sem assinantes locais, a mensagem propagada ainda segue pelo hub
+    assert canais_b.publicar({'type': 'p'}, 'sala:1', propagar=True) == 1
+    canais_a.publicar({'type': 'p'}, 'sala:2', propagar=True)
+    canais_a.publicar({'type': 'local'}, 'sala:1')
+    for _ in range(100):
+        if len(entregas['a']) == 2 and len(entregas['b']) == 2:
+            break
+        await asyncio.sleep(0.01)
+    for _, cliente, tarefa in processos.values():
+        tarefa.cancel()
+        cliente.writer.close()
+    await hub.fechar()
+    return entregas, hub.repassadas
+
+
+def test_broker():
+    with tempfile.TemporaryDirectory() as pasta:
+        endereco = os.path.join(pasta, 'hub.sock') if hasattr(socket, 'AF_UNIX') and os.name != 'nt' else 'tcp:127.0.0.1:0'
+        if endereco.startswith('tcp:'):
+            with socket.socket() as s:
+                s.bind(('127.0.0.1', 0))
+                endereco = f'tcp:127.0.0.1:{s.getsockname()[1]}'
+        entregas, repassadas = asyncio.run(_broker(endereco))
+    assert entregas['a'] == [({'a1'}, '{"type": "local"}'), ({'a1'}, '{"type": "p"}')]
+    assert entregas['b'] == [({'b1'}, '{"type": "p"}'), ({'b2'}, '{"type": "p"}')]
+    assert repassadas == 2
+    print('✅ Broker entre processos')
+
+
+async def _varios_processos(porta, sala_id):
+    url = f'ws://127.0.0.1:{porta}/ws'
+    for _ in range(100):
+        try:
+            async with websockets.connect(url):
+                break
+        except OSError:
+            await asyncio.sleep(0.1)
+    assinantes = [await websockets.connect(url, max_queue=None) for _ in range(12)]
+    for ws in assinantes:
+        await ws.send(json.dumps({'action': 'subscribe', 'ticket': emitir_acesso([canal_sala(sala_id), CANAL_RANKING])}))
+        assert json.loads(await asyncio.wait_for(ws.recv(), 5))['type'] == 'subscribed'
+
+    async def proxima(ws, tipo):
+        while (mensagem := json.loads(await asyncio.wait_for(ws.recv(), 5)))['type'] != tipo:
+            pass
+        return mensagem
+
+    trabalhadores = set()
+    for _ in range(30):
+        dados = await asyncio.to_thread(lambda: urllib.request.urlopen(f'http://127.0.0.1:{porta}/metricas').read())
+        trabalhadores.add(json.loads(dados)['trabalhador'])
+    async with websockets.connect(url, max_queue=None) as viajante:
+        await viajante.send(json.dumps({'action': 'start_trip', 'ticket': emitir_bilhete(CHAVE, 21, 1, sala_id)}))
+        progresso = [await proxima(ws, 'trip_progress') for ws in assinantes]
+    # Qualquer processo responde ao sync com a classificação do processo 0
+    epocas = set()
+    for ws in assinantes:
+        await ws.send(json.dumps({'action': 'ranking_sync', 'epoca': None, 'versao': None}))
+        epocas.add((await proxima(ws, 'ranking_snapshot'))['epoca'])
+    for ws in assinantes:
+        await ws.close()
+    return trabalhadores, progresso, epocas
+
+
+def test_varios_processos():
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        print('⚠️  SO_REUSEPORT indisponível: teste de vários processos ignorado')
+        return
+    with tempfile.TemporaryDirectory() as pasta, socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+        s.close()
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ambiente = {
+            **os.environ, 'WS_PORT': str(porta), 'WS_WORKERS': '2', 'WS_INTERVALO_TURNOS': '0.05',
+            'WS_BROKER': os.path.join(pasta, 'hub.sock'), 'COSMO_DB_PATH': os.path.join(pasta, 'teste.db'),
+            'PYTHONPATH': os.pathsep.join(os.path.abspath(c) for c in sys.path if c),
+        }
+        servidor = subprocess.Popen(
+            [sys.executable, os.path.join(raiz, 'websocket_server.py')], cwd=pasta, env=ambiente,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            trabalhadores, progresso, epocas = asyncio.run(_varios_processos(porta, 4))
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=15)
+    assert trabalhadores == {'0', '1'}, trabalhadores
+    # Os assinantes se espalham pelos dois processos; todos recebem o progresso da viagem
+    assert all(m['type'] == 'trip_progress' and m['viagem_id'] == 21 for m in progresso)
+    assert len(epocas) == 1, epocas
+    print('✅ Vários processos: progresso entregue em todos, um só ranking')
+
+
+def _linha(i, nome, total):
+    return {'id': i, 'nome': nome, 'total': total, 'concluidos': 1, 'tentativas': 1}
+
+
+def test_placar():
+    """Deltas só com as posições alteradas; clientes atrasados recebem a junção dos deltas."""
+    placar = PlacarAoVivo(guardados=3)
+    primeiro = placar.delta([_linha(1, 'Ana', 30), _linha(2, 'Bia', 20), _linha(3, 'Caio', 10)])
+    assert primeiro['de'] == 0 and primeiro['versao'] == 1 and len(primeiro['alteracoes']) == 3
+    assert placar.delta([_linha(1, 'Ana', 30), _linha(2, 'Bia', 20), _linha(3, 'Caio', 10)]) is None
+
+    # Caio passa Bia: só as duas posições trocadas vão no delta
+    segundo = placar.delta([_linha(1, 'Ana', 30), _linha(3, 'Caio', 25), _linha(2, 'Bia', 20)])
+    assert [(l['id'], l['posicao']) for l in segundo['alteracoes']] == [(3, 2), (2, 3)]
+    terceiro = placar.delta([_linha(1, 'Ana', 30), _linha(3, 'Caio', 25)])
+    assert terceiro['alteracoes'] == [] and terceiro['removidos'] == [2]
+
+    assert placar.desde(placar.epoca, 3) is None
+    juntos = placar.desde(placar.epoca, 1)
+    assert juntos['de'] == 1 and juntos['versao'] == 3
+    assert [l['id'] for l in juntos['alteracoes']] == [3] and juntos['removidos'] == [2]
+    assert placar.desde('outra', 3)['type'] == 'ranking_snapshot'
+    placar.delta([_linha(1, 'Ana', 31), _linha(3, 'Caio', 25)])
+    assert placar.desde(placar.epoca, 0)['type'] == 'ranking_snapshot'  # além do histórico
+    assert [l['id'] for l in placar.instantaneo()['itens']] == [1, 3]
+
+    # Outro processo adota a classificação: mesmas versões, deltas só quando segue a anterior
+    copia = PlacarAoVivo()
+    assert copia.adotar(placar.instantaneo())['type'] == 'ranking_snapshot' and copia.epoca == placar.epoca
+    assert copia.adotar(placar.instantaneo()) is None
+    delta = placar.delta([_linha(1, 'Ana', 31), _linha(3, 'Caio', 40)])
+    assert copia.adotar(json.loads(json.dumps(placar.instantaneo()))) == delta
+    assert copia.desde(placar.epoca, 4) == placar.desde(placar.epoca, 4)
+    print('✅ Ranking por deltas versionados')
+
+
+class _SocketLento:
+    """Conexão cujo envio só avança quando o teste libera."""
+
+    def __init__(self):
+        self.enviadas = []
+        self.liberar = asyncio.Event()
+        self.codigo_fechamento = None
+
+    async def send(self, mensagem):
+        await self.liberar.wait()
+        self.enviadas.append(mensagem)
+
+    async def close(self, codigo, motivo):
+        self.codigo_fechamento = codigo
+
+
+async def _filas():
+    metricas = MetricasEnvio()
+    socket = _SocketLento()
+    fila = FilaEnvio(socket, metricas, limite=8, tempo_maximo=0.2)
+    escritor = asyncio.create_task(fila.escrever())
+    fila.colocar('inicio')
+    for turno in range(1, 4):
+        fila.colocar(f'progresso {turno}', chave='progresso', descartavel=True)
+    fila.colocar('evento')
+    for i in range(3):
+        fila.colocar(f'extra {i}')
+    assert not fila.colocar('descartado', descartavel=True)
+    socket.liberar.set()
+    await asyncio.sleep(0.01)
+    ordem = list(socket.enviadas)
+
+    # Envio parado além do tempo máximo: consumidor lento desconectado
+    socket.liberar.clear()
+    fila.colocar('preso')
+    await asyncio.sleep(0.3)
+    await escritor
+    lento_por_tempo = fila.fechada and socket.codigo_fechamento == 1008
+
+    # Fila cheia: a mensagem que não cabe também desconecta
+    outra = FilaEnvio(_SocketLento(), metricas, limite=2)
+    outra.colocar('a')
+    outra.colocar('b')
+    assert not outra.colocar('c') and outra.fechada
+    await outra.desconexao
+    return ordem, lento_por_tempo, metricas.como_dict()
+
+
+def test_filas():
+    ordem, lento_por_tempo, dados = asyncio.run(_filas())
+    assert ordem == ['inicio', 'progresso 3', 'evento', 'extra 0', 'extra 1', 'extra 2']
+    assert lento_por_tempo
+    assert dados['coalescidas'] == 2 and dados['descartadas'] == 1 and dados['desconectadas_lentas'] == 2
+    assert dados['enviadas'] == 6 and dados['conexoes'] == 0
+    print('✅ Filas de saída com coalescência e consumidores lentos')
+
+
+async def _fan_out(db, sala_id, aluno_id):
+    websocket_server.INTERVALO_TURNOS = 0
+    leitor = asyncio.create_task(websocket_server.acompanhar_eventos(db, 0.01))
+    async with websockets.serve(
+        websocket_server.handler, '127.0.0.1', 0, process_request=websocket_server.responder_metricas
+    ) as servidor:
+        url = f"ws://127.0.0.1:{servidor.sockets[0].getsockname()[1]}/ws"
+        alunos = [await websockets.connect(url, max_queue=None) for _ in range(40)]
+        professor = await websockets.connect(url, max_queue=None)
+        projetor = await websockets.connect(url, max_queue=None)
+        await projetor.send(json.dumps({'token': emitir_acesso([CANAL_RANKING])}))
+        assert json.loads(await projetor.recv())['type'] == 'subscribed'
+        await projetor.send(json.dumps({'action': 'ranking_sync', 'epoca': None, 'versao': None}))
+        instantaneo = json.loads(await projetor.recv())
+        for ws in alunos:
+            await ws.send(json.dumps({'action': 'subscribe', 'ticket': emitir_acesso([canal_sala(sala_id)])}))
+        await professor.send(json.dumps({'token': emitir_acesso([CANAL_PROFESSORES])}))
+        for ws in alunos + [professor]:
+            assert json.loads(await ws.recv())['type'] == 'subscribed'
+        await asyncio.sleep(0.05)
+
+        inicio = time.perf_counter()
+        await asyncio.to_thread(db.registrar_resposta_desafio, aluno_id, sala_id, 'habitat_finalizado', '{}', 1, 30)
+        recebidas = [json.loads(await asyncio.wait_for(ws.recv(), 2)) for ws in alunos + [professor]]
+        latencia = time.perf_counter() - inicio
+        delta = json.loads(await asyncio.wait_for(projetor.recv(), 2))
+
+        # Progresso de uma viagem transmitida chega ao canal dos professores
+        viajante = await websockets.connect(url, max_queue=None)
+        await viajante.send(json.dumps({'action': 'start_trip', 'ticket': emitir_bilhete(CHAVE, 5, aluno_id, sala_id)}))
+        progresso = json.loads(await asyncio.wait_for(professor.recv(), 2))
+        url_metricas = url.replace('ws://', 'http://').replace('/ws', '/metricas')
+        dados_metricas = json.loads(await asyncio.to_thread(lambda: urllib.request.urlopen(url_metricas).read()))
+        assert dados_metricas['conexoes'] == 43 and dados_metricas['enviadas'] > 80
+        assert dados_metricas['processo']['cpu_s'] > 0
+        for ws in alunos + [professor, viajante, projetor]:
+            await ws.close()
+    leitor.cancel()
+    return recebidas, latencia, progresso, instantaneo, delta
+
+
+def test_fan_out():
+    with tempfile.TemporaryDirectory() as pasta:
+        db = DatabaseManager(os.path.join(pasta, 'teste.db'))
+        professor_id = db.criar_professor('P', 'p@x', 'x')
+        sala = db.buscar_sala_por_codigo(db.criar_sala_virtual(professor_id, 'Sala', 'marte', 'falcon9', '[]'))
+        aluno_id = db.adicionar_aluno(sala['id'], 'Ana')
+        recebidas, latencia, progresso, instantaneo, delta = asyncio.run(_fan_out(db, sala['id'], aluno_id))
+    assert all(m == recebidas[0] for m in recebidas)
+    assert recebidas[0]['type'] == 'habitat_finished' and recebidas[0]['nome'] == 'Ana'
+    assert progresso['type'] == 'trip_progress' and progresso['viagem_id'] == 5 and progresso['turno'] == 1
+    assert instantaneo['type'] == 'ranking_snapshot' and instantaneo['itens'][0]['total'] == 0
+    assert delta['type'] == 'ranking_delta' and delta['de'] == instantaneo['versao']
+    assert delta['alteracoes'] == [{**instantaneo['itens'][0], 'total': 30, 'tentativas': 1, 'concluidos': 1}]
+    print(f'✅ Canais: 41 conexões notificadas em {latencia * 1000:.0f} ms')
+
+
+async def _asgi(aplicacao, porta, db, sala_id, aluno_id):
+    import uvicorn
+    servidor = uvicorn.Server(uvicorn.Config(aplicacao, host='127.0.0.1', port=porta, log_level='warning'))
+    tarefa = asyncio.create_task(servidor.serve())
+    while not servidor.started:
+        await asyncio.sleep(0.01)
+    try:
+        pagina = await asyncio.to_thread(lambda: urllib.request.urlopen(f'http://127.0.0.1:{porta}/').status)
+        async with websockets.connect(f'ws://127.0.0.1:{porta}/ws', max_queue=None) as ws:
+            await ws.send(json.dumps({'action': 'subscribe', 'ticket': emitir_acesso([canal_sala(sala_id)])}))
+            assert json.loads(await ws.recv())['type'] == 'subscribed'
+            inicio = time.perf_counter()
+            await asyncio.to_thread(db.registrar_resposta_desafio, aluno_id, sala_id, 'habitat_finalizado', '{}', 1, 30)
+            evento = json.loads(await asyncio.wait_for(ws.recv(), 2))
+            latencia = time.perf_counter() - inicio
+            await ws.send(json.dumps({'action': 'start_trip', 'ticket': emitir_bilhete(CHAVE, 9, aluno_id, sala_id)}))
+            partida = json.loads(await asyncio.wait_for(ws.recv(), 5))
+    finally:
+        servidor.should_exit = True
+        await tarefa
+    return pagina, evento, latencia, partida
+
+
+def test_asgi():
+    try:
+        import uvicorn  # noqa: F401
+        import asgi
+    except (ImportError, RuntimeError):
+        print('⚠️  a2wsgi/uvicorn não instalados: teste do ponto de entrada ASGI ignorado')
+        return
+    # Sondagem longa: o evento só chega a tempo pelo aviso do próprio processo
+    asgi.INTERVALO_SONDAGEM = 30
+    with tempfile.TemporaryDirectory() as pasta, socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        porta = s.getsockname()[1]
+        s.close()
+        db = DatabaseManager(os.path.join(pasta, 'teste.db'))
+        professor_id = db.criar_professor('P', 'p@x', 'x')
+        sala = db.buscar_sala_por_codigo(db.criar_sala_virtual(professor_id, 'Sala', 'marte', 'falcon9', '[]'))
+        aluno_id = db.adicionar_aluno(sala['id'], 'Bia')
+        pagina, evento, latencia, partida = asyncio.run(
+            _asgi(asgi.criar_aplicacao(asgi.app, db), porta, db, sala['id'], aluno_id)
+        )
+    assert pagina == 200 and not db.observadores_eventos
+    assert evento['type'] == 'habitat_finished' and evento['nome'] == 'Bia'
+    assert partida['type'] == 'trip_start' and partida['viagem_id'] == 9
+    print(f'✅ ASGI: Flask e WebSocket na mesma porta (evento em {latencia * 1000:.0f} ms)')
+
+
+def main():
+    print('=== Testes do servidor WebSocket ===')
+    test_bilhetes()
+    test_transmissao()
+    test_retomada()
+    test_ritmos()
+    test_binario()
+    test_canais()
+    test_broker()
+    test_varios_processos()
+    test_placar()
+    test_filas()
+    test_fan_out()
+    test_asgi()
+    print('🎉 Servidor WebSocket OK')
+
+
+if __name__ == '__main__':
+    main()
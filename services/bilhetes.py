@@ -0,0 +1,84 @@
+"""Bilhetes assinados que autorizam a transmissão de uma viagem pelo WebSocket.
+
+O Flask emite o bilhete ao exibir `/viagem`: ele carrega os argumentos de
+`reproduzir_viagem` (versão das regras, destino, nave, máscara, semente,
+perfil de eventos e turnos), a identificação do aluno e da sala e o ritmo
+de transmissão padrão da sala (`services.ritmos`), assinados
+com a `SECRET_KEY` da aplicação (itsdangerous, com data de emissão).
+
+O servidor WebSocket só confere a assinatura e a validade: não consulta o
+banco e não confia em nada enviado pelo navegador além do bilhete. Como a
+viagem é determinística, os turnos transmitidos são exatamente os da página.
+
+Bilhetes de acesso (`emitir_acesso`) listam os canais (`services.canais`) que
+uma página pode assinar: o da sala do aluno ou o dos professores.
+"""
+
+import os
+from functools import lru_cache
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+
+# Mesma chave do Flask (app.secret_key); o servidor WebSocket lê o mesmo ambiente
+CHAVE_SECRETA = os.getenv('SECRET_KEY', 'minha_nasa_minha_vida_secret_key_2024')
+SAL_VIAGEM = 'cosmo-casa-viagem-ws'
+SAL_ACESSO = 'cosmo-casa-canais-ws'
+VALIDADE_BILHETE = 6 * 3600  # segundos
+
+
+@lru_cache(maxsize=8)
+def _serializador(segredo, sal=SAL_VIAGEM):
+    return URLSafeTimedSerializer(segredo, salt=sal)
+
+
+def emitir_bilhete(chave_viagem, viagem_id=None, aluno_id=None, sala_id=None, ritmo=None,
+                   segredo=CHAVE_SECRETA):
+    """Bilhete assinado (texto URL-safe) para a viagem de `chave_viagem`."""
+    return _serializador(segredo).dumps({
+        'v': list(chave_viagem),
+        'id': viagem_id,
+        'a': aluno_id,
+        's': sala_id,
+        'r': ritmo,
+    })
+
+
+def ler_bilhete(bilhete, segredo=CHAVE_SECRETA, validade=VALIDADE_BILHETE):
+    """Conteúdo de um bilhete válido, ou None se a assinatura ou a validade falharem.
+
+    Retorna dict com `chave` (tupla de argumentos de `reproduzir_viagem`),
+    `viagem_id`, `aluno_id`, `sala_id` e `ritmo` (perfil padrão da sala ou None).
+    """
+    if not isinstance(bilhete, str) or not bilhete:
+        return None
+    try:
+        dados = _serializador(segredo).loads(bilhete, max_age=validade)
+    except BadSignature:
+        return None
+    chave = dados.get('v')
+    if not isinstance(chave, list) or len(chave) != 7:
+        return None
+    return {
+        'chave': tuple(chave),
+        'viagem_id': dados.get('id'),
+        'aluno_id': dados.get('a'),
+        'sala_id': dados.get('s'),
+        'ritmo': dados.get('r'),
+    }
+
+
+def emitir_acesso(canais, segredo=CHAVE_SECRETA):
+    """Bilhete assinado que autoriza a assinatura de `canais`."""
+    return _serializador(segredo, SAL_ACESSO).dumps(sorted(canais))
+
+
+def ler_acesso(bilhete, segredo=CHAVE_SECRETA, validade=VALIDADE_BILHETE):
+    """Canais autorizados por um bilhete de acesso ([] se inválido ou vencido)."""
+    if not isinstance(bilhete, str) or not bilhete:
+        return []
+    try:
+        canais = _serializador(segredo, SAL_ACESSO).loads(bilhete, max_age=validade)
+    except BadSignature:
+        return []
+    return [c for c in canais if isinstance(c, str)] if isinstance(canais, list) else []
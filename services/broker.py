@@ -0,0 +1,144 @@
+"""Broker local que liga os processos do servidor WebSocket (vários núcleos).
+
+Com `WS_WORKERS=N`, `websocket_server.py` roda N processos na mesma porta
+(`SO_REUSEPORT`: o sistema distribui as conexões). Cada processo tem suas
+conexões e seus `Canais`; para uma mensagem chegar a todos os assinantes de
+uma sala, onde quer que estejam conectados:
+
+- eventos gravados pelo Flask já chegam a todos pelo log `eventos_tempo_real`
+  do SQLite, que cada processo lê;
+- mensagens geradas num processo (progresso das viagens que ele transmite)
+  passam pelo hub: `HubCanais` roda no processo pai e repassa cada mensagem
+  aos demais processos, que a entregam aos seus assinantes locais.
+
+O hub escuta num socket Unix (ou, sem suporte a eles, em TCP no loopback).
+Uma linha por mensagem: JSON `[canais, chave, descartavel, texto]`. Mensagens
+descartáveis são descartadas quando o buffer de um processo passa de
+`LIMITE_BUFFER`, como nas filas de cada conexão (`services.filas`).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+
+
+LIMITE_BUFFER = 1024 * 1024  # bytes ainda não escritos para um processo
+
+
+def endereco_padrao(porta):
+    """Endereço do hub: socket Unix no diretório temporário ou `tcp:127.0.0.1:<porta + 1>`."""
+    if hasattr(socket, 'AF_UNIX') and os.name != 'nt':
+        return os.path.join(tempfile.gettempdir(), f'cosmo-casa-ws-{porta}.sock')
+    return f'tcp:127.0.0.1:{porta + 1}'
+
+
+def _tcp(endereco):
+    host, _, porta = endereco[len('tcp:'):].rpartition(':')
+    return host, int(porta)
+
+
+def _linha(canais, texto, chave, descartavel):
+    return (json.dumps([list(canais), chave, descartavel, texto], ensure_ascii=False) + '\n').encode()
+
+
+def _escrever(writer, linha, descartavel):
+    """Escreve sem esperar; False se a linha descartável foi descartada."""
+    if descartavel and writer.transport.get_write_buffer_size() > LIMITE_BUFFER:
+        return False
+    writer.write(linha)
+    return True
+
+
+class HubCanais:
+    """Servidor do broker: repassa as mensagens de cada processo aos outros."""
+
+    def __init__(self, endereco):
+        self.endereco = endereco
+        self.conexoes = set()
+        self.tarefas = set()
+        self.repassadas = 0
+        self.descartadas = 0
+        self.servidor = None
+
+    async def iniciar(self):
+        if self.endereco.startswith('tcp:'):
+            host, porta = _tcp(self.endereco)
+            self.servidor = await asyncio.start_server(self._atender, host, porta)
+        else:
+            if os.path.exists(self.endereco):
+                os.unlink(self.endereco)
+            self.servidor = await asyncio.start_unix_server(self._atender, self.endereco)
+        return self
+
+    async def _atender(self, reader, writer):
+        self.conexoes.add(writer)
+        self.tarefas.add(asyncio.current_task())
+        try:
+            while linha := await reader.readline():
+                descartavel = json.loads(linha)[2]
+                for destino in self.conexoes:
+                    if destino is not writer:
+                        if _escrever(destino, linha, descartavel):
+                            self.repassadas += 1
+                        else:
+                            self.descartadas += 1
+        except (ConnectionError, ValueError):
+            logging.exception('Conexão com um processo do servidor WebSocket perdida')
+        finally:
+            self.conexoes.discard(writer)
+            self.tarefas.discard(asyncio.current_task())
+            writer.close()
+
+    async def fechar(self):
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+        for writer in list(self.conexoes):
+            writer.close()
+        # Fechar o transporte encerra a leitura de cada conexão
+        if self.tarefas:
+            await asyncio.wait(list(self.tarefas), timeout=5)
+        if not self.endereco.startswith('tcp:') and os.path.exists(self.endereco):
+            os.unlink(self.endereco)
+
+
+class ClienteBroker:
+    """Ponta de um processo: envia suas mensagens ao hub e entrega as recebidas."""
+
+    def __init__(self, endereco, entregar):
+        self.endereco = endereco
+        self.entregar = entregar  # entregar(canais, texto, chave, descartavel): só assinantes locais
+        self.reader = None
+        self.writer = None
+        self.descartadas = 0
+
+    async def conectar(self, tentativas=50):
+        for tentativa in range(tentativas):
+            try:
+                if self.endereco.startswith('tcp:'):
+                    self.reader, self.writer = await asyncio.open_connection(*_tcp(self.endereco))
+                else:
+                    self.reader, self.writer = await asyncio.open_unix_connection(self.endereco)
+                return self
+            except OSError:
+                # O hub pode ainda estar subindo
+                if tentativa == tentativas - 1:
+                    raise
+                await asyncio.sleep(0.1)
+
+    def enviar(self, canais, texto, chave=None, descartavel=False):
+        """Publica nos outros processos (ponte de `Canais`); não espera o hub."""
+        if self.writer is None or self.writer.is_closing():
+            return
+        if not _escrever(self.writer, _linha(canais, texto, chave, descartavel), descartavel):
+            self.descartadas += 1
+
+    async def receber(self):
+        """Entrega aos assinantes locais as mensagens dos outros processos, até o hub fechar."""
+        while linha := await self.reader.readline():
+            canais, chave, descartavel, texto = json.loads(linha)
+            self.entregar(canais, texto, chave, descartavel)
+        logging.warning('Broker do servidor WebSocket encerrado; seguindo só com as conexões locais')
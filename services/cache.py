@@ -0,0 +1,76 @@
+"""Cache em disco para resultados pré-computados (soluções de referência etc.).
+
+Os arquivos ficam em `cache/` na raiz do projeto (ou em `COSMO_CACHE_DIR`) e
+podem ser apagados a qualquer momento: são regenerados sob demanda.
+"""
+
+import json
+import logging
+import os
+
+
+DIRETORIO_CACHE = os.getenv(
+    'COSMO_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+)
+
+
+def caminho_cache(*partes):
+    """Caminho de um arquivo de cache, criando o diretório se necessário."""
+    caminho = os.path.join(DIRETORIO_CACHE, *partes)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    return caminho
+
+
+def ler_json(caminho):
+    """Lê um JSON de cache; retorna None se ausente ou corrompido."""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logging.exception('Cache inválido ignorado: %s', caminho)
+        return None
+
+
+def gravar_json(caminho, dados):
+    """Grava JSON de forma atômica (arquivo temporário + rename)."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temporario, caminho)
+    except Exception:
+        logging.exception('Falha ao gravar cache: %s', caminho)
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+
+
+def ler_binario(caminho):
+    """Lê um arquivo binário de cache; retorna None se ausente."""
+    try:
+        with open(caminho, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logging.exception('Cache inválido ignorado: %s', caminho)
+        return None
+
+
+def gravar_binario(caminho, dados):
+    """Grava bytes de forma atômica (arquivo temporário + rename)."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except Exception:
+        logging.exception('Falha ao gravar cache: %s', caminho)
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
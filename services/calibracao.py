@@ -0,0 +1,218 @@
+"""Calibração automática da dificuldade por destino.
+
+Busca, para cada destino, a combinação de parâmetros (chance de evento,
+penalidade por avaria, pontuação mínima e tolerância a avarias) cuja taxa de
+sucesso em carregamentos razoáveis fica mais próxima da meta definida pelo
+professor. Entre combinações igualmente boas, prefere a mais próxima dos
+valores atuais, preservando o caráter de cada destino.
+
+A taxa de sucesso de cada combinação é avaliada em lote: os carregamentos são
+agrupados por (pontuação base menos a penalidade de recursos prevista,
+viabilidade, nº de módulos) e a chegada de cada grupo vem da distribuição
+exata de avarias (`services.probabilidades`); grupos e somas acumuladas são
+calculados uma vez por chance de evento. Uma grade
+completa de milhares de combinações é avaliada em segundos; `simular_taxa`
+confere o resultado com viagens sorteadas.
+
+O resultado é gravado em um arquivo de regras versionado
+(`services/regras_missao.json`), carregado por `services.regras` na
+inicialização.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import random
+from datetime import datetime
+from itertools import combinations, product
+
+from services.data import NAVES_ESPACIAIS, REGRAS_MISSAO
+from services.regras import (
+    RegrasDestino, ARQUIVO_REGRAS, MASCARA_TOTAL, BIT_MODULO, MASSA, ids_de, capacidade_kg
+)
+from services.probabilidades import distribuicao_avarias, FRACAO_TEMPESTADE_PADRAO
+from services.recursos import balanco_recursos, penalidade_prevista, resumo_recursos
+from services.eventos import EVENTOS_SORTEAVEIS
+
+
+# Metas padrão de taxa de sucesso por destino
+METAS_PADRAO = {'lua': 0.8, 'marte': 0.5, 'exoplaneta': 0.2}
+
+# Parâmetros calibráveis e a escala usada para medir distância aos valores atuais
+PARAMETROS = ('chance_evento', 'penal_por_avaria', 'pontos_minimos', 'tolerancia_avarias')
+_ESCALA = {'chance_evento': 0.05, 'penal_por_avaria': 2, 'pontos_minimos': 10, 'tolerancia_avarias': 1}
+
+
+def grade_padrao(dados):
+    """Grade de busca em torno dos valores declarados para o destino."""
+    base = dados.get('pontos_minimos', dados['dificuldade_base'])
+    return {
+        'chance_evento': [round(0.05 * i, 2) for i in range(1, 13)],
+        'penal_por_avaria': list(range(2, 21, 2)),
+        'pontos_minimos': list(range(base - 100, base + 41, 10)),
+        'tolerancia_avarias': list(range(0, 9)),
+    }
+
+
+def carregamentos_razoaveis(regras, extras=2):
+    """Carregamentos com todos os essenciais e até `extras` módulos adicionais.
+
+    Retorna pares (máscara, capacidade_kg) para todas as naves, descartando
+    os que excedem o limite de massa da nave.
+    """
+    livres = ids_de(MASCARA_TOTAL & ~regras.mascara_essenciais)
+    adicionais = [()]
+    for n in range(1, extras + 1):
+        adicionais.extend(combinations(livres, n))
+    carregamentos = []
+    for nave in NAVES_ESPACIAIS.values():
+        capacidade = capacidade_kg(nave, regras.destino)
+        for combo in adicionais:
+            mascara = regras.mascara_essenciais
+            for mid in combo:
+                mascara |= BIT_MODULO[mid]
+            if regras.massa_ok(MASSA(mascara), capacidade):
+                carregamentos.append((mascara, capacidade))
+    return carregamentos
+
+
+def _estados(regras, carregamentos):
+    """Agrupa carregamentos por (pontos base - penalidade de recursos, viável, nº de módulos) → quantidade."""
+    estados = {}
+    for mascara, capacidade in carregamentos:
+        pontos, massa = regras.pontos_base(mascara, capacidade)
+        pontos -= penalidade_prevista(regras, *resumo_recursos(mascara))
+        chave = (pontos, regras.viavel(mascara, massa, capacidade), mascara.bit_count())
+        estados[chave] = estados.get(chave, 0) + 1
+    return estados
+
+
+def _acumuladas(turnos, chance, max_modulos):
+    """Somas acumuladas P(avarias ≤ d) por nº de módulos, para uma chance de evento."""
+    p_tempestade = chance * FRACAO_TEMPESTADE_PADRAO
+    tabela = {}
+    for k in range(max_modulos + 1):
+        soma, acumulada = 0.0, []
+        for p in distribuicao_avarias(turnos, p_tempestade, k):
+            soma += p
+            acumulada.append(soma)
+        tabela[k] = acumulada
+    return tabela
+
+
+def taxa_sucesso(estados, acumuladas, penal, minimo, tolerancia):
+    """Fração de carregamentos que chegam, dadas as somas acumuladas de avarias."""
+    total = chegam = 0.0
+    for (pontos, viavel, k), n in estados.items():
+        total += n
+        if not viavel:
+            continue
+        if minimo <= 0:
+            limite = tolerancia
+        elif penal <= 0:
+            limite = tolerancia if pontos >= minimo else -1
+        else:
+            limite = min(tolerancia, (pontos - minimo) // penal)
+        if limite >= 0:
+            acumulada = acumuladas[k]
+            chegam += n * acumulada[min(limite, len(acumulada) - 1)]
+    return chegam / total if total else 0.0
+
+
+def calibrar_destino(destino, meta, dados=None, grade=None, folga=0.02):
+    """Melhor combinação de parâmetros para atingir a `meta` de sucesso do destino.
+
+    Retorna (parâmetros, taxa_obtida, combinações_avaliadas). Combinações
+    dentro de `folga` da meta são consideradas equivalentes e desempatadas
+    pela proximidade aos valores atuais.
+    """
+    dados = dados or REGRAS_MISSAO[destino]
+    grade = grade or grade_padrao(dados)
+    regras = RegrasDestino(destino, dados)
+    carregamentos = carregamentos_razoaveis(regras)
+    max_modulos = max(mascara.bit_count() for mascara, _ in carregamentos)
+    atuais = {p: dados.get(p, dados['dificuldade_base']) for p in PARAMETROS}
+
+    melhor, melhor_chave, avaliadas = None, None, 0
+    for chance in grade['chance_evento']:
+        # A penalidade de recursos prevista depende da chance de evento
+        estados = _estados(RegrasDestino(destino, {**dados, 'chance_evento': chance}), carregamentos)
+        acumuladas = _acumuladas(regras.turnos, chance, max_modulos)
+        for penal, minimo, tolerancia in product(
+            grade['penal_por_avaria'], grade['pontos_minimos'], grade['tolerancia_avarias']
+        ):
+            avaliadas += 1
+            taxa = taxa_sucesso(estados, acumuladas, penal, minimo, tolerancia)
+            candidato = {
+                'chance_evento': chance, 'penal_por_avaria': penal,
+                'pontos_minimos': minimo, 'tolerancia_avarias': tolerancia,
+            }
+            erro = abs(taxa - meta)
+            distancia = sum(abs(candidato[p] - atuais[p]) / _ESCALA[p] for p in PARAMETROS)
+            chave = (max(erro, folga), distancia, erro)
+            if melhor_chave is None or chave < melhor_chave:
+                melhor, melhor_chave = (candidato, taxa), chave
+    return melhor[0], melhor[1], avaliadas
+
+
+def simular_taxa(regras, carregamentos, viagens=200, semente=0):
+    """Taxa de sucesso por viagens sorteadas (mesma dinâmica da rota de viagem).
+
+    Sorteia o efeito de cada turno (perfil uniforme), então a penalidade de
+    recursos sai do balanço da sequência sorteada, e não do modelo médio.
+    """
+    rng = random.Random(semente)
+    efeitos_sorteaveis = [e['efeito'] for e in EVENTOS_SORTEAVEIS]
+    chegam = total = 0
+    for mascara, capacidade in carregamentos:
+        pontos, massa = regras.pontos_base(mascara, capacidade)
+        viavel = regras.viavel(mascara, massa, capacidade)
+        modulos = mascara.bit_count()
+        for _ in range(viagens):
+            total += 1
+            if not viavel:
+                continue
+            avariados = set()
+            efeitos = []
+            for _ in range(regras.turnos):
+                efeito = rng.choice(efeitos_sorteaveis) if rng.random() < regras.chance_evento else 'nenhum'
+                if efeito == 'risco_avaria_modulo':
+                    avariados.add(rng.randrange(modulos))
+                efeitos.append(efeito)
+            d = len(avariados)
+            penal_recursos = balanco_recursos(regras, mascara, efeitos)['penalidade']
+            if (
+                d <= regras.tolerancia_avarias and
+                pontos - regras.penal_por_avaria * d - penal_recursos >= regras.pontos_minimos
+            ):
+                chegam += 1
+    return chegam / total if total else 0.0
+
+
+def versao_de(destinos):
+    """Identificador de conteúdo de um conjunto de ajustes calibrados."""
+    return hashlib.sha1(json.dumps(destinos, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+
+
+def gravar_calibracao(destinos, metas, taxas, caminho=ARQUIVO_REGRAS):
+    """Acrescenta uma versão ao arquivo de regras e a torna a versão atual."""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            arquivo = json.load(f)
+    except FileNotFoundError:
+        arquivo = {'versao_atual': None, 'versoes': {}}
+    versao = versao_de(destinos)
+    arquivo['versoes'][versao] = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'metas': metas,
+        'taxas_previstas': {d: round(t, 4) for d, t in taxas.items()},
+        'destinos': copy.deepcopy(destinos),
+    }
+    arquivo['versao_atual'] = versao
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(arquivo, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(temporario, caminho)
+    return versao
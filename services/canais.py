@@ -0,0 +1,113 @@
+"""Canais de publicação/assinatura do tempo real (uma sala, ou os professores).
+
+Cada conexão WebSocket assina os canais autorizados pelo seu bilhete de
+acesso (`services.bilhetes.emitir_acesso`): alunos e projetor assinam o canal
+da sala, o painel do professor assina o canal dos professores. Uma mensagem é
+serializada uma única vez e entregue de uma vez a todos os assinantes dos
+canais de destino (filas de saída de `services.filas`, sem esperar cada
+cliente).
+
+Eventos gravados pelo Flask (respostas, fim de viagem, habitat finalizado)
+chegam ao servidor WebSocket pelo log `eventos_tempo_real` do SQLite
+(`services.db`), que é lido em intervalos curtos e republicado aqui. Com
+vários processos (`services.broker`), cada um lê o log; as mensagens geradas
+no próprio servidor (`propagar=True`) seguem pela ponte aos demais processos.
+"""
+
+import json
+from collections import defaultdict
+
+
+CANAL_PROFESSORES = 'professores'
+# Ranking das salas ativas (público, como a página /ranking-rodada)
+CANAL_RANKING = 'ranking'
+# Interno, entre os processos do servidor (nunca vai num bilhete): a
+# classificação calculada por um processo e os pedidos dela
+CANAL_PLACAR = 'placar'
+
+# desafio_id gravado em respostas_desafios → tipo de mensagem enviado aos clientes
+TIPOS_RESPOSTA = {
+    'missao_score': 'voyage_finished',
+    'habitat_finalizado': 'habitat_finished',
+}
+TIPO_RESPOSTA_PADRAO = 'answer_submitted'
+
+
+def canal_sala(sala_id):
+    """Nome do canal de uma sala."""
+    return f'sala:{sala_id}'
+
+
+def canais_do_evento(canal):
+    """Canais que recebem um evento de `canal` (eventos de sala vão também aos professores)."""
+    return (canal, CANAL_PROFESSORES) if canal.startswith('sala:') else (canal,)
+
+
+def mensagem_de_resposta(dados):
+    """Mensagem aos clientes a partir de uma linha do log gerada por uma resposta."""
+    return {
+        'type': TIPOS_RESPOSTA.get(dados.get('desafio_id'), TIPO_RESPOSTA_PADRAO),
+        'sala_id': dados.get('sala_id'),
+        'aluno_id': dados.get('aluno_id'),
+        'nome': dados.get('nome'),
+        'desafio_id': dados.get('desafio_id'),
+        'pontuacao': dados.get('pontuacao'),
+    }
+
+
+class Canais:
+    """Assinaturas por canal e difusão com uma serialização por mensagem.
+
+    `difundir(conexoes, texto, chave, descartavel)` entrega o texto já
+    serializado (no servidor, `services.filas.difundir`); `chave` e
+    `descartavel` seguem para a política de coalescência das filas.
+    `ponte(canais, texto, chave, descartavel)`, quando definida, leva as
+    mensagens publicadas com `propagar` aos outros processos do servidor.
+    """
+
+    def __init__(self, difundir, ponte=None):
+        self.difundir = difundir
+        self.ponte = ponte
+        self.assinantes = defaultdict(set)   # canal → conexões
+        self.assinaturas = defaultdict(set)  # conexão → canais
+
+    def assinar(self, conexao, canal):
+        self.assinantes[canal].add(conexao)
+        self.assinaturas[conexao].add(canal)
+
+    def cancelar(self, conexao):
+        """Remove todas as assinaturas de uma conexão (ao desconectar)."""
+        for canal in self.assinaturas.pop(conexao, ()):
+            conexoes = self.assinantes.get(canal)
+            if conexoes is not None:
+                conexoes.discard(conexao)
+                if not conexoes:
+                    del self.assinantes[canal]
+
+    def publicar(self, mensagem, *canais, chave=None, descartavel=False, propagar=False):
+        """Envia `mensagem` (dict ou texto) aos assinantes de `canais`; retorna quantos receberam aqui.
+
+        Com `propagar` (e uma ponte), a mensagem vai também aos outros processos.
+        """
+        destinatarios = self._destinatarios(canais)
+        if not destinatarios and not (propagar and self.ponte):
+            return 0
+        texto = mensagem if isinstance(mensagem, str) else json.dumps(mensagem, ensure_ascii=False)
+        if propagar and self.ponte:
+            self.ponte(canais, texto, chave, descartavel)
+        if destinatarios:
+            self.difundir(destinatarios, texto, chave, descartavel)
+        return len(destinatarios)
+
+    def entregar(self, canais, texto, chave=None, descartavel=False):
+        """Entrega aos assinantes locais uma mensagem vinda de outro processo (sem propagar)."""
+        destinatarios = self._destinatarios(canais)
+        if destinatarios:
+            self.difundir(destinatarios, texto, chave, descartavel)
+        return len(destinatarios)
+
+    def _destinatarios(self, canais):
+        destinatarios = set()
+        for canal in canais:
+            destinatarios |= self.assinantes.get(canal, set())
+        return destinatarios
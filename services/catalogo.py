@@ -0,0 +1,89 @@
+"""Registros imutáveis dos catálogos estáticos (naves, estágios e módulos).
+
+Os catálogos são compartilhados por todas as requisições e threads; por isso
+cada item vira um registro congelado com `__slots__` e o catálogo inteiro fica
+atrás de um `MappingProxyType` somente leitura. Estado por viagem (como
+módulos avariados) nunca é gravado no catálogo: fica em uma sobreposição
+própria (`services.estado_viagem`).
+
+Os registros continuam legíveis como dicionários (`registro['massa']`,
+`registro.get('massa', 0)`) e como atributos (`registro.massa`, usado pelos
+templates), o que mantém o código existente funcionando.
+"""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+
+
+class Registro(Mapping):
+    """Registro somente leitura com campos fixos em `__slots__`."""
+
+    __slots__ = ()
+
+    def __init__(self, **campos):
+        desconhecidos = set(campos) - set(self.__slots__)
+        if desconhecidos:
+            raise TypeError(f"Campos desconhecidos para {type(self).__name__}: {', '.join(sorted(desconhecidos))}")
+        for campo in self.__slots__:
+            object.__setattr__(self, campo, campos.get(campo))
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError(f"{type(self).__name__} é imutável")
+
+    def __delattr__(self, nome):
+        raise AttributeError(f"{type(self).__name__} é imutável")
+
+    def __getitem__(self, chave):
+        if chave not in self.__slots__:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, c) for c in self.__slots__))
+
+    def __reduce__(self):
+        return (_reconstruir, (type(self), self.como_dict()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.como_dict()!r})"
+
+    def como_dict(self):
+        """Cópia em dicionário comum (para JSON ou sessão)."""
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+def _reconstruir(classe, campos):
+    return classe(**campos)
+
+
+class Nave(Registro):
+    """Nave espacial do catálogo (capacidade em toneladas)."""
+
+    __slots__ = (
+        'nome', 'operador', 'imagem', 'descricao', 'capacidade_carga', 'perfil_missao',
+        'empuxo_total', 'impulso_especifico', 'massa_seca', 'massa_combustivel',
+        'delta_v_total', 'taxa_empuxo_peso'
+    )
+
+
+class Estagio(Registro):
+    """Estágio de uma nave (massas em toneladas, impulso em s, empuxo em kN)."""
+
+    __slots__ = ('nome', 'massa_seca', 'massa_combustivel', 'impulso_especifico', 'empuxo')
+
+
+class Modulo(Registro):
+    """Módulo de habitat do catálogo (massa em kg, energia e água por dia)."""
+
+    __slots__ = ('nome', 'massa', 'energia', 'agua', 'imagem', 'obs')
+
+
+def congelar_catalogo(classe, dados):
+    """Converte {id: dict} em um mapeamento somente leitura {id: registro}."""
+    return MappingProxyType({chave: classe(**valores) for chave, valores in dados.items()})
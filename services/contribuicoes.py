@@ -0,0 +1,155 @@
+"""Contribuição de cada módulo (valor de Shapley) para a pontuação e a chegada.
+
+Para um carregamento com n módulos, o valor de Shapley de um módulo é a média
+do ganho marginal que ele traz ao entrar em cada coalizão dos demais. Os dois
+"jogos" analisados são a pontuação esperada e a probabilidade de chegada
+(modelo de `services.probabilidades`).
+
+A previsão de uma coalizão só depende de (essenciais presentes, nº de
+módulos, massa) e, pela penalidade de energia e água, de (energia, água,
+módulos de `MASCARA_RECURSOS`). Com esses seis números quase toda coalizão tem
+resumo próprio, então as 2^n coalizões são enumeradas, mas sem laço Python
+por coalizão: os resumos são somas de subconjuntos montadas por duplicação de
+listas, empacotados em inteiros de campos disjuntos, e a previsão é calculada
+uma vez por resumo distinto (alguns milhares). O valor de Shapley de cada
+módulo vem das somas sobre as coalizões com e sem ele, feitas por fatias.
+"""
+
+from functools import lru_cache
+from math import comb
+from operator import add
+
+from services.data import NAVES_ESPACIAIS, MODULOS_HABITAT
+from services.regras import regras_para, ids_de, capacidade_kg, BIT_MODULO
+from services.probabilidades import prever_estado
+from services.recursos import penalidade_prevista, MASCARA_RECURSOS
+
+
+# Códigos empacotados: a soma dos códigos dos módulos é o código da coalizão
+# (cada campo comporta a soma de todo o catálogo).
+# carga = massa | essenciais | nº de módulos
+_DESLOC_ESSENCIAIS, _DESLOC_MASSA = 5, 10
+# recursos = água (L) | energia (meio kWh; o catálogo usa múltiplos de 0,5) | mitigadores
+_DESLOC_ENERGIA, _DESLOC_AGUA = 18, 32
+_CAMPO_CARGA = (1 << _DESLOC_ESSENCIAIS) - 1
+_CAMPO_ENERGIA = (1 << (_DESLOC_AGUA - _DESLOC_ENERGIA)) - 1
+
+
+def _codigo_carga(mid, essencial):
+    return MODULOS_HABITAT[mid]['massa'] << _DESLOC_MASSA | essencial << _DESLOC_ESSENCIAIS | 1
+
+
+def _codigo_recursos(mid):
+    modulo = MODULOS_HABITAT[mid]
+    return (
+        modulo['agua'] << _DESLOC_AGUA
+        | round(2 * modulo['energia']) << _DESLOC_ENERGIA
+        | BIT_MODULO[mid] & MASCARA_RECURSOS
+    )
+
+
+def _somas(valores):
+    """Soma de cada subconjunto de `valores`, indexada pela máscara local (bit j = valores[j])."""
+    somas = [0]
+    for v in valores:
+        somas += [s + v for s in somas]
+    return somas
+
+
+def _somas_por_bit(valores, n):
+    """Para cada bit local j < n, a soma de `valores[S]` sobre as máscaras S com o bit j.
+
+    Somando antes as fatias de cada metade dos bits (passos para a metade
+    baixa, blocos contíguos para a alta), cada bit custa uma soma de 2^(n/2)
+    parciais em vez de uma passada pelas 2^n coalizões.
+    """
+    meio = n // 2
+    baixo = [sum(valores[b::1 << meio]) for b in range(1 << meio)]
+    alto = [sum(valores[a << meio:(a + 1) << meio]) for a in range(1 << (n - meio))]
+    return (
+        [sum(s for b, s in enumerate(baixo) if b >> j & 1) for j in range(meio)]
+        + [sum(s for a, s in enumerate(alto) if a >> j & 1) for j in range(n - meio)]
+    )
+
+
+@lru_cache(maxsize=2048)
+def contribuicoes(destino, nave_id, mascara):
+    """Valores de Shapley dos módulos do carregamento (None se a nave não existe).
+
+    Retorna `modulos` (id, nome, pontos, probabilidade), `base` (previsão sem
+    nenhum módulo) e `total` (previsão do carregamento completo); a soma das
+    contribuições é `total - base` em cada jogo.
+    """
+    nave = NAVES_ESPACIAIS.get(nave_id)
+    if not nave:
+        return None
+    regras = regras_para(destino)
+    capacidade = capacidade_kg(nave, regras.destino)
+    ids = ids_de(mascara)
+    n = len(ids)
+
+    essenciais = [1 if regras.mascara_essenciais & BIT_MODULO[mid] else 0 for mid in ids]
+    cargas = _somas([_codigo_carga(mid, e) for mid, e in zip(ids, essenciais)])
+    recursos = _somas([_codigo_recursos(mid) for mid in ids])
+
+    # Penalidade por resumo de recursos distinto, como índice em `niveis`
+    penalidades = {
+        c: penalidade_prevista(
+            regras, (c >> _DESLOC_ENERGIA & _CAMPO_ENERGIA) / 2, c >> _DESLOC_AGUA, c & MASCARA_RECURSOS
+        )
+        for c in set(recursos)
+    }
+    niveis = sorted(set(penalidades.values()))
+    indice = {p: i for i, p in enumerate(niveis)}
+    penalidades = {c: indice[p] for c, p in penalidades.items()}
+    codigos = list(map(add, map(len(niveis).__mul__, cargas), map(penalidades.__getitem__, recursos)))
+
+    # Peso de Shapley da coalizão de tamanho k com o módulo (entra) e sem ele (sai)
+    entra = [1.0 / (n * comb(n - 1, k - 1)) if k else 0.0 for k in range(n + 1)]
+    sai = [1.0 / (n * comb(n - 1, k)) if k < n else 0.0 for k in range(n + 1)]
+
+    # A previsão só depende da pontuação base (já sem a penalidade), da
+    # viabilidade e do nº de módulos; resumos distintos com os mesmos três
+    # valores compartilham o cálculo.
+    valores = {}
+    previsoes = {}
+    jogos = ({}, {}, {}, {})
+    for codigo in set(codigos):
+        carga, nivel = divmod(codigo, len(niveis))
+        e, k, m = carga >> _DESLOC_ESSENCIAIS & _CAMPO_CARGA, carga & _CAMPO_CARGA, carga >> _DESLOC_MASSA
+        penal = niveis[nivel]
+        chave = (regras.pontos_estado(e, m, capacidade) - penal, regras.viavel_estado(e, m, capacidade), k)
+        v = valores.get(chave)
+        if v is None:
+            previsao = prever_estado(regras, e, k, m, capacidade, penal_recursos=penal)
+            v = valores[chave] = (previsao['pontuacao_esperada'], previsao['probabilidade_sucesso'])
+        previsoes[codigo] = pontos, probabilidade = v
+        for jogo, valor in zip(jogos, (entra[k] * pontos, sai[k] * pontos, entra[k] * probabilidade, sai[k] * probabilidade)):
+            jogo[codigo] = valor
+
+    def shapley(com, sem):
+        # φ_j = Σ_{S∋j} entra·v(S) − Σ_{S∌j} sai·v(S)
+        total_sem = sum(sem)
+        return [c - (total_sem - s) for c, s in zip(_somas_por_bit(com, n), _somas_por_bit(sem, n))]
+
+    pontos_com, pontos_sem, prob_com, prob_sem = (list(map(jogo.__getitem__, codigos)) for jogo in jogos)
+    modulos = [
+        {
+            'id': mid,
+            'nome': MODULOS_HABITAT[mid]['nome'],
+            'essencial': bool(essencial),
+            'pontos': round(pontos, 2),
+            'probabilidade': round(probabilidade, 4),
+        }
+        for mid, essencial, pontos, probabilidade in zip(
+            ids, essenciais, shapley(pontos_com, pontos_sem), shapley(prob_com, prob_sem)
+        )
+    ]
+    modulos.sort(key=lambda c: (-c['pontos'], -c['probabilidade'], c['id']))
+    base = previsoes[codigos[0]]
+    total = previsoes[codigos[-1]]
+    return {
+        'modulos': modulos,
+        'base': {'pontos': round(base[0], 2), 'probabilidade': round(base[1], 4)},
+        'total': {'pontos': round(total[0], 2), 'probabilidade': round(total[1], 4)},
+    }
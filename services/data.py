@@ -3,6 +3,10 @@
 Keeps responsibilities separated, avoiding bloating app.py.
 """
 
+from types import MappingProxyType
+
+from services.catalogo import Nave, Modulo, Estagio, congelar_catalogo
+
 # --- BANCO DE DADOS DAS NAVES ESPACIAIS ---
 NAVES_ESPACIAIS = {
     'falcon9': {
@@ -63,6 +67,33 @@ NAVES_ESPACIAIS = {
     }
 }
 
+# --- ESTÁGIOS DAS NAVES ---
+# Modelo por estágio (de baixo para cima): massas em toneladas, impulso
+# específico em segundos e empuxo em kN. As massas somam os agregados
+# `massa_seca`/`massa_combustivel` de cada nave; o empuxo do primeiro estágio
+# é o `empuxo_total` do catálogo.
+ESTAGIOS_NAVES = {
+    'falcon9': [
+        {'nome': 'Stage 1 (9× Merlin 1D)', 'massa_seca': 24.2, 'massa_combustivel': 320.0, 'impulso_especifico': 300, 'empuxo': 7607},
+        {'nome': 'Stage 2 (Merlin Vacuum)', 'massa_seca': 4.0, 'massa_combustivel': 113.1, 'impulso_especifico': 348, 'empuxo': 981},
+    ],
+    'pslv': [
+        {'nome': 'PS1 (solid core + strap-ons)', 'massa_seca': 14.0, 'massa_combustivel': 180.0, 'impulso_especifico': 237, 'empuxo': 4800},
+        {'nome': 'PS2 (Vikas)', 'massa_seca': 2.8, 'massa_combustivel': 40.0, 'impulso_especifico': 290, 'empuxo': 799},
+        {'nome': 'PS3 (solid)', 'massa_seca': 1.0, 'massa_combustivel': 7.6, 'impulso_especifico': 295, 'empuxo': 240},
+        {'nome': 'PS4 (twin liquid engines)', 'massa_seca': 0.7, 'massa_combustivel': 2.4, 'impulso_especifico': 308, 'empuxo': 15},
+    ],
+    'longmarch8a': [
+        {'nome': 'Core stage + boosters (YF-100)', 'massa_seca': 18.6, 'massa_combustivel': 295.5, 'impulso_especifico': 300, 'empuxo': 5800},
+        {'nome': 'Upper stage (YF-75, cryogenic)', 'massa_seca': 3.5, 'massa_combustivel': 25.0, 'impulso_especifico': 438, 'empuxo': 176},
+    ],
+    'gslv': [
+        {'nome': 'GS1 (solid core + L40 strap-ons)', 'massa_seca': 13.0, 'massa_combustivel': 175.0, 'impulso_especifico': 265, 'empuxo': 4200},
+        {'nome': 'GS2 (Vikas)', 'massa_seca': 2.4, 'massa_combustivel': 16.7, 'impulso_especifico': 293, 'empuxo': 800},
+        {'nome': 'CUS (cryogenic upper stage)', 'massa_seca': 1.4, 'massa_combustivel': 7.0, 'impulso_especifico': 452, 'empuxo': 75},
+    ],
+}
+
 # --- BANCO DE DADOS DOS MÓDULOS (com imagens e observações para tooltips) ---
 MODULOS_HABITAT = {
     'suporte_vida': {"nome": "Life Support", "massa": 800, "energia": 15, "agua": 50,
@@ -136,11 +167,90 @@ EVENTOS_ALEATORIOS = [
         "efeito": "bonus_economia"
     }
 ]
+
+# --- REGRAS DA MISSÃO POR DESTINO ---
+# Declaradas uma única vez como dados; `services.regras` compila estas tabelas
+# em máscaras de bits na inicialização. Razões de massa são relativas à
+# capacidade de carga da nave (massa / capacidade).
+REGRAS_MISSAO = {
+    'lua': {
+        'turnos': 15,
+        'chance_evento': 0.3,
+        'dificuldade_base': 50,
+        'pontos_minimos': 50,
+        'essenciais': ['suporte_vida', 'habitacional'],
+        'bonus_essencial': 20,
+        'penal_essencial_faltante': 25,
+        # (razão acima da qual se aplica, ajuste) — avaliadas em ordem
+        'faixas_sobrecarga': [[1.2, -60], [1.0, -30]],
+        # [razão mínima, razão máxima, bônus] para carga bem dimensionada
+        'faixa_ideal': [0.5, 1.0, 20],
+        'limite_massa': 1.2,
+        'penal_por_avaria': 8,
+        'faltantes_permitidos': 2,
+        'tolerancia_avarias': 3,
+        # Balanço de recursos por turno (1 turno = 1 dia): geração de energia
+        # (kWh), bateria (kWh), reserva de água (L), fração reciclada com o
+        # módulo sanitário e penalidade por turno em déficit (com teto)
+        'recursos': {'energia_por_turno': 40, 'bateria': 60, 'agua_inicial': 1500,
+                     'reciclagem_agua': 0.7, 'penal_por_deficit': 1, 'penal_max_deficit': 10}
+    },
+    'marte': {
+        'turnos': 60,
+        'chance_evento': 0.3,
+        'dificuldade_base': 120,
+        'pontos_minimos': 120,
+        'essenciais': ['suporte_vida', 'habitacional', 'medico'],
+        'bonus_essencial': 20,
+        'penal_essencial_faltante': 25,
+        'faixas_sobrecarga': [[1.0, -50]],
+        'faixa_ideal': [0.6, 0.95, 30],
+        'limite_massa': 1.0,
+        'penal_por_avaria': 10,
+        'faltantes_permitidos': 1,
+        'tolerancia_avarias': 2,
+        'recursos': {'energia_por_turno': 35, 'bateria': 80, 'agua_inicial': 4000,
+                     'reciclagem_agua': 0.7, 'penal_por_deficit': 1, 'penal_max_deficit': 20}
+    },
+    'exoplaneta': {
+        'turnos': 250,
+        'chance_evento': 0.4,
+        'dificuldade_base': 300,
+        'pontos_minimos': 300,
+        'essenciais': ['suporte_vida', 'habitacional', 'blindagem', 'controle', 'hidroponia'],
+        'bonus_essencial': 20,
+        'penal_essencial_faltante': 25,
+        'faixas_sobrecarga': [[0.95, -60]],
+        'faixa_ideal': [0.6, 0.9, 25],
+        'limite_massa': 0.95,
+        'penal_por_avaria': 14,
+        'faltantes_permitidos': 0,
+        'tolerancia_avarias': 1,
+        'recursos': {'energia_por_turno': 45, 'bateria': 120, 'agua_inicial': 12000,
+                     'reciclagem_agua': 0.7, 'penal_por_deficit': 1, 'penal_max_deficit': 30}
+    }
+}
+
+# --- CATÁLOGOS IMUTÁVEIS ---
+# Compartilhados entre requisições/threads: registros congelados atrás de
+# mapeamentos somente leitura. Estado por viagem fica fora do catálogo.
+NAVES_ESPACIAIS = congelar_catalogo(Nave, NAVES_ESPACIAIS)
+MODULOS_HABITAT = congelar_catalogo(Modulo, MODULOS_HABITAT)
+EVENTOS_ALEATORIOS = tuple(MappingProxyType(dict(e)) for e in EVENTOS_ALEATORIOS)
+ESTAGIOS_NAVES = MappingProxyType({
+    nave_id: tuple(Estagio(**estagio) for estagio in estagios) for nave_id, estagios in ESTAGIOS_NAVES.items()
+})
+
 """Static data used by Cosmo-Casa's UI and simulation.
 
 - `NAVES_ESPACIAIS`: catalog with name, image, and educational notes;
+- `ESTAGIOS_NAVES`: per-stage masses, specific impulse and thrust of each spacecraft;
 - `MODULOS_HABITAT`: habitat modules with descriptions and attributes;
-- `EVENTOS_ALEATORIOS`: turn-based simulation events with effects.
+- `EVENTOS_ALEATORIOS`: turn-based simulation events with effects;
+- `REGRAS_MISSAO`: per-destination scoring, survival and resource rules.
+
+Spacecraft, modules and events are frozen at import time (read-only records and
+mappings); per-voyage state must never be written into them.
 
 Keeps educational content separate from logic, allowing independent evolution
 and future internationalization.
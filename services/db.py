@@ -1,7 +1,11 @@
+import json
+import os
 import sqlite3
 import secrets
 from datetime import datetime, timedelta
 
+from services.canais import canal_sala
+
 
 class DatabaseManager:
     """Gerencia conexão e operações no banco SQLite.
@@ -13,6 +17,9 @@ class DatabaseManager:
     """
     def __init__(self, db_path='salas_virtuais.db'):
         self.db_path = db_path
+        # Chamados (sem argumentos) após gravar um evento do tempo real; o servidor
+        # ASGI de processo único os usa para ler o log na hora, sem esperar a sondagem
+        self.observadores_eventos = []
         self.init_db()
     
     def init_db(self):
@@ -80,6 +87,39 @@ class DatabaseManager:
                 )
             ''')
             
+            # Viagens: apenas o necessário para regenerar o diário (services.simulacao)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS viagens (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    aluno_id INTEGER,
+                    sala_id INTEGER,
+                    destino TEXT NOT NULL,
+                    nave_id TEXT NOT NULL,
+                    mascara INTEGER NOT NULL,
+                    semente INTEGER NOT NULL,
+                    versao_regras TEXT NOT NULL,
+                    perfil_eventos TEXT NOT NULL DEFAULT '',
+                    turnos INTEGER,
+                    pontuacao INTEGER,
+                    chegada_ok BOOLEAN,
+                    data_viagem DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (aluno_id) REFERENCES alunos (id),
+                    FOREIGN KEY (sala_id) REFERENCES salas_virtuais (id)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_viagens_sala ON viagens (sala_id, id)')
+
+            # Log de eventos do tempo real: lido pelo servidor WebSocket (services.canais)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS eventos_tempo_real (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    canal TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    dados TEXT NOT NULL,
+                    data_evento DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
             conn.commit()
 
             # Garantir coluna de exclusão no ranking para alunos
@@ -101,6 +141,36 @@ class DatabaseManager:
                     conn.commit()
             except Exception:
                 pass
+
+            # Garantir coluna do perfil de eventos da sala (pesos por evento, JSON)
+            try:
+                cursor.execute("PRAGMA table_info(salas_virtuais)")
+                cols = [row[1] for row in cursor.fetchall()]
+                if 'perfil_eventos_json' not in cols:
+                    cursor.execute("ALTER TABLE salas_virtuais ADD COLUMN perfil_eventos_json TEXT")
+                    conn.commit()
+            except Exception:
+                pass
+
+            # Garantir coluna do ritmo de transmissão das viagens da sala (NULL = tempo real)
+            try:
+                cursor.execute("PRAGMA table_info(salas_virtuais)")
+                cols = [row[1] for row in cursor.fetchall()]
+                if 'ritmo_viagem' not in cols:
+                    cursor.execute("ALTER TABLE salas_virtuais ADD COLUMN ritmo_viagem TEXT")
+                    conn.commit()
+            except Exception:
+                pass
+
+            # Garantir coluna de turnos da viagem (modo resistência; NULL = turnos do destino)
+            try:
+                cursor.execute("PRAGMA table_info(viagens)")
+                cols = [row[1] for row in cursor.fetchall()]
+                if 'turnos' not in cols:
+                    cursor.execute("ALTER TABLE viagens ADD COLUMN turnos INTEGER")
+                    conn.commit()
+            except Exception:
+                pass
     
     def gerar_codigo_sala(self):
         """Gera um código único para a sala"""
@@ -252,7 +322,7 @@ class DatabaseManager:
             conn.commit()
 
     def excluir_sala_por_codigo(self, codigo_sala):
-        """Exclui definitivamente a sala e seus dados relacionados (alunos e respostas)."""
+        """Exclui definitivamente a sala e seus dados relacionados (alunos, respostas e viagens)."""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             # Encontrar ID da sala
@@ -263,6 +333,7 @@ class DatabaseManager:
             sala_id = row[0]
             # Excluir respostas e alunos vinculados
             cursor.execute('DELETE FROM respostas_desafios WHERE sala_id = ?', (sala_id,))
+            cursor.execute('DELETE FROM viagens WHERE sala_id = ?', (sala_id,))
             cursor.execute('DELETE FROM alunos WHERE sala_id = ?', (sala_id,))
             # Excluir sala
             cursor.execute('DELETE FROM salas_virtuais WHERE id = ?', (sala_id,))
@@ -287,6 +358,24 @@ class DatabaseManager:
             ''', (desafios_json, codigo_sala))
             conn.commit()
 
+    def atualizar_perfil_eventos(self, codigo_sala, perfil_json):
+        """Atualiza o perfil de eventos (JSON) da sala pelo código."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE salas_virtuais SET perfil_eventos_json = ? WHERE UPPER(codigo_sala) = UPPER(?)
+            ''', (perfil_json, codigo_sala))
+            conn.commit()
+
+    def atualizar_ritmo_viagem(self, codigo_sala, ritmo):
+        """Atualiza o ritmo padrão de transmissão das viagens da sala pelo código."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE salas_virtuais SET ritmo_viagem = ? WHERE UPPER(codigo_sala) = UPPER(?)
+            ''', (ritmo, codigo_sala))
+            conn.commit()
+
     def selecionar_desafio_index(self, codigo_sala, idx):
         """Define o índice do desafio selecionado para a sala."""
         with sqlite3.connect(self.db_path) as conn:
@@ -369,7 +458,7 @@ class DatabaseManager:
             return result
     
     def registrar_resposta_desafio(self, aluno_id, sala_id, desafio_id, resposta, correta, pontuacao):
-        """Registra uma resposta a um desafio"""
+        """Registra uma resposta a um desafio e o evento correspondente para o tempo real"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -377,10 +466,107 @@ class DatabaseManager:
                 (aluno_id, sala_id, desafio_id, resposta, correta, pontuacao)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (aluno_id, sala_id, desafio_id, resposta, correta, pontuacao))
-            
+            resposta_id = cursor.lastrowid
+
+            # Mesmo commit da resposta: o evento existe se, e somente se, a resposta existe
+            cursor.execute('SELECT nome FROM alunos WHERE id = ?', (aluno_id,))
+            aluno = cursor.fetchone()
+            dados = {
+                'resposta_id': resposta_id, 'sala_id': sala_id, 'aluno_id': aluno_id, 'nome': aluno[0] if aluno else None,
+                'desafio_id': desafio_id, 'correta': bool(correta), 'pontuacao': pontuacao,
+            }
+            cursor.execute(
+                'INSERT INTO eventos_tempo_real (canal, tipo, dados) VALUES (?, ?, ?)',
+                (canal_sala(sala_id), 'resposta_desafio', json.dumps(dados, ensure_ascii=False))
+            )
+
+            conn.commit()
+        for observador in self.observadores_eventos:
+            observador()
+        return resposta_id
+
+    # --- Eventos do tempo real (lidos pelo servidor WebSocket) ---
+    def eventos_desde(self, ultimo_id, limit=500):
+        """Eventos com id maior que `ultimo_id`, em ordem, com `dados` já decodificado."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, canal, tipo, dados FROM eventos_tempo_real
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (ultimo_id, limit))
+            return [
+                {'id': r[0], 'canal': r[1], 'tipo': r[2], 'dados': json.loads(r[3])}
+                for r in cursor.fetchall()
+            ]
+
+    def ultimo_evento_id(self):
+        """Id do evento mais recente (0 se o log está vazio)."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM eventos_tempo_real')
+            return cursor.fetchone()[0]
+
+    def limpar_eventos(self, manter=10000):
+        """Descarta o início do log, mantendo os `manter` eventos mais recentes."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'DELETE FROM eventos_tempo_real WHERE id <= (SELECT COALESCE(MAX(id), 0) FROM eventos_tempo_real) - ?',
+                (manter,)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    # --- Viagens (semente + regras + carregamento) ---
+    def registrar_viagem(self, aluno_id, sala_id, destino, nave_id, mascara, semente,
+                         versao_regras, perfil_eventos, pontuacao, chegada_ok, turnos=None):
+        """Registra uma viagem de forma compacta; o diário é regenerado a partir dela."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO viagens
+                (aluno_id, sala_id, destino, nave_id, mascara, semente, versao_regras, perfil_eventos, turnos, pontuacao, chegada_ok)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (aluno_id, sala_id, destino, nave_id, mascara, semente, versao_regras,
+                  perfil_eventos or '', turnos, pontuacao, chegada_ok))
             conn.commit()
             return cursor.lastrowid
 
+    def buscar_viagem(self, viagem_id):
+        """Retorna a viagem (com nome do aluno e código da sala) ou None."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT v.*, a.nome AS nome_aluno, s.codigo_sala AS codigo_sala
+                FROM viagens v
+                LEFT JOIN alunos a ON a.id = v.aluno_id
+                LEFT JOIN salas_virtuais s ON s.id = v.sala_id
+                WHERE v.id = ?
+            ''', (viagem_id,))
+            viagem = cursor.fetchone()
+            if viagem:
+                columns = [description[0] for description in cursor.description]
+                return dict(zip(columns, viagem))
+            return None
+
+    def listar_viagens_por_sala(self, sala_id, limit=50):
+        """Viagens mais recentes da sala, com o nome do aluno."""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT v.id, v.destino, v.nave_id, v.turnos, v.pontuacao, v.chegada_ok, v.data_viagem, a.nome AS nome_aluno
+                FROM viagens v
+                LEFT JOIN alunos a ON a.id = v.aluno_id
+                WHERE v.sala_id = ?
+                ORDER BY v.id DESC
+                LIMIT ?
+            ''', (sala_id, limit))
+            viagens = cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, viagem)) for viagem in viagens]
+
     # --- Ranking ---
     def obter_ranking_sala(self, sala_id, limit=50):
         """Retorna ranking de alunos por sala com total de pontos, tentativas e concluídos."""
@@ -464,8 +650,8 @@ class DatabaseManager:
             ]
 
 
-# Instância compartilhada
-db_manager = DatabaseManager('C:\\Users\\ricardo.moretti\\CosmoCasa\\Cosmo-Casa\\salas_virtuais.db')
+# Instância compartilhada (COSMO_DB_PATH aponta outro arquivo, p.ex. no teste de carga)
+db_manager = DatabaseManager(os.getenv('COSMO_DB_PATH', 'C:\\Users\\ricardo.moretti\\CosmoCasa\\Cosmo-Casa\\salas_virtuais.db'))
 """Camada de acesso a dados (SQLite) do Cosmo-Casa.
 
 Fornece operações para professores e alunos:
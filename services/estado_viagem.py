@@ -0,0 +1,46 @@
+"""Estado dos módulos durante uma viagem, sem tocar no catálogo global.
+
+O catálogo (`MODULOS_HABITAT`) é imutável e compartilhado; cada viagem guarda
+apenas duas máscaras de bits: módulos a bordo e módulos avariados. O estado
+cabe em dois inteiros (inclusive na sessão) e não exige cópias do catálogo.
+"""
+
+from services.data import MODULOS_HABITAT
+from services.regras import BIT_MODULO, ids_de
+
+STATUS_OK = 'Operacional'
+STATUS_AVARIADO = 'Avariado'
+
+
+class EstadoModulos:
+    """Sobreposição de status por viagem: máscara a bordo + máscara avariada."""
+
+    __slots__ = ('a_bordo', 'avariados')
+
+    def __init__(self, a_bordo, avariados=0):
+        self.a_bordo = a_bordo
+        self.avariados = avariados & a_bordo
+
+    def avariar(self, modulo_id):
+        """Marca um módulo a bordo como avariado."""
+        self.avariados |= BIT_MODULO.get(modulo_id, 0) & self.a_bordo
+
+    def status(self, modulo_id):
+        return STATUS_AVARIADO if self.avariados & BIT_MODULO.get(modulo_id, 0) else STATUS_OK
+
+    @property
+    def total_avariados(self):
+        return self.avariados.bit_count()
+
+    def itens(self):
+        """(id, registro do catálogo, status) para cada módulo a bordo, na ordem do catálogo."""
+        return [(mid, MODULOS_HABITAT[mid], self.status(mid)) for mid in ids_de(self.a_bordo)]
+
+    def como_dict(self):
+        """Forma serializável (sessão/JSON)."""
+        return {'a_bordo': self.a_bordo, 'avariados': self.avariados}
+
+    @classmethod
+    def de_dict(cls, dados):
+        dados = dados or {}
+        return cls(int(dados.get('a_bordo') or 0), int(dados.get('avariados') or 0))
@@ -0,0 +1,163 @@
+"""Motor de delta-v por estágios para as naves do catálogo.
+
+A fórmula de Tsiolkovsky de um estágio (`services.fisica.calcular_delta_v`)
+trata a nave como um único bloco. Aqui cada nave é um veículo de vários
+estágios (`services.data.ESTAGIOS_NAVES`): cada estágio queima levando os de
+cima e a carga útil, e é descartado ao terminar. Isso modela os perfis do
+catálogo (dois estágios, queimas múltiplas, estágio superior criogênico).
+
+Para cada nave são calculados:
+- delta-v ideal por estágio e total para uma carga útil;
+- tempo de queima, relação empuxo/peso e perda por gravidade estimada
+  (g0 · tempo de queima · seno médio da trajetória no estágio);
+- curva carga útil × delta-v, avaliada em lote para uma grade de cargas.
+
+O resultado de toda a frota é calculado uma vez por versão do catálogo
+(hash dos estágios e capacidades) e servido pronto em JSON (`routes/api.py`).
+"""
+
+import hashlib
+import json
+import math
+import threading
+
+from services.data import NAVES_ESPACIAIS, ESTAGIOS_NAVES
+from services.fisica import GRAVIDADE_TERRA
+
+
+# Seno médio do ângulo de trajetória por estágio: o primeiro sobe quase na
+# vertical, os superiores voam perto da horizontal
+SENOS_TRAJETORIA = (0.6, 0.15)
+SENO_ESTAGIOS_SUPERIORES = 0.05
+
+PONTOS_CURVA = 16
+CARGA_MAXIMA_CURVA = 1.5  # fração da capacidade nominal no fim da curva
+
+
+class VeiculoEstagiado:
+    """Nave de vários estágios com constantes pré-calculadas (massas em kg)."""
+
+    __slots__ = ('estagios', 'velocidades_exaustao', 'massas_iniciais', 'massas_finais',
+                 'empuxos', 'tempos_queima', 'perdas_gravidade')
+
+    def __init__(self, estagios):
+        self.estagios = tuple(estagios)
+        self.velocidades_exaustao = [e['impulso_especifico'] * GRAVIDADE_TERRA for e in self.estagios]
+        self.empuxos = [e['empuxo'] * 1000 for e in self.estagios]
+        # Massa no início e no fim da queima de cada estágio, sem a carga útil
+        self.massas_iniciais, self.massas_finais = [], []
+        acima = 0.0
+        for e in reversed(self.estagios):
+            seca, propelente = e['massa_seca'] * 1000, e['massa_combustivel'] * 1000
+            self.massas_finais.insert(0, acima + seca)
+            acima += seca + propelente
+            self.massas_iniciais.insert(0, acima)
+        self.tempos_queima = [
+            e['massa_combustivel'] * 1000 * ve / empuxo if empuxo > 0 else 0.0
+            for e, ve, empuxo in zip(self.estagios, self.velocidades_exaustao, self.empuxos)
+        ]
+        self.perdas_gravidade = [
+            GRAVIDADE_TERRA * t * (SENOS_TRAJETORIA[i] if i < len(SENOS_TRAJETORIA) else SENO_ESTAGIOS_SUPERIORES)
+            for i, t in enumerate(self.tempos_queima)
+        ]
+
+    @property
+    def carga_max_decolagem_kg(self):
+        """Maior carga útil com empuxo/peso acima de 1 na decolagem."""
+        return max(0.0, self.empuxos[0] / GRAVIDADE_TERRA - self.massas_iniciais[0])
+
+    def delta_v_estagios(self, carga_kg):
+        """Delta-v ideal (m/s) de cada estágio levando `carga_kg`."""
+        return [
+            ve * math.log((m0 + carga_kg) / (mf + carga_kg))
+            for ve, m0, mf in zip(self.velocidades_exaustao, self.massas_iniciais, self.massas_finais)
+        ]
+
+    def avaliar(self, carga_kg):
+        """Desempenho com uma carga útil: por estágio e totais (ideal, perdas, útil)."""
+        delta_v = self.delta_v_estagios(carga_kg)
+        perdas = sum(self.perdas_gravidade)
+        twr = [
+            empuxo / ((m0 + carga_kg) * GRAVIDADE_TERRA)
+            for empuxo, m0 in zip(self.empuxos, self.massas_iniciais)
+        ]
+        return {
+            'carga_kg': carga_kg,
+            'delta_v_ideal': round(sum(delta_v)),
+            'perdas_gravidade': round(perdas),
+            'delta_v_util': round(max(sum(delta_v) - perdas, 0.0)),
+            'twr_decolagem': round(twr[0], 2),
+            'decola': twr[0] > 1.0,
+            'estagios': [
+                {
+                    'nome': e['nome'],
+                    'delta_v': round(dv),
+                    'tempo_queima_s': round(t),
+                    'twr_inicial': round(w, 2),
+                    'perda_gravidade': round(p),
+                }
+                for e, dv, t, w, p in zip(self.estagios, delta_v, self.tempos_queima, twr, self.perdas_gravidade)
+            ],
+        }
+
+    def curva(self, cargas_kg):
+        """Delta-v ideal e útil para cada carga da grade, em um único passe."""
+        perdas = sum(self.perdas_gravidade)
+        constantes = list(zip(self.velocidades_exaustao, self.massas_iniciais, self.massas_finais))
+        ideal = [sum(ve * math.log((m0 + c) / (mf + c)) for ve, m0, mf in constantes) for c in cargas_kg]
+        return {
+            'carga_kg': [round(c) for c in cargas_kg],
+            'delta_v_ideal': [round(v) for v in ideal],
+            'delta_v_util': [round(max(v - perdas, 0.0)) for v in ideal],
+        }
+
+
+def _versao_catalogo():
+    dados = {
+        nave_id: {
+            'capacidade_carga': NAVES_ESPACIAIS[nave_id]['capacidade_carga'],
+            'estagios': [e.como_dict() for e in estagios],
+        }
+        for nave_id, estagios in ESTAGIOS_NAVES.items() if nave_id in NAVES_ESPACIAIS
+    }
+    return hashlib.sha1(json.dumps(dados, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+
+
+VERSAO_FROTA = _versao_catalogo()
+
+_frota = {}
+_trava = threading.Lock()
+
+
+def calcular_frota(pontos=PONTOS_CURVA):
+    """Desempenho por estágios de todas as naves com estágios no catálogo."""
+    frota = {}
+    for nave_id, estagios in ESTAGIOS_NAVES.items():
+        nave = NAVES_ESPACIAIS.get(nave_id)
+        if not nave:
+            continue
+        veiculo = VeiculoEstagiado(estagios)
+        nominal = (nave.get('capacidade_carga', 0) or 0) * 1000
+        passo = nominal * CARGA_MAXIMA_CURVA / (pontos - 1)
+        frota[nave_id] = {
+            'nome': nave['nome'],
+            'perfil_missao': nave['perfil_missao'],
+            'carga_nominal_kg': nominal,
+            'carga_max_decolagem_kg': round(veiculo.carga_max_decolagem_kg),
+            **veiculo.avaliar(nominal),
+            'curva': veiculo.curva([i * passo for i in range(pontos)]),
+        }
+    return frota
+
+
+def desempenho_frota():
+    """(versão, resultados, JSON) da frota, calculados uma vez por versão do catálogo."""
+    entrada = _frota.get(VERSAO_FROTA)
+    if entrada is None:
+        with _trava:
+            entrada = _frota.get(VERSAO_FROTA)
+            if entrada is None:
+                resultados = calcular_frota()
+                corpo = json.dumps({'versao': VERSAO_FROTA, 'naves': resultados}, ensure_ascii=False, sort_keys=True)
+                entrada = _frota[VERSAO_FROTA] = (VERSAO_FROTA, resultados, corpo)
+    return entrada
@@ -0,0 +1,164 @@
+"""Perfis de eventos por sala e sorteio O(1) pelo método alias (Walker/Vose).
+
+Cada sala pode ter um perfil de eventos: pesos relativos por nome de evento
+(ex.: mais Tempestades Solares para uma aula sobre radiação). O perfil é
+guardado em JSON na sala (`perfil_eventos_json`) e compilado em uma tabela
+alias: cada sorteio usa um único número aleatório e duas consultas, sem montar
+listas a cada turno.
+
+Os sorteadores compilados ficam em cache por sala, associados ao JSON que os
+gerou; editar o perfil invalida a entrada (e um JSON diferente no banco
+também força a recompilação). Chamadas frequentes que só têm o id da sala
+(feedback a cada clique) usam `sorteador_por_id`, que não lê o banco enquanto
+a sala está em cache.
+"""
+
+import json
+import logging
+import threading
+
+from services.data import EVENTOS_ALEATORIOS
+
+
+# Eventos sorteáveis (o "All Calm" representa a ausência de evento)
+EVENTOS_SORTEAVEIS = tuple(e for e in EVENTOS_ALEATORIOS if e.get('nome') != 'All Calm')
+NOMES_EVENTOS = tuple(e['nome'] for e in EVENTOS_SORTEAVEIS)
+PESO_MAXIMO = 100
+
+
+class TabelaAlias:
+    """Tabela alias para sortear índices com pesos arbitrários em O(1)."""
+
+    __slots__ = ('n', 'prob', 'alias')
+
+    def __init__(self, pesos):
+        pesos = [float(p) for p in pesos]
+        total = sum(pesos)
+        if not pesos or total <= 0:
+            raise ValueError('Ao menos um peso deve ser positivo')
+        self.n = n = len(pesos)
+        escalados = [p * n / total for p in pesos]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            menor, maior = pequenos.pop(), grandes.pop()
+            self.prob[menor] = escalados[menor]
+            self.alias[menor] = maior
+            escalados[maior] -= 1.0 - escalados[menor]
+            (pequenos if escalados[maior] < 1.0 else grandes).append(maior)
+        # Sobras (erros de arredondamento) ficam com probabilidade 1
+
+    def sortear(self, rng):
+        """Índice sorteado usando um único `rng.random()`."""
+        u = rng.random() * self.n
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+
+class SorteadorEventos:
+    """Perfil de eventos compilado: sorteio O(1) e frações por efeito."""
+
+    __slots__ = ('perfil', 'eventos', 'tabela', 'fracoes')
+
+    def __init__(self, perfil):
+        self.perfil = perfil
+        self.eventos = tuple(e for e in EVENTOS_SORTEAVEIS if perfil.get(e['nome'], 0) > 0)
+        pesos = [perfil[e['nome']] for e in self.eventos]
+        self.tabela = TabelaAlias(pesos)
+        total = sum(pesos)
+        self.fracoes = {}
+        for evento, peso in zip(self.eventos, pesos):
+            efeito = evento.get('efeito')
+            self.fracoes[efeito] = self.fracoes.get(efeito, 0.0) + peso / total
+
+    def sortear(self, rng):
+        """Evento sorteado (dicionário do catálogo; não deve ser alterado)."""
+        return self.eventos[self.tabela.sortear(rng)]
+
+    def fracao(self, efeito):
+        """Probabilidade de um evento sorteado ter o `efeito` informado."""
+        return self.fracoes.get(efeito, 0.0)
+
+
+PERFIL_PADRAO = {nome: 1 for nome in NOMES_EVENTOS}
+
+
+def normalizar_perfil(perfil):
+    """Valida e normaliza um perfil (nome → peso inteiro de 0 a PESO_MAXIMO).
+
+    Eventos ausentes recebem peso 0; nomes desconhecidos ou pesos inválidos
+    levantam ValueError, assim como um perfil sem nenhum peso positivo.
+    """
+    if not isinstance(perfil, dict):
+        raise ValueError('Perfil de eventos deve ser um objeto {evento: peso}')
+    desconhecidos = set(perfil) - set(NOMES_EVENTOS)
+    if desconhecidos:
+        raise ValueError(f"Eventos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    normalizado = {}
+    for nome in NOMES_EVENTOS:
+        try:
+            peso = int(perfil.get(nome, 0) or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"Peso inválido para {nome}")
+        if not 0 <= peso <= PESO_MAXIMO:
+            raise ValueError(f"Peso de {nome} deve estar entre 0 e {PESO_MAXIMO}")
+        normalizado[nome] = peso
+    if not any(normalizado.values()):
+        raise ValueError('Ao menos um evento deve ter peso positivo')
+    return normalizado
+
+
+def perfil_da_sala(sala):
+    """Perfil normalizado da sala (perfil padrão se ausente ou inválido)."""
+    bruto = (sala or {}).get('perfil_eventos_json')
+    if not bruto:
+        return dict(PERFIL_PADRAO)
+    try:
+        return normalizar_perfil(json.loads(bruto))
+    except Exception:
+        logging.exception('Perfil de eventos inválido na sala; usando perfil padrão')
+        return dict(PERFIL_PADRAO)
+
+
+_SORTEADOR_PADRAO = SorteadorEventos(PERFIL_PADRAO)
+_cache = {}
+_trava = threading.Lock()
+
+
+def sorteador_da_sala(sala):
+    """Sorteador compilado para a sala, reaproveitado enquanto o perfil não muda."""
+    if not sala or not sala.get('perfil_eventos_json'):
+        return _SORTEADOR_PADRAO
+    chave, bruto = sala.get('id'), sala.get('perfil_eventos_json')
+    entrada = _cache.get(chave)
+    if entrada is not None and entrada[0] == bruto:
+        return entrada[1]
+    sorteador = SorteadorEventos(perfil_da_sala(sala))
+    with _trava:
+        _cache[chave] = (bruto, sorteador)
+    return sorteador
+
+
+def sorteador_por_id(sala_id, buscar_sala):
+    """Sorteador da sala pelo id; `buscar_sala(sala_id)` só é chamado fora do cache.
+
+    Salas sem perfil também ficam em cache (com o sorteador padrão), para que
+    nenhuma consulta repetida chegue ao banco; `invalidar_perfil` descarta.
+    """
+    entrada = _cache.get(sala_id)
+    if entrada is not None:
+        return entrada[1]
+    sala = buscar_sala(sala_id)
+    sorteador = sorteador_da_sala(sala)
+    if sorteador is _SORTEADOR_PADRAO:
+        with _trava:
+            _cache[sala_id] = ((sala or {}).get('perfil_eventos_json'), sorteador)
+    return sorteador
+
+
+def invalidar_perfil(sala_id):
+    """Descarta o sorteador em cache da sala (chamado ao editar o perfil)."""
+    with _trava:
+        _cache.pop(sala_id, None)
@@ -0,0 +1,55 @@
+"""Feedback instantâneo do carregamento durante a seleção de módulos.
+
+Cada clique na tela de seleção consulta este módulo. A resposta vem das tabelas
+pré-computadas de `services.regras` (somas por máscara) e das distribuições
+memorizadas de `services.probabilidades`; o resultado por
+(destino, nave, máscara) também fica em cache, então cliques repetidos
+custam uma consulta de dicionário.
+"""
+
+from functools import lru_cache
+
+from services.data import NAVES_ESPACIAIS, MODULOS_HABITAT
+from services.regras import REGRAS, regras_para, ids_de, ENERGIA, AGUA, capacidade_kg
+from services.probabilidades import prever, FRACAO_TEMPESTADE_PADRAO
+
+
+@lru_cache(maxsize=65536)
+def feedback_carregamento(destino, nave_id, mascara, fracao_tempestade=FRACAO_TEMPESTADE_PADRAO):
+    """Resumo do carregamento para a interface (None se a nave não existe).
+
+    Inclui massa e razão de capacidade, essenciais faltantes, faixa de
+    pontuação prevista (percentil 90 de avarias, esperada, sem avarias) e
+    probabilidade de chegada. `fracao_tempestade` é a fração dos eventos que
+    avariam módulos no perfil de eventos da sala.
+    """
+    nave = NAVES_ESPACIAIS.get(nave_id)
+    if not nave:
+        return None
+    regras = regras_para(destino)
+    capacidade = capacidade_kg(nave, destino)
+    previsao = prever(regras, mascara, capacidade, regras.chance_evento * fracao_tempestade)
+    massa = previsao['massa']
+    minimo, maximo, _ = regras.faixa_ideal
+    razao = massa / capacidade if capacidade > 0 else 0.0
+    faltantes = ids_de(regras.faltantes(mascara))
+    return {
+        'versao_regras': REGRAS.versao,
+        'massa': massa,
+        'capacidade_kg': capacidade,
+        'razao_capacidade': round(razao, 3),
+        'faixa_ideal': [minimo, maximo],
+        'na_faixa_ideal': capacidade > 0 and minimo <= razao <= maximo,
+        'acima_do_limite': not regras.massa_ok(massa, capacidade),
+        'energia': ENERGIA(mascara),
+        'agua': AGUA(mascara),
+        'faltantes': [{'id': mid, 'nome': MODULOS_HABITAT[mid]['nome']} for mid in faltantes],
+        'faltantes_permitidos': regras.faltantes_permitidos,
+        'pontuacao': {
+            'min': previsao['pontuacao_min'],
+            'esperada': round(previsao['pontuacao_esperada'], 1),
+            'max': previsao['pontuacao_max'],
+        },
+        'pontos_minimos': regras.pontos_minimos,
+        'probabilidade_sucesso': round(previsao['probabilidade_sucesso'], 3),
+    }
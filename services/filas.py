@@ -0,0 +1,152 @@
+"""Filas de saída por conexão do servidor WebSocket (contrapressão e coalescência).
+
+Nenhuma parte do servidor escreve diretamente no socket: cada conexão tem uma
+`FilaEnvio` limitada, esvaziada por uma tarefa escritora própria. Assim um
+cliente lento (Wi-Fi ruim da escola) só atrasa a si mesmo:
+
+- mensagens com `chave` substituem a anterior de mesma chave ainda na fila
+  (progresso de uma viagem, ranking): só a mais recente é enviada;
+- mensagens `descartaveis` são descartadas quando a fila passa da metade;
+- com a fila cheia, ou um envio parado por mais de `TEMPO_MAXIMO_ENVIO`, a
+  conexão é encerrada como consumidor lento (código 1008);
+- quem transmite a própria viagem usa `enviar`, que espera espaço na fila
+  (contrapressão) em vez de enchê-la.
+
+Os contadores globais (`MetricasEnvio`) são expostos pelo servidor em
+`/metricas`.
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+
+LIMITE_FILA = 256
+TEMPO_MAXIMO_ENVIO = 10.0  # segundos
+
+
+class MetricasEnvio:
+    """Contadores agregados de todas as filas do processo."""
+
+    __slots__ = ('filas', 'enviadas', 'coalescidas', 'descartadas', 'desconectadas_lentas', 'maior_fila')
+
+    def __init__(self):
+        self.filas = set()
+        self.enviadas = 0
+        self.coalescidas = 0
+        self.descartadas = 0
+        self.desconectadas_lentas = 0
+        self.maior_fila = 0
+
+    def como_dict(self):
+        tamanhos = sorted((len(f) for f in self.filas), reverse=True)
+        return {
+            'conexoes': len(tamanhos),
+            'mensagens_na_fila': sum(tamanhos),
+            'maiores_filas': tamanhos[:5],
+            'maior_fila_registrada': self.maior_fila,
+            'enviadas': self.enviadas,
+            'coalescidas': self.coalescidas,
+            'descartadas': self.descartadas,
+            'desconectadas_lentas': self.desconectadas_lentas,
+        }
+
+
+def difundir(filas, mensagem, chave=None, descartavel=False):
+    """Entrega a mesma mensagem serializada a várias filas, sem esperar nenhuma."""
+    for fila in filas:
+        fila.colocar(mensagem, chave, descartavel)
+
+
+class FilaEnvio:
+    """Fila limitada de mensagens já serializadas de uma conexão."""
+
+    def __init__(self, websocket, metricas, limite=LIMITE_FILA, tempo_maximo=TEMPO_MAXIMO_ENVIO):
+        self.websocket = websocket
+        self.metricas = metricas
+        self.limite = limite
+        self.tempo_maximo = tempo_maximo
+        self.itens = deque()    # [chave, mensagem]
+        self.por_chave = {}     # chave → item ainda na fila
+        self.pronta = asyncio.Event()
+        self.espaco = asyncio.Event()
+        self.espaco.set()
+        self.fechada = False
+        self.desconexao = None
+        metricas.filas.add(self)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def colocar(self, mensagem, chave=None, descartavel=False):
+        """Enfileira sem esperar; retorna False se a mensagem não foi aceita."""
+        if self.fechada:
+            return False
+        if chave is not None:
+            item = self.por_chave.get(chave)
+            if item is not None:
+                item[1] = mensagem
+                self.metricas.coalescidas += 1
+                return True
+        if descartavel and len(self.itens) >= self.limite // 2:
+            self.metricas.descartadas += 1
+            return False
+        if len(self.itens) >= self.limite:
+            self._consumidor_lento('fila cheia')
+            return False
+        item = [chave, mensagem]
+        self.itens.append(item)
+        if chave is not None:
+            self.por_chave[chave] = item
+        self.metricas.maior_fila = max(self.metricas.maior_fila, len(self.itens))
+        if len(self.itens) >= self.limite // 2:
+            self.espaco.clear()
+        self.pronta.set()
+        return True
+
+    async def enviar(self, mensagem, chave=None):
+        """Enfileira esperando espaço (contrapressão para o próprio fluxo da conexão)."""
+        while not self.fechada and not self.espaco.is_set():
+            await self.espaco.wait()
+        return self.colocar(mensagem, chave)
+
+    async def escrever(self):
+        """Tarefa escritora: envia as mensagens em ordem até a conexão fechar."""
+        try:
+            while not self.fechada:
+                if not self.itens:
+                    self.pronta.clear()
+                    await self.pronta.wait()
+                    continue
+                item = self.itens.popleft()
+                chave, mensagem = item
+                if chave is not None and self.por_chave.get(chave) is item:
+                    del self.por_chave[chave]
+                if len(self.itens) < self.limite // 2:
+                    self.espaco.set()
+                try:
+                    await asyncio.wait_for(self.websocket.send(mensagem), self.tempo_maximo)
+                except asyncio.TimeoutError:
+                    self._consumidor_lento('envio parado')
+                    return
+                self.metricas.enviadas += 1
+        except Exception:
+            # Conexão encerrada pelo cliente durante o envio
+            self.fechar()
+
+    def fechar(self):
+        """Encerra a fila (ao desconectar); libera quem espera espaço."""
+        self.fechada = True
+        self.itens.clear()
+        self.por_chave.clear()
+        self.pronta.set()
+        self.espaco.set()
+        self.metricas.filas.discard(self)
+
+    def _consumidor_lento(self, motivo):
+        if self.fechada:
+            return
+        self.metricas.desconectadas_lentas += 1
+        logging.warning('Consumidor lento desconectado (%s): %s', motivo, getattr(self.websocket, 'remote_address', None))
+        self.fechar()
+        self.desconexao = asyncio.ensure_future(self.websocket.close(1008, 'Slow consumer'))
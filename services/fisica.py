@@ -0,0 +1,159 @@
+"""Física educacional das naves: delta-v, alcance e carga útil por destino.
+
+As funções de cálculo (antes soltas em `app.py`) agora alimentam o jogo: na
+inicialização é montada a matriz nave × destino com margem de delta-v, fração
+alcançável e carga máxima. Como o catálogo de naves é imutável, a matriz é
+calculada uma única vez, coluna a coluna (um vetor de delta-v das naves contra
+o vetor de requisitos dos destinos), e servida pronta em JSON
+(`routes/api.py`).
+
+A carga máxima por destino substitui a capacidade nominal (LEO/GTO) na
+pontuação: uma nave com delta-v insuficiente troca carga útil por propelente,
+na proporção do trajeto que cobriria vazia.
+"""
+
+import hashlib
+import json
+import math
+
+from services.data import NAVES_ESPACIAIS, REGRAS_MISSAO
+
+
+# --- CONSTANTES FÍSICAS PARA CÁLCULOS ---
+GRAVIDADE_TERRA = 9.81  # m/s²
+CONSTANTE_GRAVITACIONAL = 6.67430e-11  # m³/kg/s²
+MASA_TERRA = 5.972e24  # kg
+RAIO_TERRA = 6371000  # m
+
+# Delta-V necessário a partir da superfície (m/s)
+REQUISITOS_DELTA_V = {
+    'leo': 7800,         # Órbita Terrestre Baixa
+    'gto': 10700,        # Órbita de Transferência Geossíncrona
+    'lua': 10800,        # Órbita Lunar/Trajetória Lua
+    'marte': 13600,      # Trajetória Marte
+    'exoplaneta': 16600  # Escape do Sistema Solar
+}
+
+# Distância de referência de cada destino (km)
+DISTANCIAS_KM = {
+    'leo': 400,           # km de altitude
+    'gto': 35786,         # km (órbita geoestacionária)
+    'lua': 384400,        # km
+    'marte': 225e6,       # km (média)
+    'exoplaneta': 4.73e15  # km (~500 anos-luz)
+}
+
+DESTINOS = tuple(REGRAS_MISSAO)
+
+
+# --- FUNÇÕES DE CÁLCULO DE PERFORMANCE ---
+def calcular_delta_v(massa_seca, massa_combustivel, impulso_especifico):
+    """
+    Calcula o Delta-V usando a Equação de Foguete de Tsiolkovsky
+    Δv = Isp * g0 * ln(m0/mf)
+
+    Onde:
+    - Isp: Impulso específico (segundos)
+    - g0: Gravidade padrão na Terra (9.81 m/s²)
+    - m0: Massa inicial (seca + combustível)
+    - mf: Massa final (apenas seca)
+    """
+    massa_inicial = massa_seca + massa_combustivel
+    massa_final = massa_seca
+
+    if massa_final <= 0:
+        return 0
+
+    return impulso_especifico * GRAVIDADE_TERRA * math.log(massa_inicial / massa_final)
+
+
+def calcular_distancia_maxima_sem_carga(nave, destino='leo'):
+    """
+    Calcula a distância máxima que um foguete pode alcançar sem carga útil
+    considerando sua performance máxima (Delta-V total).
+
+    Com delta-v de sobra, soma à distância do destino uma aproximação pelo
+    excedente; sem delta-v suficiente, alcança a fração proporcional do trajeto.
+    """
+    destino = destino.lower()
+    delta_v_disponivel = nave['delta_v_total']
+    delta_v_necessario = REQUISITOS_DELTA_V.get(destino, REQUISITOS_DELTA_V['leo'])
+    distancia_base = DISTANCIAS_KM.get(destino, 0)
+
+    if delta_v_disponivel >= delta_v_necessario:
+        delta_v_excedente = delta_v_disponivel - delta_v_necessario
+        distancia_adicional = (delta_v_excedente / 1000) * 10000  # Aproximação
+        return distancia_base + distancia_adicional
+
+    return distancia_base * (delta_v_disponivel / delta_v_necessario)
+
+
+def calcular_carga_maxima_para_destino(nave, destino, distancia_destino=None):
+    """
+    Calcula a carga máxima (kg) possível para um destino específico.
+
+    A capacidade nominal (LEO/GTO) é reduzida pela fração do trajeto que a
+    nave cobre vazia: carga_max = capacidade_nominal * min(1, distancia_max_sem_carga / distancia_destino).
+    """
+    if distancia_destino is None:
+        distancia_destino = DISTANCIAS_KM.get(destino.lower(), 0)
+    capacidade_nominal = (nave.get('capacidade_carga', 0) or 0) * 1000  # Convertendo para kg
+    if distancia_destino <= 0:
+        return capacidade_nominal
+    distancia_max_sem_carga = calcular_distancia_maxima_sem_carga(nave, destino)
+    return capacidade_nominal * max(0.0, min(1.0, distancia_max_sem_carga / distancia_destino))
+
+
+# --- MATRIZ NAVE × DESTINO ---
+def calcular_matriz(naves=NAVES_ESPACIAIS, destinos=DESTINOS):
+    """Margem de delta-v, fração alcançável e carga máxima para cada nave e destino.
+
+    Cada grandeza é calculada como vetor (uma linha por nave) contra o vetor de
+    requisitos dos destinos; `calcular_carga_maxima_para_destino` continua sendo
+    a definição de referência (conferida em `scripts/test_fisica.py`).
+    """
+    ids = list(naves)
+    delta_v = [naves[n]['delta_v_total'] for n in ids]
+    nominal = [(naves[n].get('capacidade_carga', 0) or 0) * 1000 for n in ids]
+    requisitos = [REQUISITOS_DELTA_V[d] for d in destinos]
+
+    margens = [[dv - r for r in requisitos] for dv in delta_v]
+    fracoes = [[min(1.0, dv / r) for r in requisitos] for dv in delta_v]
+    cargas = [[c * f for f in linha] for c, linha in zip(nominal, fracoes)]
+
+    return {
+        nave_id: {
+            destino: {
+                'delta_v_disponivel': dv,
+                'delta_v_necessario': r,
+                'margem_delta_v': margem,
+                'fracao_alcancavel': round(fracao, 4),
+                'carga_maxima_kg': round(carga, 1),
+            }
+            for destino, r, margem, fracao, carga in zip(destinos, requisitos, linha_m, linha_f, linha_c)
+        }
+        for nave_id, dv, linha_m, linha_f, linha_c in zip(ids, delta_v, margens, fracoes, cargas)
+    }
+
+
+MATRIZ_VIABILIDADE = calcular_matriz()
+MATRIZ_JSON = json.dumps(
+    {'destinos': list(DESTINOS), 'naves': MATRIZ_VIABILIDADE}, ensure_ascii=False, sort_keys=True
+)
+VERSAO_MATRIZ = hashlib.sha1(MATRIZ_JSON.encode('utf-8')).hexdigest()[:10]
+
+
+def viabilidade(nave_id, destino):
+    """Linha da matriz para (nave, destino), ou None se algum dos dois é desconhecido."""
+    return MATRIZ_VIABILIDADE.get(nave_id, {}).get((destino or '').lower())
+
+
+_ID_DA_NAVE = {registro: nave_id for nave_id, registro in NAVES_ESPACIAIS.items()}
+
+
+def carga_maxima_kg(nave, destino):
+    """Carga máxima (kg) da nave para o destino, consultando a matriz pré-calculada."""
+    linha = viabilidade(_ID_DA_NAVE.get(nave), destino)
+    if linha:
+        return linha['carga_maxima_kg']
+    return calcular_carga_maxima_para_destino(nave, destino)
@@ -0,0 +1,399 @@
+"""Janelas de lançamento: gráficos "porkchop" por solução do problema de Lambert.
+
+Para cada par (data de partida, data de chegada) da grade, o problema de
+Lambert dá a órbita de transferência que liga a posição do corpo de origem na
+partida à do destino na chegada. Da velocidade de partida e de chegada saem:
+
+- C3 (km²/s²): energia característica da partida, v∞² em relação à Terra;
+- delta-v (m/s): injeção a partir de uma órbita baixa (LEO) mais o excesso
+  hiperbólico na chegada (limite superior da queima de captura).
+
+Terra → Marte usa órbitas heliocêntricas keplerianas no plano da eclíptica
+(elementos médios J2000). Terra → Lua é o caso trivial: a fase na órbita de
+estacionamento é livre, então a partida é posta a um ângulo fixo antes da Lua
+e o custo depende só do tempo de voo.
+
+A grade do intervalo padrão de cada destino (`JANELAS_PADRAO`) é calculada
+uma vez e guardada em disco em formato binário compacto (float32,
+`services.cache`); a API serve JSON e um SVG pronto (`routes/api.py`) sem
+custo de solver por requisição. Recortes da grade padrão (datas alinhadas ao
+passo dela, passo múltiplo) saem da grade gravada, também sem solver. Os
+demais intervalos pedem o solver a cada grade nova: a API pública só os
+calcula para professores, e eles ficam só no cache em memória, limitado.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import struct
+from array import array
+from datetime import date, timedelta
+from functools import lru_cache
+
+from services.cache import caminho_cache, ler_binario, gravar_binario
+from services.trajetoria import MU_TERRA, MU_SOL, UA_KM, SEGUNDOS_POR_DIA
+
+
+J2000 = date(2000, 1, 1)  # 12h TT; as datas da grade são ao meio-dia
+RAIO_LEO_KM = 6771.0
+
+# Elementos médios J2000 no plano da eclíptica: semi-eixo (UA), excentricidade,
+# longitude do periélio (°), longitude média (°) e sua taxa (°/século)
+ELEMENTOS = {
+    'terra': (1.00000261, 0.01671123, 102.93768193, 100.46457166, 35999.37244981),
+    'marte': (1.52371034, 0.09339410, -23.94362959, -4.55343205, 19140.30268499),
+}
+# Órbita lunar circular: raio (km), período sideral (dias), longitude média J2000 (°)
+ORBITA_LUA = (384400.0, 27.321661, 218.316)
+# Caso trivial Terra → Lua: ângulo de transferência fixo a partir da LEO
+ANGULO_TRANSFERENCIA_LUA = math.radians(175.0)
+
+# Intervalos padrão: (primeira partida, dias de partida, primeira chegada, dias de chegada, passo)
+JANELAS_PADRAO = {
+    'marte': (date(2026, 8, 1), 180, date(2027, 1, 1), 360, 5),
+    'lua': (date(2026, 11, 1), 14, date(2026, 11, 3), 14, 1),
+}
+MAXIMO_CELULAS = 120 * 120
+# Período em que os elementos médios J2000 valem (aproximação do JPL)
+PERIODO_EFEMERIDES = (date(1800, 1, 1), date(2050, 12, 31))
+
+_CABECALHO = struct.Struct('<4sHHH')
+_MAGICO = b'CCPK'
+_FORMATO = 1
+
+VERSAO_EFEMERIDES = hashlib.sha1(
+    json.dumps([ELEMENTOS, ORBITA_LUA, RAIO_LEO_KM, math.degrees(ANGULO_TRANSFERENCIA_LUA)], sort_keys=True).encode('utf-8')
+).hexdigest()[:10]
+
+
+# --- EFEMÉRIDES ---
+def _dias_j2000(dia):
+    return (dia - J2000).days - 0.5
+
+
+def estado_planeta(planeta, dia):
+    """Posição (km) e velocidade (km/s) heliocêntricas do planeta na data."""
+    a_ua, e, perielio, longitude, taxa = ELEMENTOS[planeta]
+    a = a_ua * UA_KM
+    t = _dias_j2000(dia)
+    n = math.radians(taxa) / (36525 * SEGUNDOS_POR_DIA)  # rad/s
+    w = math.radians(perielio)
+    m = math.radians(longitude + taxa * t / 36525) - w
+    m = math.remainder(m, 2 * math.pi)
+    anomalia = m + e * math.sin(m)
+    for _ in range(8):
+        anomalia -= (anomalia - e * math.sin(anomalia) - m) / (1 - e * math.cos(anomalia))
+    cos_e, sen_e = math.cos(anomalia), math.sin(anomalia)
+    raiz = math.sqrt(1 - e * e)
+    x, y = a * (cos_e - e), a * raiz * sen_e
+    taxa_e = n / (1 - e * cos_e)
+    vx, vy = -a * sen_e * taxa_e, a * raiz * cos_e * taxa_e
+    cos_w, sen_w = math.cos(w), math.sin(w)
+    return (
+        (x * cos_w - y * sen_w, x * sen_w + y * cos_w),
+        (vx * cos_w - vy * sen_w, vx * sen_w + vy * cos_w),
+    )
+
+
+def estado_lua(dia):
+    """Posição (km) e velocidade (km/s) geocêntricas da Lua na data (órbita circular)."""
+    raio, periodo, longitude = ORBITA_LUA
+    omega = 2 * math.pi / (periodo * SEGUNDOS_POR_DIA)
+    angulo = math.radians(longitude) + omega * _dias_j2000(dia) * SEGUNDOS_POR_DIA
+    velocidade = omega * raio
+    return (
+        (raio * math.cos(angulo), raio * math.sin(angulo)),
+        (-velocidade * math.sin(angulo), velocidade * math.cos(angulo)),
+    )
+
+
+# --- PROBLEMA DE LAMBERT ---
+def _stumpff(z):
+    if z > 1e-8:
+        s = math.sqrt(z)
+        return (1 - math.cos(s)) / z, (s - math.sin(s)) / (s * z)
+    if z < -1e-8:
+        s = math.sqrt(-z)
+        return (math.cosh(s) - 1) / -z, (math.sinh(s) - s) / (s * -z)
+    return 0.5, 1 / 6
+
+
+def lambert(mu, r1, r2, tempo_voo, iteracoes=50):
+    """Velocidades (v1, v2) da transferência prograda de r1 a r2 em `tempo_voo` (s).
+
+    Variáveis universais com bissecção em z (uma revolução no máximo).
+    Retorna None quando não há solução nesse regime.
+    """
+    n1, n2 = math.hypot(*r1), math.hypot(*r2)
+    angulo = math.atan2(r1[0] * r2[1] - r1[1] * r2[0], r1[0] * r2[0] + r1[1] * r2[1])
+    if angulo < 0:
+        angulo += 2 * math.pi
+    a_geom = math.sin(angulo) * math.sqrt(n1 * n2 / (1 - math.cos(angulo)))
+    if abs(a_geom) < 1e-9:
+        return None
+    raiz_mu = math.sqrt(mu)
+
+    def tempo_e_y(z):
+        c, s = _stumpff(z)
+        y = n1 + n2 + a_geom * (z * s - 1) / math.sqrt(c)
+        if y < 0:
+            return None, y
+        return ((y / c) ** 1.5 * s + a_geom * math.sqrt(y)) / raiz_mu, y
+
+    baixo, alto = -4 * math.pi ** 2, 4 * math.pi ** 2 - 1e-6
+    t_alto, _ = tempo_e_y(alto)
+    if t_alto is None or t_alto < tempo_voo:
+        return None
+    y = None
+    for _ in range(iteracoes):
+        meio = (baixo + alto) / 2
+        t, y_meio = tempo_e_y(meio)
+        if t is None or t < tempo_voo:
+            baixo = meio
+        else:
+            alto, y = meio, y_meio
+    if y is None:
+        return None
+    f = 1 - y / n1
+    g = a_geom * math.sqrt(y / mu)
+    g_ponto = 1 - y / n2
+    v1 = ((r2[0] - f * r1[0]) / g, (r2[1] - f * r1[1]) / g)
+    v2 = ((g_ponto * r2[0] - r1[0]) / g, (g_ponto * r2[1] - r1[1]) / g)
+    return v1, v2
+
+
+# --- GRADE PORKCHOP ---
+def _celula_marte(partida, chegada, dia_partida, dia_chegada):
+    (r1, v_terra), (r2, v_marte) = partida, chegada
+    solucao = lambert(MU_SOL, r1, r2, (dia_chegada - dia_partida).days * SEGUNDOS_POR_DIA)
+    if solucao is None:
+        return math.nan, math.nan
+    v1, v2 = solucao
+    c3 = (v1[0] - v_terra[0]) ** 2 + (v1[1] - v_terra[1]) ** 2
+    injecao = math.sqrt(c3 + 2 * MU_TERRA / RAIO_LEO_KM) - math.sqrt(MU_TERRA / RAIO_LEO_KM)
+    chegada_vinf = math.hypot(v2[0] - v_marte[0], v2[1] - v_marte[1])
+    return c3, (injecao + chegada_vinf) * 1000
+
+
+def _celula_lua(partida, chegada, dia_partida, dia_chegada):
+    r2, v_lua = chegada
+    # Fase livre na LEO: parte ANGULO_TRANSFERENCIA_LUA antes da posição de chegada da Lua
+    angulo = math.atan2(r2[1], r2[0]) - ANGULO_TRANSFERENCIA_LUA
+    r1 = (RAIO_LEO_KM * math.cos(angulo), RAIO_LEO_KM * math.sin(angulo))
+    v_leo = math.sqrt(MU_TERRA / RAIO_LEO_KM)
+    v_circular = (-v_leo * math.sin(angulo), v_leo * math.cos(angulo))
+    solucao = lambert(MU_TERRA, r1, r2, (dia_chegada - dia_partida).days * SEGUNDOS_POR_DIA)
+    if solucao is None:
+        return math.nan, math.nan
+    v1, v2 = solucao
+    c3 = v1[0] ** 2 + v1[1] ** 2 - 2 * MU_TERRA / RAIO_LEO_KM
+    injecao = math.hypot(v1[0] - v_circular[0], v1[1] - v_circular[1])
+    chegada_vinf = math.hypot(v2[0] - v_lua[0], v2[1] - v_lua[1])
+    return c3, (injecao + chegada_vinf) * 1000
+
+
+_PROBLEMAS = {
+    'marte': (lambda dia: estado_planeta('terra', dia), lambda dia: estado_planeta('marte', dia), _celula_marte),
+    'lua': (lambda dia: None, estado_lua, _celula_lua),
+}
+
+
+def dentro_das_efemerides(partida, dias_partida, chegada, dias_chegada):
+    """Se os eixos de datas do intervalo cabem no período válido das efemérides."""
+    inicio, fim = (d.toordinal() for d in PERIODO_EFEMERIDES)
+    return all(
+        inicio <= dia.toordinal() and dia.toordinal() + dias <= fim
+        for dia, dias in ((partida, dias_partida), (chegada, dias_chegada))
+    )
+
+
+def _datas(inicio, dias, passo):
+    return [inicio + timedelta(days=d) for d in range(0, dias + 1, passo)]
+
+
+def calcular_grade(destino, partida, dias_partida, chegada, dias_chegada, passo):
+    """C3 e delta-v (float32, linha por data de partida) para a grade de datas."""
+    estado_origem, estado_destino, celula = _PROBLEMAS[destino]
+    datas_partida = _datas(partida, dias_partida, passo)
+    datas_chegada = _datas(chegada, dias_chegada, passo)
+    # Efemérides uma vez por eixo; o solver roda por célula
+    origens = [estado_origem(d) for d in datas_partida]
+    destinos = [estado_destino(d) for d in datas_chegada]
+    c3, delta_v = array('f'), array('f')
+    for dia_partida, origem in zip(datas_partida, origens):
+        for dia_chegada, alvo in zip(datas_chegada, destinos):
+            if dia_chegada <= dia_partida:
+                c3.append(math.nan)
+                delta_v.append(math.nan)
+                continue
+            valor_c3, valor_dv = celula(origem, alvo, dia_partida, dia_chegada)
+            c3.append(valor_c3)
+            delta_v.append(valor_dv)
+    return datas_partida, datas_chegada, c3, delta_v
+
+
+def _serializar(n_partida, n_chegada, c3, delta_v):
+    return _CABECALHO.pack(_MAGICO, _FORMATO, n_partida, n_chegada) + c3.tobytes() + delta_v.tobytes()
+
+
+def _desserializar(dados, n_partida, n_chegada):
+    magico, formato, n_p, n_c = _CABECALHO.unpack_from(dados)
+    if magico != _MAGICO or formato != _FORMATO or (n_p, n_c) != (n_partida, n_chegada):
+        return None
+    celulas = n_p * n_c
+    c3, delta_v = array('f'), array('f')
+    inicio = _CABECALHO.size
+    c3.frombytes(dados[inicio:inicio + 4 * celulas])
+    delta_v.frombytes(dados[inicio + 4 * celulas:inicio + 8 * celulas])
+    if len(delta_v) != celulas:
+        return None
+    return c3, delta_v
+
+
+def chave_grade(destino, partida, dias_partida, chegada, dias_chegada, passo):
+    return f"{destino}_{partida.isoformat()}_{dias_partida}_{chegada.isoformat()}_{dias_chegada}_{passo}"
+
+
+def recorte_da_padrao(destino, partida, dias_partida, chegada, dias_chegada, passo):
+    """Se o intervalo é um recorte da grade padrão do destino (sem solver)."""
+    padrao = JANELAS_PADRAO.get(destino)
+    if padrao is None:
+        return False
+    partida_padrao, dias_partida_padrao, chegada_padrao, dias_chegada_padrao, passo_padrao = padrao
+    if passo % passo_padrao:
+        return False
+    return all(
+        desvio >= 0 and desvio % passo_padrao == 0 and desvio + dias <= dias_padrao
+        for desvio, dias, dias_padrao in (
+            ((partida - partida_padrao).days, dias_partida, dias_partida_padrao),
+            ((chegada - chegada_padrao).days, dias_chegada, dias_chegada_padrao),
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def _grades_padrao(destino):
+    """C3 e delta-v da grade padrão do destino: do cache binário, ou calculadas e gravadas na primeira vez."""
+    intervalo = JANELAS_PADRAO[destino]
+    partida, dias_partida, chegada, dias_chegada, passo = intervalo
+    n_partida, n_chegada = len(_datas(partida, dias_partida, passo)), len(_datas(chegada, dias_chegada, passo))
+    chave = chave_grade(destino, *intervalo)
+    caminho = caminho_cache('janelas', VERSAO_EFEMERIDES, f"{chave}.bin")
+    dados = ler_binario(caminho)
+    grades = _desserializar(dados, n_partida, n_chegada) if dados else None
+    if grades is None:
+        logging.info(f"Calculando janelas de lançamento {chave}")
+        _, _, c3, delta_v = calcular_grade(destino, *intervalo)
+        gravar_binario(caminho, _serializar(n_partida, n_chegada, c3, delta_v))
+        grades = c3, delta_v
+    return grades
+
+
+def _recortar(destino, partida, dias_partida, chegada, dias_chegada, passo):
+    """C3 e delta-v de um recorte (`recorte_da_padrao`), lidos da grade padrão."""
+    partida_padrao, _, chegada_padrao, dias_chegada_padrao, passo_padrao = JANELAS_PADRAO[destino]
+    c3, delta_v = _grades_padrao(destino)
+    colunas = dias_chegada_padrao // passo_padrao + 1
+    salto = passo // passo_padrao
+    primeira_linha = (partida - partida_padrao).days // passo_padrao
+    primeira_coluna = (chegada - chegada_padrao).days // passo_padrao
+    indices = [
+        (primeira_linha + i * salto) * colunas + primeira_coluna + j * salto
+        for i in range(dias_partida // passo + 1)
+        for j in range(dias_chegada // passo + 1)
+    ]
+    return array('f', (c3[k] for k in indices)), array('f', (delta_v[k] for k in indices))
+
+
+@lru_cache(maxsize=32)
+def grade_janelas(destino, partida, dias_partida, chegada, dias_chegada, passo):
+    """Grade porkchop do intervalo: a padrão do destino e seus recortes vêm do
+    cache binário (calculado e gravado na primeira vez); as demais são
+    calculadas aqui e não vão para o disco.
+
+    Retorna dict com os eixos de datas (ISO), as matrizes `c3` e `delta_v`
+    (listas por data de partida, None onde não há transferência) e a melhor
+    janela por delta-v.
+    """
+    chave = chave_grade(destino, partida, dias_partida, chegada, dias_chegada, passo)
+    datas_partida = _datas(partida, dias_partida, passo)
+    datas_chegada = _datas(chegada, dias_chegada, passo)
+    if recorte_da_padrao(destino, partida, dias_partida, chegada, dias_chegada, passo):
+        c3, delta_v = _recortar(destino, partida, dias_partida, chegada, dias_chegada, passo)
+    else:
+        logging.info(f"Calculando janelas de lançamento {chave}")
+        _, _, c3, delta_v = calcular_grade(destino, partida, dias_partida, chegada, dias_chegada, passo)
+
+    colunas = len(datas_chegada)
+
+    def linhas(valores, casas):
+        return [
+            [None if math.isnan(v) else round(v, casas) for v in valores[i:i + colunas]]
+            for i in range(0, len(valores), colunas)
+        ]
+
+    melhor = None
+    validos = [(v, i) for i, v in enumerate(delta_v) if not math.isnan(v)]
+    if validos:
+        valor, indice = min(validos)
+        p, c = divmod(indice, colunas)
+        melhor = {
+            'partida': datas_partida[p].isoformat(),
+            'chegada': datas_chegada[c].isoformat(),
+            'dias_viagem': (datas_chegada[c] - datas_partida[p]).days,
+            'c3': round(c3[indice], 2),
+            'delta_v': round(valor),
+        }
+    return {
+        'destino': destino,
+        'versao': f"{VERSAO_EFEMERIDES}-{chave}",
+        'partida': [d.isoformat() for d in datas_partida],
+        'chegada': [d.isoformat() for d in datas_chegada],
+        'c3': linhas(c3, 2),
+        'delta_v': linhas(delta_v, 0),
+        'melhor': melhor,
+    }
+
+
+@lru_cache(maxsize=32)
+def grafico_porkchop(destino, partida, dias_partida, chegada, dias_chegada, passo, largura=480, altura=360):
+    """SVG do mapa de delta-v (partida no eixo x, chegada no eixo y)."""
+    grade = grade_janelas(destino, partida, dias_partida, chegada, dias_chegada, passo)
+    linhas = grade['delta_v']
+    n_partida, n_chegada = len(grade['partida']), len(grade['chegada'])
+    validos = [v for linha in linhas for v in linha if v is not None]
+    if not validos:
+        return f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}"></svg>'
+    minimo = min(validos)
+    # Escala de cor até 2× o mínimo: acima disso a janela já não é prática
+    maximo = max(min(max(validos), 2 * minimo), minimo + 1)
+    w, h = largura / n_partida, altura / n_chegada
+    celulas = []
+    for i, linha in enumerate(linhas):
+        for j, v in enumerate(linha):
+            if v is None:
+                continue
+            fracao = min((v - minimo) / (maximo - minimo), 1.0)
+            cor = f"hsl({round(120 * (1 - fracao))},80%,{round(30 + 20 * fracao)}%)"
+            celulas.append(
+                f'<rect x="{i * w:.1f}" y="{altura - (j + 1) * h:.1f}" width="{w + 0.5:.1f}" height="{h + 0.5:.1f}" fill="{cor}"/>'
+            )
+    melhor = grade['melhor']
+    marcador = ''
+    if melhor:
+        i = grade['partida'].index(melhor['partida'])
+        j = grade['chegada'].index(melhor['chegada'])
+        marcador = (
+            f'<circle cx="{(i + 0.5) * w:.1f}" cy="{altura - (j + 0.5) * h:.1f}" r="5" '
+            f'fill="none" stroke="#fff" stroke-width="2"><title>{melhor["partida"]} → {melhor["chegada"]}: '
+            f'{melhor["delta_v"]} m/s</title></circle>'
+        )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {largura} {altura}" width="{largura}" height="{altura}">'
+        f'<rect width="{largura}" height="{altura}" fill="#0b1020"/>'
+        + ''.join(celulas) + marcador +
+        f'<text x="4" y="{altura - 4}" fill="#fff" font-size="11">Departure {grade["partida"][0]} → {grade["partida"][-1]}</text>'
+        f'<text x="4" y="14" fill="#fff" font-size="11">Arrival {grade["chegada"][0]} → {grade["chegada"][-1]}</text>'
+        '</svg>'
+    )
@@ -0,0 +1,182 @@
+"""Soluções de referência: fronteira de Pareto de carregamentos por nave e destino.
+
+Objetivos (por carregamento de módulos):
+- maximizar a pontuação esperada (modelo de `services.probabilidades`);
+- maximizar a margem de massa em relação à capacidade da nave;
+- minimizar o consumo de energia e de água.
+
+Em vez de avaliar os 2^18 subconjuntos, a busca explora a estrutura das
+regras: massa, energia e água só crescem ao adicionar um módulo, e um módulo
+não essencial só melhora a pontuação se levar a carga para a faixa ideal ou,
+se for de `MASCARA_RECURSOS` (reciclagem de água, mitigação de choques),
+reduzir a penalidade de recursos. Logo, toda solução ótima é (subconjunto dos
+essenciais) + (subconjunto desses módulos de recursos) + (nada, ou um conjunto
+*minimal* dos demais módulos livres que atinge a faixa ideal). Esses conjuntos
+são enumerados por branch-and-bound e filtrados por dominância.
+
+As fronteiras são memorizadas e persistidas em disco por
+(versão das regras, nave, destino, capacidade), carregando instantaneamente
+nas requisições seguintes.
+"""
+
+import logging
+import threading
+
+from services.data import NAVES_ESPACIAIS, MODULOS_HABITAT
+from services.regras import (
+    REGRAS, regras_para, ORDEM_MODULOS, BIT_MODULO, MASSA, ENERGIA, AGUA,
+    mascara_de, ids_de, capacidade_kg
+)
+from services.probabilidades import prever
+from services.recursos import MASCARA_RECURSOS
+from services.cache import caminho_cache, ler_json, gravar_json
+
+
+_fronteiras = {}
+_trava = threading.Lock()
+
+
+def _submascaras(mascara):
+    """Todas as submáscaras de `mascara` (incluindo 0 e ela mesma)."""
+    sub = mascara
+    while True:
+        yield sub
+        if sub == 0:
+            return
+        sub = (sub - 1) & mascara
+
+
+def _cargas_minimas(livres, piso, teto):
+    """Conjuntos minimais de módulos livres com massa em [piso, teto].
+
+    Minimal: remover qualquer módulo leva a massa abaixo do piso. Com os
+    módulos em ordem decrescente de massa, basta parar a descida assim que o
+    piso é atingido (o último módulo adicionado é o mais leve do conjunto).
+    """
+    itens = sorted(((MODULOS_HABITAT[mid]['massa'], BIT_MODULO[mid]) for mid in ids_de(livres)), reverse=True)
+    sufixo = [0] * (len(itens) + 1)
+    for i in range(len(itens) - 1, -1, -1):
+        sufixo[i] = sufixo[i + 1] + itens[i][0]
+    encontrados = []
+
+    def busca(inicio, massa, mascara):
+        for j in range(inicio, len(itens)):
+            m, bit = itens[j]
+            nova = massa + m
+            if nova >= piso:
+                if nova <= teto:
+                    encontrados.append(mascara | bit)
+                continue
+            # Poda: nem somando todos os restantes se alcança o piso
+            if nova + sufixo[j + 1] < piso:
+                break
+            busca(j + 1, nova, mascara | bit)
+
+    if piso > 0 and sufixo[0] >= piso:
+        busca(0, 0, 0)
+    return encontrados
+
+
+def _candidatos(regras, capacidade):
+    """Máscaras candidatas à fronteira (superconjunto da fronteira exata)."""
+    livres = ((1 << len(ORDEM_MODULOS)) - 1) & ~regras.mascara_essenciais
+    recursos = livres & MASCARA_RECURSOS
+    minimo, maximo, _ = regras.faixa_ideal
+    candidatos = set()
+    for essenciais in _submascaras(regras.mascara_essenciais):
+        for extras in _submascaras(recursos):
+            base = essenciais | extras
+            if base:
+                candidatos.add(base)
+            else:
+                # Viagem exige ao menos um módulo: o menor conjunto é um módulo livre
+                candidatos.update(BIT_MODULO[mid] for mid in ids_de(livres))
+            if capacidade <= 0:
+                continue
+            massa_base = MASSA(base)
+            teto = capacidade * maximo - massa_base
+            piso = capacidade * minimo - massa_base
+            for carga in _cargas_minimas(livres & ~recursos, piso, teto):
+                candidatos.add(base | carga)
+    return candidatos
+
+
+def _solucao(regras, mascara, capacidade):
+    previsao = prever(regras, mascara, capacidade)
+    return {
+        'modulos': ids_de(mascara),
+        'pontuacao_esperada': round(previsao['pontuacao_esperada'], 2),
+        'probabilidade_sucesso': round(previsao['probabilidade_sucesso'], 4),
+        'pontuacao_max': previsao['pontuacao_max'],
+        'massa': previsao['massa'],
+        'margem_massa_kg': round(capacidade - previsao['massa'], 1),
+        'energia': ENERGIA(mascara),
+        'agua': AGUA(mascara),
+    }
+
+
+def calcular_fronteira(regras, capacidade):
+    """Fronteira de Pareto exata para as regras e capacidade informadas."""
+    solucoes = [_solucao(regras, m, capacidade) for m in _candidatos(regras, capacidade)]
+    solucoes.sort(key=lambda s: (-s['pontuacao_esperada'], s['massa'], s['energia'], s['agua']))
+    fronteira = []
+    for s in solucoes:
+        dominada = any(
+            f['massa'] <= s['massa'] and f['energia'] <= s['energia'] and f['agua'] <= s['agua']
+            for f in fronteira
+        )
+        if not dominada:
+            fronteira.append(s)
+    return fronteira
+
+
+def fronteira_pareto(nave_id, destino):
+    """Fronteira de referência para (nave, destino), com cache em memória e disco."""
+    nave = NAVES_ESPACIAIS.get(nave_id)
+    if not nave:
+        return []
+    regras = regras_para(destino)
+    capacidade = capacidade_kg(nave, regras.destino)
+    chave = f"{REGRAS.versao}/{nave_id}_{regras.destino}_{int(capacidade)}"
+    fronteira = _fronteiras.get(chave)
+    if fronteira is not None:
+        return fronteira
+    with _trava:
+        fronteira = _fronteiras.get(chave)
+        if fronteira is None:
+            caminho = caminho_cache('referencias', f"{chave}.json")
+            fronteira = ler_json(caminho)
+            if fronteira is None:
+                logging.info(f"Calculando soluções de referência para {nave_id}/{regras.destino}")
+                fronteira = calcular_fronteira(regras, capacidade)
+                gravar_json(caminho, fronteira)
+            _fronteiras[chave] = fronteira
+    return fronteira
+
+
+def comparar_com_referencia(nave_id, destino, modulos):
+    """Compara um carregamento de aluno com a fronteira de referência.
+
+    Retorna a previsão do carregamento, a melhor pontuação esperada possível,
+    o percentual atingido e a solução de referência que o domina (se houver).
+    """
+    nave = NAVES_ESPACIAIS.get(nave_id)
+    fronteira = fronteira_pareto(nave_id, destino)
+    if not nave or not fronteira:
+        return None
+    regras = regras_para(destino)
+    aluno = _solucao(regras, mascara_de(modulos), capacidade_kg(nave, regras.destino))
+    melhor = fronteira[0]['pontuacao_esperada']
+    dominante = next((
+        f for f in fronteira
+        if f['pontuacao_esperada'] >= aluno['pontuacao_esperada']
+        and f['massa'] <= aluno['massa'] and f['energia'] <= aluno['energia'] and f['agua'] <= aluno['agua']
+        and f['modulos'] != aluno['modulos']
+    ), None)
+    return {
+        'aluno': aluno,
+        'melhor_pontuacao_esperada': melhor,
+        'percentual_da_referencia': round(100 * aluno['pontuacao_esperada'] / melhor, 1) if melhor else 0.0,
+        'na_fronteira': dominante is None,
+        'dominada_por': dominante,
+    }
@@ -0,0 +1,114 @@
+"""Ranking ao vivo com atualizações incrementais (deltas versionados).
+
+O servidor WebSocket mantém a última classificação das salas ativas
+(`DatabaseManager.obter_ranking_salas_ativas`) e a recalcula uma vez por
+alteração em `respostas_desafios` (não uma vez por espectador). Cada nova
+classificação recebe um número de versão; os clientes guardam a versão que
+têm e recebem só as posições que mudaram desde ela:
+
+- `delta(ranking)` compara com a classificação anterior e devolve as linhas
+  alteradas (posição ou valores) e os alunos que saíram;
+- `desde(epoca, versao)` junta os deltas guardados desde a versão do cliente
+  ou, se ela é antiga demais (ou de outra execução do servidor), devolve a
+  classificação inteira;
+- `adotar(instantaneo)` segue a classificação calculada em outro processo
+  (vários núcleos: só um deles recalcula), com a mesma época e as mesmas
+  versões, para que qualquer processo atenda o `ranking_sync`.
+
+A época identifica a execução do servidor: versões só valem dentro dela.
+"""
+
+import secrets
+from collections import deque
+
+
+CAMPOS_RANKING = ('nome', 'total', 'concluidos', 'tentativas')
+DELTAS_GUARDADOS = 64
+
+
+def _linhas(ranking):
+    """Classificação como {aluno_id: linha com posição}."""
+    return {
+        item['id']: {'id': item['id'], 'posicao': posicao, **{c: item[c] for c in CAMPOS_RANKING}}
+        for posicao, item in enumerate(ranking, start=1)
+    }
+
+
+class PlacarAoVivo:
+    """Classificação versionada e histórico curto de deltas."""
+
+    def __init__(self, guardados=DELTAS_GUARDADOS):
+        self.epoca = secrets.token_hex(4)
+        self.versao = 0
+        self.linhas = {}
+        self.historico = deque(maxlen=guardados)  # (versão base, alteradas, removidos)
+
+    def delta(self, ranking):
+        """Registra uma nova classificação; retorna a mensagem de delta ou None se nada mudou."""
+        novas = _linhas(ranking)
+        alteradas = {i: linha for i, linha in novas.items() if self.linhas.get(i) != linha}
+        removidos = set(self.linhas) - set(novas)
+        if not alteradas and not removidos:
+            return None
+        return self._registrar(novas, alteradas, removidos)
+
+    def _registrar(self, novas, alteradas, removidos):
+        base = self.versao
+        self.versao += 1
+        self.linhas = novas
+        self.historico.append((base, alteradas, removidos))
+        return self._mensagem_delta(base, alteradas, removidos)
+
+    def adotar(self, instantaneo):
+        """Passa à classificação de `instantaneo` (`ranking_snapshot` de outro processo).
+
+        Retorna o delta desde a versão local quando ela é a anterior; o próprio
+        instantâneo quando a local é de outra época ou ficou para trás; None se
+        já está nessa versão.
+        """
+        epoca, versao = instantaneo['epoca'], instantaneo['versao']
+        if epoca == self.epoca and versao == self.versao:
+            return None
+        novas = {linha['id']: linha for linha in instantaneo['itens']}
+        if epoca == self.epoca and versao == self.versao + 1:
+            alteradas = {i: linha for i, linha in novas.items() if self.linhas.get(i) != linha}
+            return self._registrar(novas, alteradas, set(self.linhas) - set(novas))
+        self.epoca, self.versao, self.linhas = epoca, versao, novas
+        self.historico.clear()
+        return instantaneo
+
+    def _mensagem_delta(self, base, alteradas, removidos):
+        return {
+            'type': 'ranking_delta',
+            'epoca': self.epoca,
+            'de': base,
+            'versao': self.versao,
+            'alteracoes': sorted(alteradas.values(), key=lambda l: l['posicao']),
+            'removidos': sorted(removidos),
+        }
+
+    def instantaneo(self):
+        """Classificação inteira na versão atual."""
+        return {
+            'type': 'ranking_snapshot',
+            'epoca': self.epoca,
+            'versao': self.versao,
+            'itens': sorted(self.linhas.values(), key=lambda l: l['posicao']),
+        }
+
+    def desde(self, epoca, versao):
+        """Mensagem que leva um cliente da `versao` à atual (None se já está atualizado)."""
+        if epoca == self.epoca and versao == self.versao:
+            return None
+        if epoca != self.epoca or not isinstance(versao, int) or versao > self.versao \
+                or not self.historico or versao < self.historico[0][0]:
+            return self.instantaneo()
+        alteradas, removidos = {}, set()
+        for base, delta_alteradas, delta_removidos in self.historico:
+            if base < versao:
+                continue
+            for i in delta_removidos:
+                alteradas.pop(i, None)
+            removidos = (removidos | delta_removidos) - set(delta_alteradas)
+            alteradas.update(delta_alteradas)
+        return self._mensagem_delta(versao, alteradas, removidos)
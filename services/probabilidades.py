@@ -0,0 +1,122 @@
+"""Modelo probabilístico da viagem (avarias, sucesso e pontuação esperada).
+
+A simulação em turnos sorteia, a cada turno, um evento com probabilidade
+`chance_evento`; entre os eventos possíveis, a Tempestade Solar avaria um
+módulo escolhido uniformemente entre os que estão a bordo. Como a pontuação
+só depende do número de módulos avariados distintos, a distribuição exata
+desse número é obtida por uma cadeia de Markov pequena (turnos × módulos),
+sem simular viagens.
+
+A penalidade de energia e água (`services.recursos`) entra como a do consumo
+médio por turno (`penalidade_prevista`), descontada da pontuação antes das
+avarias.
+
+As distribuições são memorizadas por (turnos, probabilidade, módulos a bordo),
+de modo que previsões por carregamento custam apenas algumas somas.
+"""
+
+from functools import lru_cache
+
+from services.data import EVENTOS_ALEATORIOS
+from services.recursos import penalidade_prevista, resumo_recursos
+from services.regras import MASSA
+
+
+# Fração dos eventos sorteáveis (exceto "All Calm") que avariam módulos
+_SORTEAVEIS = [e for e in EVENTOS_ALEATORIOS if e.get('nome') != 'All Calm']
+FRACAO_TEMPESTADE_PADRAO = (
+    sum(1 for e in _SORTEAVEIS if e.get('efeito') == 'risco_avaria_modulo') / len(_SORTEAVEIS)
+)
+
+
+def p_tempestade_padrao(regras):
+    """Probabilidade por turno de um evento que avaria módulo (perfil uniforme)."""
+    return regras.chance_evento * FRACAO_TEMPESTADE_PADRAO
+
+
+@lru_cache(maxsize=1024)
+def distribuicao_avarias(turnos, p_tempestade, modulos):
+    """Distribuição exata do número de módulos avariados distintos.
+
+    Retorna uma tupla `P[d]` para d = 0..modulos. A cada turno, com
+    probabilidade `p_tempestade`, um módulo uniforme é atingido; o número de
+    avariados só cresce se o módulo atingido ainda estava intacto.
+    """
+    if modulos <= 0:
+        return (1.0,)
+    dist = [1.0] + [0.0] * modulos
+    for _ in range(turnos):
+        novo = [0.0] * (modulos + 1)
+        for d, p in enumerate(dist):
+            if not p:
+                continue
+            repete = p_tempestade * d / modulos
+            novo[d] += p - p_tempestade * p + p * repete
+            if d < modulos:
+                novo[d + 1] += p * (p_tempestade - repete)
+        dist = novo
+    return tuple(dist)
+
+
+def _limite_avarias(regras, pontos_base):
+    """Maior número de avarias que ainda permite a chegada (-1 se nenhum)."""
+    if regras.pontos_minimos <= 0:
+        return regras.tolerancia_avarias
+    if regras.penal_por_avaria <= 0:
+        return regras.tolerancia_avarias if pontos_base >= regras.pontos_minimos else -1
+    return min(regras.tolerancia_avarias, (pontos_base - regras.pontos_minimos) // regras.penal_por_avaria)
+
+
+def prever_estado(regras, presentes, modulos, massa, capacidade_kg, p_tempestade=None, penal_recursos=0):
+    """Previsão a partir do resumo do carregamento.
+
+    `presentes` é o nº de essenciais a bordo, `modulos` o total de módulos,
+    `massa` a massa total e `penal_recursos` a `penalidade_prevista`; é tudo
+    de que a pontuação e a chegada dependem.
+    """
+    if p_tempestade is None:
+        p_tempestade = p_tempestade_padrao(regras)
+    pontos = regras.pontos_estado(presentes, massa, capacidade_kg) - penal_recursos
+    dist = distribuicao_avarias(regras.turnos, p_tempestade, modulos)
+    penal = regras.penal_por_avaria
+
+    esperada = 0.0
+    acumulada = 0.0
+    pior = 0
+    for d, p in enumerate(dist):
+        esperada += p * max(pontos - penal * d, 0)
+        if acumulada < 0.9:
+            pior = d
+        acumulada += p
+
+    sucesso = 0.0
+    if regras.viavel_estado(presentes, massa, capacidade_kg):
+        limite = _limite_avarias(regras, pontos)
+        if limite >= 0:
+            sucesso = sum(dist[:limite + 1])
+
+    return {
+        'probabilidade_sucesso': min(sucesso, 1.0),
+        'pontuacao_esperada': esperada,
+        'pontuacao_max': max(pontos, 0),
+        'pontuacao_min': max(pontos - penal * pior, 0),
+        'massa': massa,
+    }
+
+
+def prever(regras, mascara, capacidade_kg, p_tempestade=None):
+    """Previsão do carregamento: probabilidade de sucesso e pontuação esperada.
+
+    Retorna um dicionário com `probabilidade_sucesso`, `pontuacao_esperada`,
+    `pontuacao_max` (sem avarias), `pontuacao_min` (percentil 90 de avarias)
+    e `massa`.
+    """
+    return prever_estado(
+        regras,
+        (regras.mascara_essenciais & mascara).bit_count(),
+        mascara.bit_count(),
+        MASSA(mascara),
+        capacidade_kg,
+        p_tempestade,
+        penalidade_prevista(regras, *resumo_recursos(mascara)),
+    )
@@ -0,0 +1,133 @@
+"""Quadros binários compactos para os turnos transmitidos pelo WebSocket.
+
+Em JSON, cada turno repete nome, descrição e ícone do evento (~200 bytes).
+Os eventos, porém, vêm de um conjunto fixo de textos (`services.simulacao`):
+um evento sorteado, cuja descrição pode ganhar um complemento conforme um
+módulo está a bordo, a operação de um módulo ou a rotina estável. Por isso um
+turno cabe em (turno, código do evento, código do módulo):
+
+- o cliente que entende o protocolo (`ws.js`) envia
+  `{"action": "hello", "formato": "binario", "versao": 1}` ao conectar e
+  recebe uma vez as tabelas de eventos e módulos (`tables`);
+- a partir daí cada quadro de turnos é binário: um byte de tipo
+  (`QUADRO_TURNOS`) seguido de registros de 6 bytes, big-endian
+  (`>IBB`: turno, evento, módulo; `SEM_MODULO` quando não há módulo);
+- clientes que não negociam continuam recebendo JSON, e turnos fora das
+  tabelas (outra versão das regras, por exemplo) seguem em JSON.
+
+O código do módulo é o módulo operado (`EVENTO_OPERACAO_MODULO`) ou o módulo
+cujo complemento entrou na descrição do evento sorteado.
+"""
+
+import json
+import struct
+from functools import lru_cache
+
+from services.data import EVENTOS_ALEATORIOS, MODULOS_HABITAT
+from services.regras import ORDEM_MODULOS
+from services.simulacao import (
+    COMPLEMENTOS_EVENTOS, DICAS_MODULOS, ICONES_EVENTOS, ICONES_MODULOS, ROTINA_ESTAVEL
+)
+
+
+VERSAO_PROTOCOLO = 1
+QUADRO_TURNOS = 1
+REGISTRO_TURNO = struct.Struct('>IBB')
+SEM_MODULO = 0xFF
+
+EVENTO_ROTINA = 0
+EVENTO_OPERACAO_MODULO = 1
+
+
+def _publico(evento):
+    return (evento.get('nome'), evento.get('descricao'), evento.get('icone'), evento.get('efeito'))
+
+
+@lru_cache(maxsize=1)
+def _tabelas():
+    """(mensagem `tables` serializada, {campos públicos do evento: (evento, módulo)})."""
+    codigo_modulo = {mod_id: i for i, mod_id in enumerate(ORDEM_MODULOS)}
+    modulos = []
+    codigos = {}
+    for i, mod_id in enumerate(ORDEM_MODULOS):
+        modulo = {
+            'id': mod_id,
+            'nome': MODULOS_HABITAT.get(mod_id, {}).get('nome', mod_id),
+            'descricao': DICAS_MODULOS.get(mod_id, 'The module contributes positively to the mission progress.'),
+            'icone': ICONES_MODULOS.get(mod_id, 'module-default.svg'),
+        }
+        modulos.append(modulo)
+        codigos[(f"Module Operation: {modulo['nome']}", modulo['descricao'], modulo['icone'], 'nenhum')] = \
+            (EVENTO_OPERACAO_MODULO, i)
+
+    eventos = [
+        {**{c: ROTINA_ESTAVEL[c] for c in ('nome', 'descricao', 'icone', 'efeito')}, 'complemento': None},
+        {'nome': 'Module Operation: ', 'descricao': '', 'icone': '', 'efeito': 'nenhum', 'complemento': None},
+    ]
+    codigos[_publico(ROTINA_ESTAVEL)] = (EVENTO_ROTINA, SEM_MODULO)
+    for base in EVENTOS_ALEATORIOS:
+        codigo = len(eventos)
+        evento = {
+            'nome': base['nome'], 'descricao': base['descricao'],
+            'icone': ICONES_EVENTOS.get(base['nome'], 'event-default.svg'), 'efeito': base.get('efeito'),
+            'complemento': None,
+        }
+        complemento = COMPLEMENTOS_EVENTOS.get(base['nome'])
+        if complemento is not None and complemento[0] in codigo_modulo:
+            mod_id, com_modulo, sem_modulo = complemento
+            evento['complemento'] = [codigo_modulo[mod_id], com_modulo, sem_modulo]
+            codigos[_publico({**evento, 'descricao': evento['descricao'] + com_modulo})] = (codigo, codigo_modulo[mod_id])
+            codigos[_publico({**evento, 'descricao': evento['descricao'] + sem_modulo})] = (codigo, SEM_MODULO)
+        else:
+            codigos[_publico(evento)] = (codigo, SEM_MODULO)
+        eventos.append(evento)
+
+    mensagem = json.dumps({
+        'type': 'tables', 'versao': VERSAO_PROTOCOLO, 'sem_modulo': SEM_MODULO,
+        'eventos': eventos, 'modulos': modulos,
+    }, ensure_ascii=False)
+    return mensagem, codigos
+
+
+def mensagem_tabelas():
+    """Mensagem `tables` (JSON), enviada uma vez por conexão que negocia o binário."""
+    return _tabelas()[0]
+
+
+def aceita_binario(pedido):
+    """Se uma mensagem `hello` pede o formato binário numa versão suportada."""
+    return pedido.get('formato') == 'binario' and pedido.get('versao') == VERSAO_PROTOCOLO
+
+
+def codificar_turnos(entradas):
+    """Quadro binário com os turnos (entradas do diário), ou None se algum não está nas tabelas."""
+    codigos = _tabelas()[1]
+    partes = [bytes((QUADRO_TURNOS,))]
+    for entrada in entradas:
+        codigo = codigos.get(_publico(entrada['evento']))
+        if codigo is None:
+            return None
+        partes.append(REGISTRO_TURNO.pack(entrada['turno'], *codigo))
+    return b''.join(partes)
+
+
+def decodificar_turnos(quadro):
+    """Eventos públicos (como no JSON) de um quadro binário de turnos."""
+    if not quadro or quadro[0] != QUADRO_TURNOS:
+        raise ValueError('Quadro desconhecido')
+    tabelas = json.loads(mensagem_tabelas())
+    eventos, modulos = tabelas['eventos'], tabelas['modulos']
+    saida = []
+    for turno, codigo, modulo in REGISTRO_TURNO.iter_unpack(memoryview(quadro)[1:]):
+        if codigo == EVENTO_OPERACAO_MODULO:
+            m = modulos[modulo]
+            evento = {'nome': f"Module Operation: {m['nome']}", 'descricao': m['descricao'],
+                      'icone': m['icone'], 'efeito': 'nenhum'}
+        else:
+            e = eventos[codigo]
+            descricao = e['descricao']
+            if e['complemento'] is not None:
+                descricao += e['complemento'][1] if modulo == e['complemento'][0] else e['complemento'][2]
+            evento = {'nome': e['nome'], 'descricao': descricao, 'icone': e['icone'], 'efeito': e['efeito']}
+        saida.append({'turno': turno, **evento})
+    return saida
@@ -0,0 +1,189 @@
+"""Balanço de energia e água da viagem, turno a turno.
+
+Cada módulo a bordo consome energia (kWh/dia) e água (L/dia); a nave gera uma
+quantidade fixa de energia por turno, guarda o excedente em uma bateria e parte
+de uma reserva de água (parcialmente reciclada quando o módulo sanitário está a
+bordo). Eventos do diário agem como choques multiplicativos no consumo do turno
+(Power Surge, Minor Mechanical Failure, Optimized Navigation); módulos que o
+diário descreve como mitigadores (Control, 3D Printing) reduzem o choque pela
+metade.
+
+O consumo por turno só assume um valor por tipo de efeito, então as séries são
+montadas por consulta a uma tabela por (regras, máscara) e acumuladas com
+`itertools.accumulate`, sem laço Python explícito por turno. Turnos com bateria
+ou reserva negativas contam como déficit e geram uma pequena penalidade.
+
+Reservas e penalidades são calibradas para a duração normal (`regras.turnos`).
+Numa viagem mais longa (modo resistência), cada turno vale a fração
+`fracao_turno` de um turno normal: geração, consumo e a penalidade por turno
+em déficit são escalados por ela, então o balanço acompanha o da viagem normal.
+
+Para os modelos sem simulação (`services.probabilidades`), `penalidade_prevista`
+percorre o consumo médio por turno: só depende da energia e da água somadas e
+dos módulos que reciclam água ou mitigam choques (`resumo_recursos`).
+"""
+
+import math
+
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from operator import sub
+
+from services.data import EVENTOS_ALEATORIOS
+from services.regras import BIT_MODULO, ENERGIA, AGUA
+
+
+# efeito -> (multiplicador do consumo de energia, multiplicador do consumo de água)
+CHOQUES = {
+    'consumo_extra': (1.5, 1.0),
+    'atraso_e_consumo_extra': (1.25, 1.25),
+    'bonus_economia': (0.8, 0.9),
+}
+# Módulos que reduzem pela metade o choque do efeito
+MITIGACOES = {
+    'consumo_extra': 'controle',
+    'atraso_e_consumo_extra': 'impressao3d',
+}
+_negativo = (0.0).__gt__
+
+EFEITOS = tuple(dict.fromkeys(['nenhum'] + [e['efeito'] for e in EVENTOS_ALEATORIOS]))
+# Módulos que mudam o consumo além da própria energia e água
+MASCARA_RECURSOS = BIT_MODULO['sanitario'] | BIT_MODULO['controle'] | BIT_MODULO['impressao3d']
+# Efeitos dos eventos sorteáveis (perfil padrão, uniforme; "All Calm" é a ausência de evento)
+_EFEITOS_SORTEAVEIS = [e['efeito'] for e in EVENTOS_ALEATORIOS if e.get('nome') != 'All Calm']
+
+
+def fracao_turno(regras, total_turnos):
+    """Fração de um turno da duração calibrada que cada turno da viagem representa."""
+    return min(1.0, regras.turnos / total_turnos) if total_turnos else 1.0
+
+
+def penalidade_deficit(parametros, turnos_em_deficit, fracao=1.0):
+    """Penalidade pelos turnos em déficit (em turnos equivalentes da duração calibrada), com teto."""
+    equivalentes = math.ceil(turnos_em_deficit * fracao) if fracao < 1.0 else turnos_em_deficit
+    return min(parametros['penal_por_deficit'] * equivalentes, parametros['penal_max_deficit'])
+
+
+def resumo_recursos(mascara):
+    """(energia, água, módulos de `MASCARA_RECURSOS`): tudo de que o balanço do carregamento depende."""
+    return ENERGIA(mascara), AGUA(mascara), mascara & MASCARA_RECURSOS
+
+
+def tabela_consumo(regras, mascara, fracao=1.0):
+    """Saldo de energia e consumo de água por turno para cada efeito de evento."""
+    return _tabela_resumo(regras, *resumo_recursos(mascara), fracao)
+
+
+@lru_cache(maxsize=65536)
+def _tabela_resumo(regras, energia, agua, mascara, fracao=1.0):
+    p = regras.recursos
+    if mascara & BIT_MODULO['sanitario']:
+        agua *= 1 - p['reciclagem_agua']
+    saldo_energia, consumo_agua = {}, {}
+    for efeito in EFEITOS:
+        mult_energia, mult_agua = CHOQUES.get(efeito, (1.0, 1.0))
+        mitigador = MITIGACOES.get(efeito)
+        if mitigador and mascara & BIT_MODULO[mitigador]:
+            mult_energia, mult_agua = 1 + (mult_energia - 1) / 2, 1 + (mult_agua - 1) / 2
+        saldo_energia[efeito] = (p['energia_por_turno'] - energia * mult_energia) * fracao
+        consumo_agua[efeito] = agua * mult_agua * fracao
+    return saldo_energia, consumo_agua
+
+
+@lru_cache(maxsize=64)
+def _consumo_medio(regras, mascara):
+    """Consumo médio por turno de 1 kWh e de 1 L declarados, com os módulos de `mascara`."""
+    saldo_energia, consumo_agua = _tabela_resumo(regras, 1, 1, mascara)
+    geracao = regras.recursos['energia_por_turno']
+    chance = regras.chance_evento / len(_EFEITOS_SORTEAVEIS)
+    probabilidades = dict.fromkeys(EFEITOS, 0.0)
+    probabilidades['nenhum'] = 1.0 - regras.chance_evento
+    for efeito in _EFEITOS_SORTEAVEIS:
+        probabilidades[efeito] += chance
+    return (
+        sum(probabilidades[e] * (geracao - saldo_energia[e]) for e in EFEITOS),
+        sum(probabilidades[e] * consumo_agua[e] for e in EFEITOS),
+    )
+
+
+@lru_cache(maxsize=65536)
+def penalidade_prevista(regras, energia, agua, mascara):
+    """Penalidade de recursos pelo consumo médio por turno (argumentos de `resumo_recursos`).
+
+    Na trajetória média a bateria e a reserva só caem (ou a bateria fica
+    cheia): cada uma zera num turno calculável, e todos os turnos seguintes
+    são déficit, como na simulação.
+    """
+    p = regras.recursos
+    por_kwh, por_litro = _consumo_medio(regras, mascara)
+    saldo = p['energia_por_turno'] - energia * por_kwh
+    consumo = agua * por_litro
+    # Primeiro turno com nível negativo (além do fim da viagem se nenhum zera)
+    primeiro = regras.turnos + 1
+    if saldo < 0:
+        primeiro = min(primeiro, math.floor(p['bateria'] / -saldo) + 1)
+    if consumo > 0:
+        primeiro = min(primeiro, math.floor(p['agua_inicial'] / consumo) + 1)
+    return penalidade_deficit(p, regras.turnos - primeiro + 1)
+
+
+def balanco_recursos(regras, mascara, efeitos, fracao=1.0):
+    """Séries de bateria e reserva de água ao fim de cada turno.
+
+    `efeitos` é a sequência de efeitos do diário (um por turno, todos em
+    `EFEITOS`). Valores negativos nas séries indicam déficit no turno; a
+    bateria nunca passa da capacidade. `fracao` é a `fracao_turno` da viagem.
+    """
+    p = regras.recursos
+    saldo_energia, consumo_agua = tabela_consumo(regras, mascara, fracao)
+    bateria = p['bateria']
+
+    agua = list(accumulate(map(consumo_agua.__getitem__, efeitos), sub, initial=p['agua_inicial']))
+    # A reserva só diminui: a partir do primeiro turno negativo, todos são déficit
+    sem_agua = bisect_left(agua, True, lo=1, key=_negativo)
+    deficit = len(agua) - sem_agua
+
+    if min(saldo_energia.values()) >= 0:
+        # Geração cobre qualquer turno: a bateria permanece cheia
+        energia = [bateria] * len(agua)
+    else:
+        # Bateria limitada à capacidade: nível = capacidade + S_t - max(S_0..S_t),
+        # com S a soma acumulada dos saldos (déficits são quitados pela geração
+        # seguinte antes de recarregar)
+        soma = list(accumulate(map(saldo_energia.__getitem__, efeitos), initial=0.0))
+        energia = list(map(float(bateria).__add__, map(sub, soma, accumulate(soma, max))))
+        deficit += sum(map(_negativo, energia[1:sem_agua]))
+    return {
+        'energia': energia,
+        'agua': agua,
+        'bateria': bateria,
+        'agua_inicial': p['agua_inicial'],
+        'turnos_em_deficit': deficit,
+        'penalidade': penalidade_deficit(p, deficit, fracao),
+    }
+
+
+def balanco_da_viagem(regras, mascara, diario):
+    """Balanço de recursos a partir do diário de bordo da viagem."""
+    efeitos = [d['evento'].get('efeito') for d in diario]
+    return balanco_recursos(
+        regras, mascara, [e if e in EFEITOS else 'nenhum' for e in efeitos], fracao_turno(regras, len(diario))
+    )
+
+
+def grafico_recursos(balanco, largura=600, altura=120):
+    """Polilinhas SVG das séries em % da capacidade (bateria) e da reserva inicial (água)."""
+    def pontos(serie, referencia):
+        n = max(len(serie) - 1, 1)
+        escala = altura / referencia if referencia > 0 else 0.0
+        return ' '.join(
+            f"{i * largura / n:.1f},{altura - min(max(v, 0.0), referencia) * escala:.1f}"
+            for i, v in enumerate(serie)
+        )
+    return {
+        'largura': largura,
+        'altura': altura,
+        'energia': pontos(balanco['energia'], balanco['bateria']),
+        'agua': pontos(balanco['agua'], balanco['agua_inicial']),
+    }
@@ -0,0 +1,287 @@
+"""Motor de regras da missão compilado em máscaras de bits.
+
+As regras por destino são declaradas uma única vez em
+`services.data.REGRAS_MISSAO`, ajustadas pela versão atual do arquivo de
+calibração (`services/regras_missao.json`, gerado por
+`scripts/calibrar_regras.py`) e compiladas aqui na inicialização:
+
+- Cada módulo de `MODULOS_HABITAT` ocupa uma posição de bit (ordem do catálogo);
+- Um carregamento (conjunto de módulos) vira um inteiro (`mascara_de`);
+- Essenciais por destino viram máscaras, de modo que diagnóstico de faltantes,
+  pontuação e checagem de chegada se reduzem a poucas operações inteiras;
+- Atributos aditivos (massa, energia, água) são somados por tabelas de
+  consulta divididas em duas metades de bits, sem laço por módulo.
+
+Usado pelas rotas da missão e por ferramentas de análise que precisam avaliar
+muitos carregamentos candidatos rapidamente.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+
+from services.data import MODULOS_HABITAT, REGRAS_MISSAO
+from services.fisica import carga_maxima_kg
+
+
+# --- POSIÇÕES DE BIT DOS MÓDULOS ---
+ORDEM_MODULOS = tuple(MODULOS_HABITAT.keys())
+BIT_MODULO = {mid: 1 << i for i, mid in enumerate(ORDEM_MODULOS)}
+MASCARA_TOTAL = (1 << len(ORDEM_MODULOS)) - 1
+
+DESTINO_PADRAO = 'lua'
+
+# Arquivo de regras calibradas (opcional); COSMO_REGRAS permite apontar outro
+ARQUIVO_REGRAS = os.getenv(
+    'COSMO_REGRAS',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regras_missao.json')
+)
+
+
+def mascara_de(ids):
+    """Converte uma coleção de ids de módulo em máscara (ids desconhecidos são ignorados)."""
+    mascara = 0
+    for mid in ids or ():
+        mascara |= BIT_MODULO.get(mid, 0)
+    return mascara
+
+
+def ids_de(mascara):
+    """Lista os ids presentes na máscara, na ordem do catálogo."""
+    return [mid for i, mid in enumerate(ORDEM_MODULOS) if mascara >> i & 1]
+
+
+class TabelaSoma:
+    """Soma um atributo aditivo dos módulos de uma máscara em O(1).
+
+    Pré-computa as somas de todas as combinações de cada metade dos bits
+    (2 × 2^9 entradas para 18 módulos); a soma de uma máscara é então a soma
+    de duas consultas.
+    """
+
+    __slots__ = ('baixo', 'alto', 'bits_baixo', 'filtro_baixo')
+
+    def __init__(self, valores):
+        valores = list(valores)
+        self.bits_baixo = len(valores) // 2
+        self.filtro_baixo = (1 << self.bits_baixo) - 1
+        self.baixo = self._somas(valores[:self.bits_baixo])
+        self.alto = self._somas(valores[self.bits_baixo:])
+
+    @staticmethod
+    def _somas(valores):
+        somas = [0] * (1 << len(valores))
+        for m in range(1, len(somas)):
+            menor = m & -m
+            somas[m] = somas[m ^ menor] + valores[menor.bit_length() - 1]
+        return somas
+
+    def __call__(self, mascara):
+        return self.baixo[mascara & self.filtro_baixo] + self.alto[mascara >> self.bits_baixo]
+
+
+MASSA = TabelaSoma(MODULOS_HABITAT[m].get('massa', 0) for m in ORDEM_MODULOS)
+ENERGIA = TabelaSoma(MODULOS_HABITAT[m].get('energia', 0) for m in ORDEM_MODULOS)
+AGUA = TabelaSoma(MODULOS_HABITAT[m].get('agua', 0) for m in ORDEM_MODULOS)
+
+
+class RegrasDestino:
+    """Regras de um destino compiladas para avaliação por máscara."""
+
+    __slots__ = (
+        'destino', 'turnos', 'chance_evento', 'dificuldade_base', 'pontos_minimos',
+        'mascara_essenciais', 'total_essenciais', 'bonus_essencial', 'penal_faltante',
+        'faixas_sobrecarga', 'faixa_ideal', 'limite_massa', 'penal_por_avaria',
+        'faltantes_permitidos', 'tolerancia_avarias', 'recursos'
+    )
+
+    def __init__(self, destino, dados):
+        self.destino = destino
+        self.turnos = int(dados['turnos'])
+        self.chance_evento = float(dados['chance_evento'])
+        self.dificuldade_base = dados['dificuldade_base']
+        self.pontos_minimos = dados.get('pontos_minimos', self.dificuldade_base)
+        self.mascara_essenciais = mascara_de(dados['essenciais'])
+        self.total_essenciais = self.mascara_essenciais.bit_count()
+        self.bonus_essencial = dados['bonus_essencial']
+        self.penal_faltante = dados['penal_essencial_faltante']
+        self.faixas_sobrecarga = tuple(
+            (float(limite), ajuste)
+            for limite, ajuste in sorted(dados['faixas_sobrecarga'], key=lambda f: -f[0])
+        )
+        minimo, maximo, bonus = dados['faixa_ideal']
+        self.faixa_ideal = (float(minimo), float(maximo), bonus)
+        self.limite_massa = float(dados['limite_massa'])
+        self.penal_por_avaria = dados['penal_por_avaria']
+        self.faltantes_permitidos = dados['faltantes_permitidos']
+        self.tolerancia_avarias = dados['tolerancia_avarias']
+        self.recursos = dict(dados.get('recursos') or {})
+
+    @property
+    def essenciais(self):
+        return ids_de(self.mascara_essenciais)
+
+    def faltantes(self, mascara):
+        """Máscara dos essenciais ausentes no carregamento."""
+        return self.mascara_essenciais & ~mascara
+
+    def ajuste_massa(self, massa, capacidade_kg):
+        """Bônus/penalidade pela razão massa/capacidade (0 se a nave não informa capacidade)."""
+        if capacidade_kg <= 0:
+            return 0
+        for limite, ajuste in self.faixas_sobrecarga:
+            if massa > capacidade_kg * limite:
+                return ajuste
+        minimo, maximo, bonus = self.faixa_ideal
+        return bonus if minimo <= massa / capacidade_kg <= maximo else 0
+
+    def massa_ok(self, massa, capacidade_kg):
+        return capacidade_kg <= 0 or massa <= capacidade_kg * self.limite_massa
+
+    def pontos_estado(self, presentes, massa, capacidade_kg):
+        """Pontuação antes das avarias a partir do nº de essenciais presentes e da massa.
+
+        A pontuação só depende do carregamento por esses dois números, o que
+        permite agregar carregamentos equivalentes em análises combinatórias.
+        """
+        return (
+            self.dificuldade_base
+            + self.bonus_essencial * presentes
+            - self.penal_faltante * (self.total_essenciais - presentes)
+            + self.ajuste_massa(massa, capacidade_kg)
+        )
+
+    def pontos_base(self, mascara, capacidade_kg):
+        """Pontuação antes das avarias (sem piso em zero) e massa do carregamento."""
+        massa = MASSA(mascara)
+        presentes = (self.mascara_essenciais & mascara).bit_count()
+        return self.pontos_estado(presentes, massa, capacidade_kg), massa
+
+    def viavel_estado(self, presentes, massa, capacidade_kg):
+        """Condições de chegada independentes dos eventos, por nº de essenciais e massa."""
+        return (
+            self.total_essenciais - presentes <= self.faltantes_permitidos and
+            self.massa_ok(massa, capacidade_kg)
+        )
+
+    def viavel(self, mascara, massa, capacidade_kg):
+        """Condições de chegada que independem dos eventos da viagem."""
+        return self.viavel_estado((self.mascara_essenciais & mascara).bit_count(), massa, capacidade_kg)
+
+    def pontuar(self, mascara, capacidade_kg, avariados=0, penal_recursos=0):
+        """Pontuação final (não negativa) e massa do carregamento.
+
+        `penal_recursos` é a penalidade do balanço de energia/água da viagem
+        (`services.recursos`), que depende da sequência de eventos sorteada.
+        """
+        pontos, massa = self.pontos_base(mascara, capacidade_kg)
+        return max(pontos - self.penal_por_avaria * avariados - penal_recursos, 0), massa
+
+    def avaliar(self, mascara, capacidade_kg, avariados=0, penal_recursos=0):
+        """Avalia o carregamento: (chegou, pontos, massa_total, capacidade_kg)."""
+        pontos, massa = self.pontuar(mascara, capacidade_kg, avariados, penal_recursos)
+        chegou = (
+            self.viavel(mascara, massa, capacidade_kg) and
+            avariados <= self.tolerancia_avarias and
+            pontos >= self.pontos_minimos
+        )
+        return chegou, pontos, massa, capacidade_kg
+
+
+class RegrasCompiladas:
+    """Conjunto de regras de todos os destinos com identificador de versão.
+
+    A versão é derivada do conteúdo das regras, permitindo que caches
+    (soluções de referência, tabelas de probabilidade) sejam invalidados
+    automaticamente quando as regras mudam.
+    """
+
+    def __init__(self, dados):
+        self.dados = dados
+        self.versao = hashlib.sha1(
+            json.dumps(dados, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:10]
+        self.destinos = {destino: RegrasDestino(destino, d) for destino, d in dados.items()}
+
+    def __getitem__(self, destino):
+        destino = (destino or '').lower()
+        return self.destinos.get(destino) or self.destinos[DESTINO_PADRAO]
+
+    def __contains__(self, destino):
+        return (destino or '').lower() in self.destinos
+
+
+def carregar_regras(caminho=ARQUIVO_REGRAS, versao=None):
+    """Regras declaradas com os ajustes da versão calibrada atual (se houver).
+
+    O arquivo guarda todas as versões geradas em `versoes`, indexadas pelo
+    identificador, e a ativa em `versao_atual` (ou a informada em `versao`).
+    Arquivo ausente ou inválido mantém as regras declaradas em `REGRAS_MISSAO`.
+    """
+    dados = copy.deepcopy(REGRAS_MISSAO)
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            arquivo = json.load(f)
+        versao = versao or arquivo.get('versao_atual')
+        if not versao:
+            return dados
+        for destino, ajustes in arquivo['versoes'][versao]['destinos'].items():
+            if destino in dados:
+                dados[destino].update(ajustes)
+        logging.info(f"Regras calibradas carregadas (versão {versao})")
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logging.exception('Arquivo de regras calibradas inválido; usando regras declaradas')
+        dados = copy.deepcopy(REGRAS_MISSAO)
+    return dados
+
+
+REGRAS = RegrasCompiladas(carregar_regras())
+
+
+_REGRAS_POR_VERSAO = {REGRAS.versao: REGRAS}
+
+
+def regras_da_versao(versao, caminho=ARQUIVO_REGRAS):
+    """Regras compiladas cuja versão (hash do conteúdo) é `versao`, ou None.
+
+    Procura entre as regras declaradas e cada versão calibrada guardada no
+    arquivo, permitindo reproduzir viagens feitas antes de uma recalibração.
+    """
+    regras = _REGRAS_POR_VERSAO.get(versao)
+    if regras is not None:
+        return regras
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            calibradas = list(json.load(f).get('versoes', {}))
+    except FileNotFoundError:
+        calibradas = []
+    except Exception:
+        logging.exception('Arquivo de regras calibradas inválido')
+        calibradas = []
+    candidatas = [RegrasCompiladas(copy.deepcopy(REGRAS_MISSAO))]
+    candidatas += [RegrasCompiladas(carregar_regras(caminho, c)) for c in calibradas]
+    for candidata in candidatas:
+        _REGRAS_POR_VERSAO.setdefault(candidata.versao, candidata)
+    return _REGRAS_POR_VERSAO.get(versao)
+
+
+def regras_para(destino):
+    """Regras compiladas do destino (destinos desconhecidos usam as regras lunares)."""
+    return REGRAS[destino]
+
+
+def capacidade_kg(nave, destino=None):
+    """Capacidade de carga da nave em kg (0 quando ausente).
+
+    Com `destino`, usa a carga máxima para o destino (`services.fisica`), que
+    desconta o delta-v que falta à nave; sem ele, a capacidade nominal LEO/GTO.
+    """
+    if not nave:
+        return 0
+    if destino:
+        return carga_maxima_kg(nave, regras_para(destino).destino)
+    return (nave.get('capacidade_carga', 0) or 0) * 1000
@@ -0,0 +1,43 @@
+"""Perfis de ritmo das viagens transmitidas pelo servidor WebSocket.
+
+Um ritmo diz quantos turnos vão em cada quadro (mensagem) e quanto tempo o
+servidor espera entre quadros:
+
+- `tempo_real`: um turno por quadro, no intervalo do servidor
+  (`WS_INTERVALO_TURNOS`, 2 s) — a viagem acompanhada em sala;
+- `acelerado`: lotes de turnos a cada meio segundo — uma viagem de
+  exoplaneta (250 turnos) em cerca de 12 s, para o professor rever;
+- `instantaneo`: a viagem inteira em poucos quadros grandes, sem espera.
+
+O ritmo padrão de uma sala (`salas_virtuais.ritmo_viagem`, escolhido pelo
+professor) vai no bilhete da viagem; o cliente pode pedir outro ao iniciar
+(`pace`) ou trocar no meio da transmissão (`set_pace`).
+"""
+
+from collections import namedtuple
+
+
+Ritmo = namedtuple('Ritmo', 'nome intervalo turnos_por_quadro')
+
+RITMO_PADRAO = 'tempo_real'
+RITMOS = {
+    'tempo_real': Ritmo('tempo_real', None, 1),  # intervalo do servidor
+    'acelerado': Ritmo('acelerado', 0.5, 10),
+    'instantaneo': Ritmo('instantaneo', 0.0, 500),
+}
+ROTULOS_RITMO = {
+    'tempo_real': 'Real time',
+    'acelerado': 'Accelerated (20 turns/s)',
+    'instantaneo': 'Instant',
+}
+
+
+def nome_ritmo(nome):
+    """Nome de perfil válido (o padrão para valores desconhecidos ou vazios)."""
+    return nome if nome in RITMOS else RITMO_PADRAO
+
+
+def perfil_ritmo(nome, intervalo_tempo_real):
+    """Ritmo do perfil `nome`, com o intervalo do servidor no tempo real."""
+    ritmo = RITMOS[nome_ritmo(nome)]
+    return ritmo._replace(intervalo=intervalo_tempo_real) if ritmo.intervalo is None else ritmo
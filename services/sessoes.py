@@ -0,0 +1,117 @@
+"""Sessões de transmissão de viagens do servidor WebSocket (retomada após reconexão).
+
+Cada viagem transmitida é uma sessão endereçável pelo id da viagem (ou, sem
+id, pela própria chave de reprodução do bilhete) com um cursor: o último
+turno colocado na fila do cliente. Se a rede da sala cai, `ws.js` reconecta e
+a página pede `resume_trip` com o último turno que de fato recebeu; a
+transmissão continua dali, com o mesmo ritmo, sem reenviar o diário desde o
+início. Como os turnos são regenerados pela semente
+(`services.simulacao.turnos_da_viagem(..., inicio=...)`), retomar não exige
+guardar o diário: a sessão guarda só o cursor e o ritmo.
+
+O ritmo (`services.ritmos.Ritmo`) pode ser trocado no meio da transmissão
+(`definir_ritmo`): a espera em curso é interrompida e o novo ritmo vale a
+partir do quadro seguinte.
+
+Uma nova transmissão da mesma viagem (nova aba, conexão antiga ainda meio
+aberta) cancela a anterior. Sessões paradas expiram após `VALIDADE_SESSAO`.
+"""
+
+import asyncio
+import time
+
+
+VALIDADE_SESSAO = 15 * 60  # segundos
+
+
+class SessaoViagem:
+    """Estado de transmissão de uma viagem: cursor, ritmo e tarefa ativa."""
+
+    __slots__ = (
+        'identificador', 'chave', 'ritmo', 'cursor', 'total_turnos', 'tarefa', 'atualizada_em', 'ritmo_alterado'
+    )
+
+    def __init__(self, identificador, chave, ritmo):
+        self.identificador = identificador
+        self.chave = chave
+        self.ritmo = ritmo
+        self.cursor = 0
+        self.total_turnos = None
+        self.tarefa = None
+        self.atualizada_em = time.monotonic()
+        self.ritmo_alterado = asyncio.Event()
+
+    def avancar(self, turno):
+        self.cursor = turno
+        self.atualizada_em = time.monotonic()
+
+    @property
+    def concluida(self):
+        return self.total_turnos is not None and self.cursor >= self.total_turnos
+
+    def definir_ritmo(self, ritmo):
+        self.ritmo = ritmo
+        self.ritmo_alterado.set()
+
+    async def esperar(self):
+        """Espera o intervalo do ritmo entre quadros; uma troca de ritmo encerra a espera."""
+        intervalo = self.ritmo.intervalo
+        if intervalo <= 0:
+            await asyncio.sleep(0)
+            return
+        self.ritmo_alterado.clear()
+        try:
+            await asyncio.wait_for(self.ritmo_alterado.wait(), intervalo)
+        except asyncio.TimeoutError:
+            pass
+
+
+class SessoesViagem:
+    """Registro das sessões de transmissão do processo."""
+
+    def __init__(self, validade=VALIDADE_SESSAO):
+        self.validade = validade
+        self.sessoes = {}
+
+    @staticmethod
+    def identificador(dados_bilhete):
+        """Endereço da sessão: id da viagem gravada ou a chave de reprodução."""
+        viagem_id = dados_bilhete.get('viagem_id')
+        return ('viagem', viagem_id) if viagem_id is not None else ('chave', dados_bilhete['chave'])
+
+    def abrir(self, dados_bilhete, ritmo):
+        """Sessão nova (ou reiniciada) para o bilhete; cancela a transmissão anterior."""
+        self.limpar()
+        identificador = self.identificador(dados_bilhete)
+        anterior = self.sessoes.get(identificador)
+        if anterior is not None and anterior.tarefa is not None:
+            anterior.tarefa.cancel()
+        sessao = self.sessoes[identificador] = SessaoViagem(identificador, dados_bilhete['chave'], ritmo)
+        return sessao
+
+    def buscar(self, dados_bilhete):
+        """Sessão existente do bilhete, ou None."""
+        sessao = self.sessoes.get(self.identificador(dados_bilhete))
+        return sessao if sessao is not None and sessao.chave == dados_bilhete['chave'] else None
+
+    def retomar(self, dados_bilhete, ritmo_padrao):
+        """Sessão existente do bilhete (cancelando a tarefa antiga) ou uma nova com o ritmo padrão."""
+        sessao = self.buscar(dados_bilhete)
+        if sessao is None:
+            return self.abrir(dados_bilhete, ritmo_padrao)
+        if sessao.tarefa is not None:
+            sessao.tarefa.cancel()
+            sessao.tarefa = None
+        sessao.atualizada_em = time.monotonic()
+        return sessao
+
+    def limpar(self):
+        """Remove sessões sem transmissão ativa paradas há mais que a validade."""
+        limite = time.monotonic() - self.validade
+        vencidas = [
+            i for i, s in self.sessoes.items()
+            if s.atualizada_em < limite and (s.tarefa is None or s.tarefa.done())
+        ]
+        for i in vencidas:
+            del self.sessoes[i]
+        return len(vencidas)
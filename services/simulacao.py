@@ -0,0 +1,411 @@
+"""Simulação determinística da viagem a partir de (semente, regras, carregamento).
+
+O diário de bordo, as avarias e a pontuação dependem apenas de:
+- semente do gerador (`random.Random`) sorteada na partida;
+- versão das regras compiladas (`RegrasCompiladas.versao`);
+- nave, destino e máscara de módulos a bordo;
+- perfil de eventos da sala no momento da viagem.
+
+Por isso cada viagem é persistida como uma linha compacta (tabela `viagens`)
+e o diário completo é regenerado sob demanda, de forma idêntica, tanto para o
+aluno (páginas do diário, sem guardá-lo na sessão) quanto para a auditoria do
+professor. As reproduções recentes ficam em cache (`reproduzir_viagem`).
+
+Modo resistência: com milhares de turnos (`TURNOS_RESISTENCIA`), a viagem é
+percorrida como gerador (`ViagemEmCurso`) e só os agregados correntes ficam em
+memória (`AgregadosRecursos`: bateria, água, déficits e uma amostra de tamanho
+fixo para o gráfico). Os turnos são transmitidos conforme são gerados (HTTP em
+partes ou WebSocket), com memória O(1) no número de turnos. Tolerância e
+penalidade de avarias são calibradas para a duração normal (`regras.turnos`):
+numa viagem mais longa, cada risco de avaria só avaria com probabilidade
+`regras.turnos / total_turnos`, mantendo o número esperado de avarias da
+viagem normal. Esse sorteio usa um gerador próprio, então o diário é o mesmo.
+Energia e água são escaladas pela mesma fração (`services.recursos.fracao_turno`).
+
+Páginas do diário e retomadas de transmissão de uma viagem longa começam no
+meio dela: a cada `TURNOS_POR_PONTO` turnos percorridos, o estado do gerador
+(geradores aleatórios, avarias e agregados) fica guardado como ponto de
+retomada, em cache por viagem, e a página seguinte parte do ponto mais
+próximo em vez do turno 0.
+"""
+
+import json
+import math
+import random
+import secrets
+from array import array
+from functools import lru_cache
+from itertools import islice
+
+from services.data import MODULOS_HABITAT, NAVES_ESPACIAIS
+from services.regras import ids_de, capacidade_kg, regras_da_versao
+from services.estado_viagem import EstadoModulos
+from services.eventos import SorteadorEventos, NOMES_EVENTOS, PERFIL_PADRAO
+from services.recursos import balanco_da_viagem, tabela_consumo, fracao_turno, penalidade_deficit, EFEITOS
+
+
+TAMANHO_PAGINA_DIARIO = 20
+TAMANHO_MAXIMO_PAGINA = 100
+
+# Turnos do modo resistência por destino; acima de LIMITE_DIARIO_EM_MEMORIA o
+# diário nunca é materializado (páginas e transmissão percorrem o gerador)
+TURNOS_RESISTENCIA = {'lua': 2000, 'marte': 10000, 'exoplaneta': 50000}
+LIMITE_DIARIO_EM_MEMORIA = 1000
+PONTOS_GRAFICO = 300
+# Intervalo entre pontos de retomada das viagens longas (cada um ocupa poucos kB)
+TURNOS_POR_PONTO = 1000
+
+ICONES_EVENTOS = {
+    'Solar Storm': 'solar-storm.svg', 'Minor Mechanical Failure': 'wrench.svg',
+    'Micrometeoroid Impact': 'meteor.svg', 'Power Surge': 'surge.svg',
+    'Optimized Navigation': 'navigation.svg'
+}
+DICAS_MODULOS = {
+    'hidroponia': 'Food production stabilizes morale and reduces stock consumption.', 'medico': 'Medical care addresses mild crew indisposition.',
+    'airlock': 'EVA performed for external inspection; safe return to habitat.', 'impressao3d': 'Part manufactured for quick subsystem repair.',
+    'sanitario': 'Water recycling system maintains adequate levels.', 'armazenamento': 'Supply reorganization optimizes access and safety.',
+    'exercicios': 'Exercise routine mitigates microgravity fatigue.', 'inflavel': 'Expandable module increases useful volume for operations.',
+    'pesquisa': 'Scientific experiment yields important mission data.', 'alimentacao': 'Balanced meal improves team cohesion.',
+    'habitacional': 'Adequate rest improves team performance.', 'suporte_vida': 'Oxygen and pressure levels remain stable.'
+}
+ICONES_MODULOS = {
+    'hidroponia': 'plant.svg', 'medico': 'medical.svg', 'airlock': 'airlock.svg',
+    'impressao3d': 'printer3d.svg', 'sanitario': 'water-recycle.svg', 'armazenamento': 'storage.svg',
+    'exercicios': 'dumbbell.svg', 'inflavel': 'expand.svg', 'pesquisa': 'flask.svg',
+    'alimentacao': 'food.svg', 'habitacional': 'habitat.svg', 'suporte_vida': 'life-support.svg'
+}
+ROTINA_ESTAVEL = {
+    "nome": "Stable Routine",
+    "descricao": "The crew follows standard procedures while systems operate normally.",
+    "efeito": "nenhum", "icone": "calm.svg"
+}
+# Complemento da descrição de um evento conforme um módulo está a bordo:
+# evento → (módulo, texto com o módulo, texto sem ele)
+COMPLEMENTOS_EVENTOS = {
+    'Solar Storm': ('suporte_vida', ' Life support systems maintain stable levels for the crew.',
+                    ' The absence of Life Support worsens the crew response.'),
+    'Minor Mechanical Failure': ('impressao3d', ' 3D Printing manufactures a spare part and reduces delay.', ''),
+    'Micrometeoroid Impact': ('armazenamento', ' Cargo is well stowed; damage is minimal.', ''),
+    'Power Surge': ('controle', ' The Control module quickly stabilizes systems.', ''),
+    'Optimized Navigation': ('exercicios', ' A physically fit crew maintains procedures with precision.', ''),
+}
+
+
+def nova_semente():
+    """Semente aleatória que cabe em um INTEGER do SQLite."""
+    return secrets.randbits(63)
+
+
+def perfil_compacto(sorteador):
+    """Pesos do perfil na ordem de `NOMES_EVENTOS` ("" para o perfil padrão)."""
+    perfil = sorteador.perfil
+    if all(perfil.get(nome, 0) == PERFIL_PADRAO[nome] for nome in NOMES_EVENTOS):
+        return ''
+    return ','.join(str(perfil.get(nome, 0)) for nome in NOMES_EVENTOS)
+
+
+def sorteador_compacto(texto):
+    """Sorteador a partir da forma compacta gerada por `perfil_compacto`."""
+    if not texto:
+        return SorteadorEventos(PERFIL_PADRAO)
+    return SorteadorEventos(dict(zip(NOMES_EVENTOS, map(int, texto.split(',')))))
+
+
+def _evento(rng, regras, sorteador, turno, ids_a_bordo, ids_set):
+    if rng.random() < regras.chance_evento:
+        base = sorteador.sortear(rng)
+        evt = dict(base)
+        evt['icone'] = ICONES_EVENTOS.get(base['nome'], 'event-default.svg')
+        complemento = COMPLEMENTOS_EVENTOS.get(base['nome'])
+        if complemento is not None:
+            mod_id, com_modulo, sem_modulo = complemento
+            evt['descricao'] += com_modulo if mod_id in ids_set else sem_modulo
+        return evt
+    if ids_a_bordo:
+        mod_id = ids_a_bordo[(turno - 1) % len(ids_a_bordo)]
+        mod = MODULOS_HABITAT.get(mod_id, {"nome": mod_id})
+        return {
+            "nome": f"Module Operation: {mod.get('nome')}",
+            "descricao": DICAS_MODULOS.get(mod_id, 'The module contributes positively to the mission progress.'),
+            "efeito": "nenhum",
+            "icone": ICONES_MODULOS.get(mod_id, 'module-default.svg'),
+        }
+    return dict(ROTINA_ESTAVEL)
+
+
+class AgregadosRecursos:
+    """Balanço de energia e água atualizado turno a turno, em memória constante.
+
+    Equivale a `services.recursos.balanco_recursos` (bateria limitada à
+    capacidade, déficits quitados pela geração seguinte), mas guarda apenas os
+    níveis correntes e uma amostra de até `PONTOS_GRAFICO` pontos das séries.
+    """
+
+    __slots__ = ('parametros', 'fracao', 'saldo_energia', 'consumo_agua', 'bateria', 'agua', 'turnos',
+                 'turnos_em_deficit', 'sem_agua', 'passo_amostra', 'serie_energia', 'serie_agua')
+
+    def __init__(self, regras, mascara, total_turnos, pontos=PONTOS_GRAFICO):
+        self.parametros = regras.recursos
+        self.fracao = fracao_turno(regras, total_turnos)
+        self.saldo_energia, self.consumo_agua = tabela_consumo(regras, mascara, self.fracao)
+        self.bateria = float(self.parametros['bateria'])
+        self.agua = float(self.parametros['agua_inicial'])
+        self.turnos = 0
+        self.turnos_em_deficit = 0
+        self.sem_agua = False
+        self.passo_amostra = max(1, math.ceil(total_turnos / pontos))
+        self.serie_energia = [self.bateria]
+        self.serie_agua = [self.agua]
+
+    def registrar(self, efeito):
+        """Aplica o consumo de um turno com o efeito de evento informado."""
+        efeito = efeito if efeito in EFEITOS else 'nenhum'
+        self.bateria = min(self.parametros['bateria'], self.bateria + self.saldo_energia[efeito])
+        self.agua -= self.consumo_agua[efeito]
+        self.turnos += 1
+        self.sem_agua = self.sem_agua or self.agua < 0
+        if self.sem_agua or self.bateria < 0:
+            self.turnos_em_deficit += 1
+        if self.turnos % self.passo_amostra == 0:
+            self.serie_energia.append(self.bateria)
+            self.serie_agua.append(self.agua)
+
+    def ponto_de_retomada(self):
+        return (self.bateria, self.agua, self.turnos, self.turnos_em_deficit, self.sem_agua,
+                array('d', self.serie_energia), array('d', self.serie_agua))
+
+    def retomar(self, ponto):
+        self.bateria, self.agua, self.turnos, self.turnos_em_deficit, self.sem_agua, energia, agua = ponto
+        self.serie_energia, self.serie_agua = list(energia), list(agua)
+
+    def balanco(self):
+        """Mesmo formato de `balanco_recursos`, com as séries amostradas."""
+        p = self.parametros
+        return {
+            'energia': self.serie_energia,
+            'agua': self.serie_agua,
+            'bateria': p['bateria'],
+            'agua_inicial': p['agua_inicial'],
+            'turnos_em_deficit': self.turnos_em_deficit,
+            'penalidade': penalidade_deficit(p, self.turnos_em_deficit, self.fracao),
+        }
+
+
+def _estado_compacto(rng):
+    """Estado de um `random.Random` com as 625 palavras do Mersenne Twister em 2,5 kB."""
+    versao, palavras, gauss = rng.getstate()
+    return versao, array('I', palavras), gauss
+
+
+def _restaurar_estado(rng, estado):
+    versao, palavras, gauss = estado
+    rng.setstate((versao, tuple(palavras), gauss))
+
+
+class ViagemEmCurso:
+    """Viagem percorrida como gerador: cada iteração sorteia e produz um turno.
+
+    Mantém só o estado corrente (gerador aleatório, avarias e agregados), então
+    serve para viagens de qualquer duração. `resultado()` avalia a viagem com
+    os agregados até o turno atual.
+    """
+
+    def __init__(self, regras, nave, mascara, semente, sorteador, turnos=None):
+        self.regras = regras
+        self.nave = nave
+        self.sorteador = sorteador
+        self.rng = random.Random(semente)
+        self.estado = EstadoModulos(mascara)
+        self.ids_a_bordo = ids_de(self.estado.a_bordo)
+        self.ids_set = frozenset(self.ids_a_bordo)
+        self.total_turnos = int(turnos or regras.turnos)
+        # Avarias na taxa da duração calibrada; gerador separado para não alterar o diário
+        self.chance_avaria = fracao_turno(regras, self.total_turnos)
+        self.rng_avarias = random.Random(semente ^ 0xA7A21A) if self.chance_avaria < 1.0 else None
+        self.turno = 0
+        self.agregados = AgregadosRecursos(regras, self.estado.a_bordo, self.total_turnos)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.turno >= self.total_turnos:
+            raise StopIteration
+        self.turno += 1
+        evento = _evento(self.rng, self.regras, self.sorteador, self.turno, self.ids_a_bordo, self.ids_set)
+        if evento.get('efeito') == 'risco_avaria_modulo' and self.ids_a_bordo:
+            modulo = self.rng.choice(self.ids_a_bordo)
+            if self.rng_avarias is None or self.rng_avarias.random() < self.chance_avaria:
+                self.estado.avariar(modulo)
+        self.agregados.registrar(evento.get('efeito'))
+        return {"turno": self.turno, "evento": evento}
+
+    def ponto_de_retomada(self):
+        """Estado corrente (geradores, avarias e agregados) para `retomar`."""
+        return (
+            self.turno, _estado_compacto(self.rng),
+            _estado_compacto(self.rng_avarias) if self.rng_avarias is not None else None,
+            self.estado.avariados, self.agregados.ponto_de_retomada(),
+        )
+
+    def retomar(self, ponto):
+        """Volta a um `ponto_de_retomada` desta mesma viagem."""
+        self.turno, rng, rng_avarias, self.estado.avariados, agregados = ponto
+        _restaurar_estado(self.rng, rng)
+        if rng_avarias is not None:
+            _restaurar_estado(self.rng_avarias, rng_avarias)
+        self.agregados.retomar(agregados)
+        return self
+
+    def avancar_ate(self, turno, pontos=None):
+        """Percorre (sem produzir) os turnos até `turno`, inclusive.
+
+        Com `pontos` ({turno: ponto de retomada} da mesma viagem), parte do
+        ponto mais próximo antes de `turno` e guarda os múltiplos de
+        `TURNOS_POR_PONTO` que atravessar.
+        """
+        alvo = max(0, min(turno, self.total_turnos))
+        if pontos is None:
+            for _ in islice(self, alvo - self.turno):
+                pass
+            return self
+        # tuple(): outras threads podem gravar pontos da mesma viagem
+        partida = max((t for t in tuple(pontos) if self.turno < t <= alvo), default=None)
+        if partida is not None:
+            self.retomar(pontos[partida])
+        while self.turno < alvo:
+            proximo = min(alvo, (self.turno // TURNOS_POR_PONTO + 1) * TURNOS_POR_PONTO)
+            for _ in islice(self, proximo - self.turno):
+                pass
+            if self.turno % TURNOS_POR_PONTO == 0:
+                pontos.setdefault(self.turno, self.ponto_de_retomada())
+        return self
+
+    def resultado(self):
+        """Avaliação com os agregados correntes (mesmo formato de `simular_viagem`, sem diário)."""
+        balanco = self.agregados.balanco()
+        chegada_ok, pontuacao, massa_total, capacidade = self.regras.avaliar(
+            self.estado.a_bordo, capacidade_kg(self.nave, self.regras.destino),
+            self.estado.total_avariados, balanco['penalidade']
+        )
+        return {
+            'diario': None,
+            'total_turnos': self.total_turnos,
+            'estado': self.estado,
+            'balanco': balanco,
+            'chegada_ok': chegada_ok,
+            'pontuacao': pontuacao,
+            'massa_total': massa_total,
+            'capacidade_kg': capacidade,
+        }
+
+
+def simular_viagem(regras, nave, mascara, semente, sorteador, turnos=None):
+    """Gera o diário e avalia a viagem; mesma entrada, mesmo resultado.
+
+    Retorna dict com `diario` (lista de {turno, evento}), `total_turnos`,
+    `estado` (EstadoModulos com as avarias), `balanco` de recursos (séries
+    completas), `chegada_ok`, `pontuacao`, `massa_total` e `capacidade_kg`.
+    """
+    viagem = ViagemEmCurso(regras, nave, mascara, semente, sorteador, turnos)
+    diario = list(viagem)
+    resultado = viagem.resultado()
+    resultado['diario'] = diario
+    resultado['balanco'] = balanco_da_viagem(regras, viagem.estado.a_bordo, diario)
+    return resultado
+
+
+def _viagem_gravada(versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos):
+    regras = regras_da_versao(versao_regras)
+    if regras is None:
+        return None
+    return ViagemEmCurso(
+        regras[destino], NAVES_ESPACIAIS.get(nave_id), mascara, semente, sorteador_compacto(perfil_eventos), turnos
+    )
+
+
+@lru_cache(maxsize=32)
+def _pontos_de_retomada(versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos):
+    """Pontos de retomada de uma viagem longa ({turno: ponto}), preenchidos ao percorrê-la."""
+    return {}
+
+
+@lru_cache(maxsize=256)
+def reproduzir_viagem(versao_regras, destino, nave_id, mascara, semente, perfil_eventos='', turnos=None):
+    """Resultado de uma viagem gravada (None se a versão das regras sumiu).
+
+    Viagens longas (acima de `LIMITE_DIARIO_EM_MEMORIA` turnos) são percorridas
+    sem guardar o diário (`diario` None). O resultado fica em cache e é
+    compartilhado: não deve ser alterado.
+    """
+    viagem = _viagem_gravada(versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos)
+    if viagem is None:
+        return None
+    if viagem.total_turnos > LIMITE_DIARIO_EM_MEMORIA:
+        viagem.avancar_ate(viagem.total_turnos, _pontos_de_retomada(
+            versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos
+        ))
+        return viagem.resultado()
+    resultado = simular_viagem(
+        viagem.regras, viagem.nave, mascara, semente, viagem.sorteador, turnos
+    )
+    resultado['diario'] = tuple(resultado['diario'])
+    return resultado
+
+
+def turnos_da_viagem(versao_regras, destino, nave_id, mascara, semente, perfil_eventos='', turnos=None, inicio=0):
+    """Iterador dos turnos de uma viagem gravada a partir do turno `inicio` (exclusivo).
+
+    Usa o diário em cache quando existe; senão percorre o gerador (memória
+    constante) a partir do ponto de retomada mais próximo. Iterador vazio se a
+    versão das regras sumiu.
+    """
+    resultado = reproduzir_viagem(versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos)
+    if resultado is None:
+        return iter(())
+    if resultado['diario'] is not None:
+        return iter(resultado['diario'][inicio:])
+    viagem = _viagem_gravada(versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos)
+    return viagem.avancar_ate(inicio, _pontos_de_retomada(
+        versao_regras, destino, nave_id, mascara, semente, perfil_eventos, turnos
+    ))
+
+
+def pagina_diario(diario, pagina, tamanho=TAMANHO_PAGINA_DIARIO):
+    """Fatia do diário da página (1-based) e o total de páginas."""
+    tamanho = max(1, min(int(tamanho), TAMANHO_MAXIMO_PAGINA))
+    total_paginas = max(1, -(-len(diario) // tamanho))
+    pagina = max(1, int(pagina))
+    inicio = (pagina - 1) * tamanho
+    return diario[inicio:inicio + tamanho], total_paginas
+
+
+def pagina_da_viagem(resultado, chave, pagina, tamanho=TAMANHO_PAGINA_DIARIO):
+    """Página do diário de uma viagem gravada, materializado ou não.
+
+    `chave` são os argumentos de `reproduzir_viagem`. Retorna (entradas,
+    total_paginas).
+    """
+    if resultado['diario'] is not None:
+        return pagina_diario(resultado['diario'], pagina, tamanho)
+    tamanho = max(1, min(int(tamanho), TAMANHO_MAXIMO_PAGINA))
+    total_paginas = max(1, -(-resultado['total_turnos'] // tamanho))
+    inicio = (max(1, int(pagina)) - 1) * tamanho
+    return tuple(islice(turnos_da_viagem(*chave, inicio=inicio), tamanho)), total_paginas
+
+
+def transmitir_ndjson(turnos, formatar, resultado, lote=200):
+    """Partes de uma resposta NDJSON: uma linha por turno e um resumo no fim.
+
+    As linhas são agrupadas em lotes de `lote` turnos por parte, e só o lote
+    corrente fica em memória.
+    """
+    for bloco in iter(lambda: list(islice(turnos, lote)), []):
+        yield ''.join(json.dumps(formatar(t), ensure_ascii=False) + '\n' for t in bloco)
+    yield json.dumps({
+        'fim': True,
+        'total_turnos': resultado['total_turnos'],
+        'pontuacao': int(resultado['pontuacao']),
+        'chegada_ok': resultado['chegada_ok'],
+        'turnos_em_deficit': resultado['balanco']['turnos_em_deficit'],
+    }) + '\n'
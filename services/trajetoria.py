@@ -0,0 +1,152 @@
+"""Trajetória educacional da viagem: transferência orbital por cônicas conjugadas.
+
+Os turnos da viagem deixam de ser abstratos: cada destino tem uma
+transferência propagada numericamente no problema de dois corpos.
+
+- Lua: elipse de Hohmann de uma órbita baixa (LEO) até a distância da Lua,
+  em torno da Terra;
+- Marte: elipse de Hohmann heliocêntrica da órbita da Terra à de Marte;
+- Exoplaneta: trajetória hiperbólica de escape do Sol até a heliopausa
+  (~100 UA), primeiro trecho da viagem interestelar.
+
+A integração usa velocity Verlet (kick-drift-kick, simplético) com passo
+proporcional a r^(3/2), o que mantém a precisão no perigeu de elipses muito
+excêntricas como a lunar. Cada turno vira um instante da transferência e
+recebe uma posição real; o caminho reduzido e os marcadores alimentam o SVG de
+`viagem.html`.
+
+Neste modelo a transferência depende apenas do destino (todas as naves
+partem da mesma órbita de estacionamento), então o cache é por destino e a
+página não paga nenhuma integração depois da primeira viagem.
+"""
+
+import math
+from bisect import bisect_left
+from functools import lru_cache
+
+
+MU_TERRA = 398600.4418          # km³/s²
+MU_SOL = 1.32712440018e11       # km³/s²
+UA_KM = 149597870.7             # km
+SEGUNDOS_POR_DIA = 86400
+
+# Passo de integração: fração do tempo orbital local (r^1.5 / sqrt(mu))
+ETA_PASSO = 0.005
+PONTOS_CAMINHO = 120
+
+TRANSFERENCIAS = {
+    'lua': {'tipo': 'hohmann', 'corpo_central': 'Earth', 'mu': MU_TERRA,
+            'raio_origem_km': 6771.0, 'raio_destino_km': 384400.0},
+    'marte': {'tipo': 'hohmann', 'corpo_central': 'Sun', 'mu': MU_SOL,
+              'raio_origem_km': UA_KM, 'raio_destino_km': 1.524 * UA_KM},
+    # Excesso sobre a velocidade de escape local na partida
+    'exoplaneta': {'tipo': 'escape', 'corpo_central': 'Sun', 'mu': MU_SOL,
+                   'raio_origem_km': UA_KM, 'raio_destino_km': 100 * UA_KM, 'excesso_escape': 1.2},
+}
+
+
+def propagar(mu, raio, velocidade, tempo_final=None, raio_final=None, eta=ETA_PASSO):
+    """Integra o problema de dois corpos no plano a partir do periapside.
+
+    Parte de (raio, 0) com velocidade tangencial e para em `tempo_final` (s)
+    ou ao atingir `raio_final` (km). Retorna listas (tempos, xs, ys).
+    """
+    x, y, vx, vy, t = raio, 0.0, 0.0, velocidade, 0.0
+    raiz_mu = math.sqrt(mu)
+    r = raio
+    ax, ay = -mu / (r * r), 0.0
+    tempos, xs, ys = [t], [x], [y]
+    while (tempo_final is None or t < tempo_final) and (raio_final is None or r < raio_final):
+        dt = eta * r ** 1.5 / raiz_mu
+        if tempo_final is not None:
+            dt = min(dt, tempo_final - t)
+        vx += 0.5 * dt * ax
+        vy += 0.5 * dt * ay
+        x += dt * vx
+        y += dt * vy
+        r = math.hypot(x, y)
+        r3 = r * r * r
+        ax, ay = -mu * x / r3, -mu * y / r3
+        vx += 0.5 * dt * ax
+        vy += 0.5 * dt * ay
+        t += dt
+        tempos.append(t)
+        xs.append(x)
+        ys.append(y)
+    return tempos, xs, ys
+
+
+def _destino_conhecido(destino):
+    destino = (destino or '').lower()
+    return destino if destino in TRANSFERENCIAS else 'lua'
+
+
+@lru_cache(maxsize=None)
+def trajetoria(destino):
+    """Transferência propagada do destino (tempos em s, posições em km)."""
+    destino = _destino_conhecido(destino)
+    dados = TRANSFERENCIAS[destino]
+    mu, r1, r2 = dados['mu'], dados['raio_origem_km'], dados['raio_destino_km']
+    if dados['tipo'] == 'hohmann':
+        semi_eixo = (r1 + r2) / 2
+        velocidade = math.sqrt(mu * (2 / r1 - 1 / semi_eixo))
+        tempos, xs, ys = propagar(mu, r1, velocidade, tempo_final=math.pi * math.sqrt(semi_eixo ** 3 / mu))
+    else:
+        velocidade = dados['excesso_escape'] * math.sqrt(2 * mu / r1)
+        tempos, xs, ys = propagar(mu, r1, velocidade, raio_final=r2)
+    return {
+        'destino': destino,
+        'tipo': dados['tipo'],
+        'corpo_central': dados['corpo_central'],
+        'raio_origem_km': r1,
+        'raio_destino_km': r2,
+        'velocidade_partida_kms': velocidade,
+        'duracao_dias': tempos[-1] / SEGUNDOS_POR_DIA,
+        'tempos': tuple(tempos),
+        'xs': tuple(xs),
+        'ys': tuple(ys),
+    }
+
+
+def _posicao(traj, t):
+    """Posição interpolada linearmente no instante t (s)."""
+    tempos, xs, ys = traj['tempos'], traj['xs'], traj['ys']
+    i = min(max(bisect_left(tempos, t), 1), len(tempos) - 1)
+    t0, t1 = tempos[i - 1], tempos[i]
+    f = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+    return xs[i - 1] + f * (xs[i] - xs[i - 1]), ys[i - 1] + f * (ys[i] - ys[i - 1])
+
+
+def posicao_turno(destino, turno, turnos):
+    """Dia e distância ao corpo central ao fim de um turno (sem montar a série inteira)."""
+    traj = trajetoria(destino)
+    t = traj['tempos'][-1] * turno / turnos
+    x, y = _posicao(traj, t)
+    return {'turno': turno, 'dia': round(t / SEGUNDOS_POR_DIA, 1), 'distancia_km': round(math.hypot(x, y)), 'x': x, 'y': y}
+
+
+@lru_cache(maxsize=None)
+def grafico_trajetoria(destino, tamanho=300):
+    """Caminho reduzido e órbitas de origem/destino prontos para um SVG quadrado."""
+    traj = trajetoria(destino)
+    tempos = traj['tempos']
+    escala = (tamanho / 2 - 10) / traj['raio_destino_km']
+    centro = tamanho / 2
+
+    def ponto(x, y):
+        return f"{centro + x * escala:.1f},{centro - y * escala:.1f}"
+
+    duracao = tempos[-1]
+    amostras = [_posicao(traj, duracao * i / (PONTOS_CAMINHO - 1)) for i in range(PONTOS_CAMINHO)]
+    chegada = amostras[-1]
+    return {
+        'tamanho': tamanho,
+        'centro': centro,
+        'raio_origem': round(traj['raio_origem_km'] * escala, 1),
+        'raio_destino': round(traj['raio_destino_km'] * escala, 1),
+        'caminho': ' '.join(ponto(x, y) for x, y in amostras),
+        'chegada': ponto(*chegada).split(','),
+        'corpo_central': traj['corpo_central'],
+        'duracao_dias': round(traj['duracao_dias'], 1),
+        'escala': escala,
+    }
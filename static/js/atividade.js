@@ -0,0 +1,48 @@
+/*
+ Live activity feed for room and teacher channels (answers, finished voyages
+ and habitats, voyage progress), fed by AppWS (ws.js). The page subscribes to
+ the channels with window.WS_TOKEN; this script only draws the messages.
+
+ Options:
+   limite         max. items kept in the list (default 15)
+   nomes          { aluno_id: name } for messages without a name (voyage progress)
+   ignorarViagem  voyage id left out of the feed (the student's own voyage)
+*/
+(function () {
+  function AtividadeAoVivo(lista, opcoes) {
+    if (!lista || !window.AppWS) return;
+    opcoes = opcoes || {};
+    const limite = opcoes.limite || 15;
+    const nomes = opcoes.nomes || {};
+    const progresso = {};
+
+    function registrar(texto, chave) {
+      const vazio = lista.querySelector(".atividade-vazia");
+      if (vazio) vazio.remove();
+      let item = chave && progresso[chave];
+      if (!item) {
+        item = document.createElement("li");
+        if (chave) progresso[chave] = item;
+      }
+      item.textContent = texto;
+      lista.prepend(item);
+      while (lista.childElementCount > limite) {
+        const ultimo = lista.lastElementChild;
+        Object.keys(progresso).forEach(k => { if (progresso[k] === ultimo) delete progresso[k]; });
+        ultimo.remove();
+      }
+    }
+
+    const nome = m => m.nome || nomes[m.aluno_id] || `Student #${m.aluno_id}`;
+    AppWS.on("answer_submitted", m => registrar(`${nome(m)} answered ${m.desafio_id} (+${m.pontuacao})`));
+    AppWS.on("voyage_finished", m => registrar(`${nome(m)} finished a voyage: ${m.pontuacao} points`));
+    AppWS.on("habitat_finished", m => registrar(`${nome(m)} finished the habitat`));
+    AppWS.on("trip_progress", m => {
+      if (opcoes.ignorarViagem != null && m.viagem_id === opcoes.ignorarViagem) return;
+      const quem = m.aluno_id != null && nomes[m.aluno_id] ? `${nomes[m.aluno_id]}'s voyage` : `Voyage #${m.viagem_id}`;
+      registrar(`${quem}: turn ${m.turno} of ${m.total_turnos}`, `viagem-${m.viagem_id}`);
+    });
+  }
+
+  window.AtividadeAoVivo = AtividadeAoVivo;
+})();
@@ -173,6 +173,7 @@ function atualizarSumario() {
     
     // Calcular e exibir informações de performance da missão
     calcularPerformanceMissao(massaAtual, capacidadeMaxima);
+    atualizarFeedbackCarga();
 }
 
 function calcularPerformanceMissao() {
@@ -446,6 +447,64 @@ function atualizarStatusSistema() {
     }
 }
 
+// Feedback do servidor (massa, essenciais, previsão de pontuação) a cada mudança
+let feedbackCargaPendente = null;
+
+function atualizarFeedbackCarga() {
+    const painel = document.getElementById('feedback-carga');
+    if (!painel || !painel.dataset.url) return;
+
+    // Módulos repetidos contam uma vez na pontuação do servidor
+    const ids = gerenciadorModulos.getModulosSelecionados()
+        .filter(m => m.quantidade > 0)
+        .map(m => m.id);
+
+    // Cancela a requisição anterior: só a resposta mais recente interessa
+    if (feedbackCargaPendente) feedbackCargaPendente.abort();
+    const controle = new AbortController();
+    feedbackCargaPendente = controle;
+
+    const url = `${painel.dataset.url}?modulos=${encodeURIComponent(ids.join(','))}`;
+    fetch(url, { signal: controle.signal, headers: { 'Accept': 'application/json' } })
+        .then(resp => resp.ok ? resp.json() : null)
+        .then(dados => {
+            if (dados) exibirFeedbackCarga(dados);
+        })
+        .catch(err => {
+            if (err.name !== 'AbortError') console.warn('Falha no feedback da carga', err);
+        });
+}
+
+function exibirFeedbackCarga(dados) {
+    const razao = document.getElementById('feedback-razao');
+    const faltantes = document.getElementById('feedback-faltantes');
+    const pontuacao = document.getElementById('feedback-pontuacao');
+    const sucesso = document.getElementById('feedback-sucesso');
+
+    if (razao) {
+        const [minimo, maximo] = dados.faixa_ideal;
+        razao.textContent = `${(dados.razao_capacidade * 100).toFixed(0)}% of capacity ` +
+            `(ideal ${(minimo * 100).toFixed(0)}–${(maximo * 100).toFixed(0)}%)`;
+        razao.style.color = dados.acima_do_limite ? '#e74c3c' : (dados.na_faixa_ideal ? '#2ecc71' : '#f39c12');
+    }
+    if (faltantes) {
+        faltantes.textContent = dados.faltantes.length
+            ? dados.faltantes.map(f => f.nome).join(', ')
+            : 'None';
+        faltantes.style.color = dados.faltantes.length > dados.faltantes_permitidos ? '#e74c3c'
+            : (dados.faltantes.length ? '#f39c12' : '#2ecc71');
+    }
+    if (pontuacao) {
+        const p = dados.pontuacao;
+        pontuacao.textContent = `${p.min}–${p.max} (expected ${p.esperada}, minimum to arrive ${dados.pontos_minimos})`;
+    }
+    if (sucesso) {
+        const pct = Math.round(dados.probabilidade_sucesso * 100);
+        sucesso.textContent = `${pct}%`;
+        sucesso.style.color = pct >= 70 ? '#2ecc71' : (pct >= 30 ? '#f39c12' : '#e74c3c');
+    }
+}
+
 // Função auxiliar para capitalizar a primeira letra
 function capitalizeFirst(string) {
     return string.charAt(0).toUpperCase() + string.slice(1);
@@ -1,16 +1,79 @@
 /*
  Robust WebSocket client with reconnection, heartbeat, and JSON/text/binary support.
+
+ Compact protocol: on every connection the client sends a "hello" asking for
+ binary turn frames; the server answers once with the event and module tables
+ ("tables") and then sends voyage turns as binary frames (see
+ services/protocolo.py), decoded here into the same "trip_event"/"trip_events"
+ messages the JSON protocol delivers. Servers that ignore the hello keep
+ sending JSON.
 */
 (function () {
-  // Build ws URL using hostname and configurable port (default 6789)
+  // Build ws URL using hostname and configurable port (default 6789), or the
+  // page's own origin when the app is served by the single-process asgi.py
   const host = window.location.hostname;
   const port = (window.WS_PORT || 6789);
-  const WS_URL = `ws://${host}:${port}/ws`;
-  const TOKEN = window.WS_TOKEN || null; // Optional auth token
+  const WS_URL = window.WS_SAME_ORIGIN
+    ? `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}/ws`
+    : `ws://${host}:${port}/ws`;
+  // Channel access ticket issued by the page (teachers, ranking or a room)
+  const TOKEN = window.WS_TOKEN || null;
 
   let ws = null;
   let reconnectAttempts = 0;
   let manualClose = false;
+  // Listeners by message type ("open" fires on every (re)connection)
+  const listeners = {};
+  // Binary protocol: frame type, record layout (>IBB) and tables from the server
+  const PROTOCOL_VERSION = 1;
+  const TURN_FRAME = 1;
+  const TURN_RECORD_BYTES = 6;
+  let tables = null;
+
+  function emit(type, payload) {
+    (listeners[type] || []).forEach(fn => {
+      try {
+        fn(payload);
+      } catch (e) {
+        console.warn('[WS] Listener failed:', e);
+      }
+    });
+  }
+
+  function on(type, fn) {
+    (listeners[type] = listeners[type] || []).push(fn);
+  }
+
+  // Rebuild the public event of a turn from (turn, event code, module code)
+  function decodeTurn(turn, code, moduleCode) {
+    if (code === 1) {
+      const mod = tables.modulos[moduleCode];
+      return { turno: turn, nome: `Module Operation: ${mod.nome}`, descricao: mod.descricao, icone: mod.icone, efeito: 'nenhum' };
+    }
+    const evt = tables.eventos[code];
+    let descricao = evt.descricao;
+    if (evt.complemento) {
+      descricao += moduleCode === evt.complemento[0] ? evt.complemento[1] : evt.complemento[2];
+    }
+    return { turno: turn, nome: evt.nome, descricao, icone: evt.icone, efeito: evt.efeito };
+  }
+
+  function decodeBinary(buffer) {
+    const view = new DataView(buffer);
+    if (!tables || view.byteLength < 1 || view.getUint8(0) !== TURN_FRAME) {
+      console.log('[WS] Binary received', buffer.byteLength, 'bytes');
+      return;
+    }
+    const events = [];
+    for (let i = 1; i + TURN_RECORD_BYTES <= view.byteLength; i += TURN_RECORD_BYTES) {
+      events.push(decodeTurn(view.getUint32(i), view.getUint8(i + 4), view.getUint8(i + 5)));
+    }
+    if (events.length === 1) {
+      emit('trip_event', { type: 'trip_event', data: events[0] });
+    } else {
+      emit('trip_events', { type: 'trip_events', data: events });
+    }
+  }
 
   const maxReconnectDelay = 30000; // 30s cap
   const baseDelay = 1000; // 1s initial
@@ -29,14 +92,22 @@
     ws.onopen = () => {
       console.log('[WS] Connected');
       reconnectAttempts = 0;
-      // Optional token-based auth message
+      // Ask for compact binary turn frames (old servers just ignore it)
+      tables = null;
+      try {
+        ws.send(JSON.stringify({ action: 'hello', formato: 'binario', versao: PROTOCOL_VERSION }));
+      } catch (e) {
+        console.warn('[WS] Failed to send hello:', e);
+      }
+      // Subscribe again on every connection: channels live in the connection
       if (TOKEN) {
         try {
-          ws.send(JSON.stringify({ token: TOKEN }));
+          ws.send(JSON.stringify({ action: 'subscribe', ticket: TOKEN }));
         } catch (e) {
-          console.warn('[WS] Failed to send auth token:', e);
+          console.warn('[WS] Failed to send access ticket:', e);
         }
       }
+      emit('open');
     };
 
     ws.onmessage = (ev) => {
@@ -44,12 +115,19 @@
       if (typeof data === 'string') {
         try {
           const json = JSON.parse(data);
-          console.log('[WS] JSON', json);
+          if (json && json.type === 'tables') {
+            tables = json;
+            emit('tables', json);
+          } else if (json && json.type && listeners[json.type]) {
+            emit(json.type, json);
+          } else {
+            console.log('[WS] JSON', json);
+          }
         } catch (e) {
           console.log('[WS] Text', data);
         }
       } else if (data instanceof ArrayBuffer) {
-        console.log('[WS] Binary received', data.byteLength, 'bytes');
+        decodeBinary(data);
       } else {
         console.log('[WS] Message', data);
       }
@@ -98,7 +176,7 @@
   }
 
   // Expose API
-  window.AppWS = { connect, sendJSON, sendText, sendBinary, close };
+  window.AppWS = { connect, on, sendJSON, sendText, sendBinary, close };
 
   // Auto-connect on page load
   document.addEventListener('DOMContentLoaded', connect);
@@ -1,55 +1,457 @@
+"""Servidor WebSocket de tempo real do Cosmo-Casa.
+
+Transmite a viagem turno a turno para o navegador. O servidor é a autoridade
+sobre os turnos: o cliente envia apenas o bilhete assinado emitido pelo Flask
+em `/viagem` (`services.bilhetes`), e os eventos são regenerados aqui a partir
+da semente com `services.simulacao` — idênticos aos da página, sem upload do
+diário e sem possibilidade de adulteração pelo cliente.
+
+Canais (`services.canais`): cada sala tem um canal, e os professores têm um
+canal que recebe os eventos de todas as salas. O progresso das viagens
+transmitidas aqui e os eventos gravados pelo Flask (respostas, viagens
+concluídas, habitats finalizados — lidos do log `eventos_tempo_real`) são
+publicados uma vez e difundidos a todos os assinantes.
+
+Ranking ao vivo (`services.placar`): cada lote de respostas novas no log
+provoca um único recálculo do ranking das salas ativas, e o canal `ranking`
+recebe só as posições alteradas, com número de versão. Com vários processos,
+só o processo 0 recalcula; os demais adotam a classificação dele.
+
+Protocolo (JSON):
+- cliente → `{"action": "start_trip", "ticket": "<bilhete>"}` inicia (ou
+  reinicia) a transmissão; `{"action": "resume_trip", "ticket": ...,
+  "desde": <último turno recebido>}` retoma após reconexão, com o mesmo
+  ritmo (`services.sessoes`); ambas aceitam `"pace"` (`tempo_real`,
+  `acelerado`, `instantaneo` — `services.ritmos`; sem ele vale o ritmo da
+  sala, gravado no bilhete); `{"action": "set_pace", "ticket": ...,
+  "pace": ...}` troca o ritmo da transmissão em curso (avanço rápido);
+  `{"action": "stop_trip"}` interrompe;
+  `{"action": "hello", "formato": "binario", "versao": 1}` negocia os
+  quadros binários de turnos (`services.protocolo`; resposta `tables`);
+  `{"action": "subscribe", "ticket": "<bilhete de acesso>"}` (ou
+  `{"token": ...}`, enviado por `ws.js`) assina os canais autorizados;
+  `{"action": "ranking_sync", "epoca": ..., "versao": ...}` pede o que falta
+  desde a versão do ranking que o cliente tem;
+- servidor → `trip_start` (total de turnos e turno de partida `desde`), um
+  `trip_event` por turno no tempo real ou `trip_events` (lista de turnos em
+  um só quadro) nos ritmos acelerados — ou, após o `hello`, quadros binários
+  com os mesmos turnos —, e `trip_complete` com pontuação e chegada; `error` para bilhetes inválidos;
+  nos canais, `trip_progress`, `answer_submitted`, `voyage_finished`,
+  `habitat_finished` e `ranking_delta` (ou `ranking_snapshot` no sync).
+
+Envio (`services.filas`): cada conexão tem uma fila de saída limitada e uma
+tarefa escritora; progresso e ranking são coalescidos (só o mais recente
+segue), progresso é descartável sob pressão e consumidores lentos são
+desconectados. Tamanhos de fila, contadores, CPU e memória do processo ficam
+em `GET /metricas` (lidos pelo teste de carga `scripts/carga_websocket.py`).
+
+Vários núcleos (`services.broker`): com `WS_WORKERS=N` (N > 1), este processo
+vira supervisor: sobe o hub de mensagens e N processos que atendem na mesma
+porta (`SO_REUSEPORT`; sem ele, roda um processo só). Cada processo lê o log
+de eventos do SQLite e repassa pelo hub o progresso das viagens que
+transmite, então uma sala recebe tudo em qualquer processo. O ranking é
+recalculado só no processo 0, que repassa a classificação pelo canal interno
+`placar`; os demais a adotam (mesma época e versões) e publicam o delta aos
+seus assinantes. Um processo que sobe depois pede a classificação atual.
+
+Configuração por ambiente: `SECRET_KEY` (a mesma do Flask), `WS_PORT`,
+`WS_WORKERS`, `WS_BROKER` (endereço do hub; padrão em `endereco_padrao`),
+`WS_INTERVALO_TURNOS` (segundos entre turnos no tempo real) e `WS_INTERVALO_EVENTOS`
+(segundos entre leituras do log de eventos).
+"""
+
 import asyncio
 import websockets
 import json
 import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from http import HTTPStatus
+
+from services.bilhetes import ler_bilhete, ler_acesso
+from services.broker import ClienteBroker, HubCanais, endereco_padrao
+from services.canais import (
+    Canais, canal_sala, canais_do_evento, mensagem_de_resposta, CANAL_PROFESSORES, CANAL_RANKING, CANAL_PLACAR
+)
+from services.filas import FilaEnvio, MetricasEnvio, difundir
+from services.placar import PlacarAoVivo
+from services.protocolo import aceita_binario, codificar_turnos, mensagem_tabelas
+from services.ritmos import perfil_ritmo
+from services.sessoes import SessoesViagem
+from services.simulacao import reproduzir_viagem, turnos_da_viagem
 
 # Configura o logging para dar mais informações
 logging.basicConfig(level=logging.INFO)
 
+# Mesma porta padrão do cliente (static/js/ws.js)
+PORTA = int(os.getenv('WS_PORT', '6789'))
+INTERVALO_TURNOS = float(os.getenv('WS_INTERVALO_TURNOS', '2'))
+INTERVALO_EVENTOS = float(os.getenv('WS_INTERVALO_EVENTOS', '0.05'))
+TRABALHADORES = int(os.getenv('WS_WORKERS', '1'))
+ENDERECO_BROKER = os.getenv('WS_BROKER') or endereco_padrao(PORTA)
+# Definido pelo supervisor em cada processo que ele sobe
+TRABALHADOR = os.getenv('WS_WORKER_ID')
+# Um só processo recalcula o ranking; os outros recebem a classificação pelo hub
+CALCULA_RANKING = TRABALHADOR in (None, '0')
+# O log de eventos é podado a cada tantas leituras
+LEITURAS_POR_LIMPEZA = 12000
+LIMITE_RANKING = 100
+
 # Guarda a lista de clientes (navegadores) conectados
 connected_clients = set()
 
-# AQUI ESTÁ A CORREÇÃO: A função agora só recebe 'websocket'
+# Contadores de todas as filas de saída (expostos em /metricas)
+metricas = MetricasEnvio()
+
+# Assinaturas por canal (as conexões são as filas de saída); a difusão não espera clientes lentos
+canais = Canais(difundir)
+
+# Última classificação publicada e deltas recentes
+placar = PlacarAoVivo()
+
+# Transmissões de viagem endereçáveis (cursor e ritmo) para retomada após reconexão
+sessoes = SessoesViagem()
+
+
+def _json(tipo, **dados):
+    return json.dumps({"type": tipo, **dados}, ensure_ascii=False)
+
+
+def evento_publico(entrada):
+    """Campos de um turno enviados ao navegador."""
+    evento = entrada["evento"]
+    return {
+        "turno": entrada["turno"],
+        "nome": evento.get("nome"),
+        "descricao": evento.get("descricao"),
+        "icone": evento.get("icone"),
+        "efeito": evento.get("efeito"),
+    }
+
+
+def ritmo_de(nome):
+    """Perfil de ritmo com o intervalo de tempo real configurado no servidor."""
+    return perfil_ritmo(nome, INTERVALO_TURNOS)
+
+
+def definir_ritmo(bilhete, nome):
+    """Troca o ritmo da sessão do bilhete (sem `nome`, volta ao ritmo da sala)."""
+    dados = ler_bilhete(bilhete)
+    sessao = sessoes.buscar(dados) if dados is not None else None
+    if sessao is None:
+        return False
+    sessao.definir_ritmo(ritmo_de(nome or dados["ritmo"]))
+    return True
+
+
+async def transmitir_viagem(fila, bilhete, retomar=False, desde=None, ritmo=None, binario=False):
+    """Valida o bilhete e enfileira os turnos da viagem gerados pela simulação.
+
+    Com `retomar`, continua a sessão da viagem a partir de `desde` (último turno
+    recebido pelo cliente; na falta dele, o cursor da sessão) e com o ritmo dela.
+    `ritmo` escolhe o perfil da transmissão; sem ele, vale o da sala. Com
+    `binario` (negociado no `hello`), os turnos seguem em quadros binários.
+    """
+    dados = ler_bilhete(bilhete)
+    if dados is None:
+        await fila.enviar(_json("error", erro="Invalid or expired ticket"))
+        return
+    chave = dados["chave"]
+    padrao = ritmo_de(ritmo or dados["ritmo"])
+    sessao = sessoes.retomar(dados, padrao) if retomar else sessoes.abrir(dados, padrao)
+    if retomar and ritmo:
+        sessao.definir_ritmo(padrao)
+    sessao.tarefa = asyncio.current_task()
+    try:
+        # Viagens de resistência levam frações de segundo para avaliar: fora do laço de eventos
+        resultado = await asyncio.to_thread(reproduzir_viagem, *chave)
+        if resultado is None:
+            await fila.enviar(_json("error", erro="Rules version no longer available"))
+            return
+
+        total = sessao.total_turnos = resultado["total_turnos"]
+        try:
+            inicio = min(max(int(sessao.cursor if desde is None else desde), 0), total) if retomar else 0
+        except (TypeError, ValueError):
+            inicio = 0
+        sessao.avancar(inicio)
+        await fila.enviar(_json("trip_start", viagem_id=dados["viagem_id"], total_turnos=total, desde=inicio))
+        destinos = (canal_sala(dados["sala_id"]), CANAL_PROFESSORES) if dados["sala_id"] else (CANAL_PROFESSORES,)
+
+        async def enviar_quadro(lote):
+            # Espera espaço na própria fila: um cliente lento só atrasa a própria viagem
+            quadro = codificar_turnos(lote) if binario else None
+            if quadro is not None:
+                await fila.enviar(quadro)
+            elif len(lote) == 1:
+                await fila.enviar(_json("trip_event", data=evento_publico(lote[0])))
+            else:
+                await fila.enviar(_json("trip_events", data=[evento_publico(e) for e in lote]))
+            turno = lote[-1]["turno"]
+            sessao.avancar(turno)
+            canais.publicar({
+                "type": "trip_progress", "sala_id": dados["sala_id"], "aluno_id": dados["aluno_id"],
+                "viagem_id": dados["viagem_id"], "turno": turno, "total_turnos": total,
+            }, *destinos, chave=f"progresso:{dados['viagem_id']}", descartavel=True, propagar=True)
+
+        # Retomar uma viagem de resistência percorre os turnos já vistos: fora do laço também
+        turnos = await asyncio.to_thread(turnos_da_viagem, *chave, inicio=inicio)
+        # Nos ritmos acelerados, poucos quadros grandes em vez de milhares de pequenos
+        lote = []
+        for entrada in turnos:
+            lote.append(entrada)
+            if len(lote) >= sessao.ritmo.turnos_por_quadro:
+                await enviar_quadro(lote)
+                lote = []
+                await sessao.esperar()
+        if lote:
+            await enviar_quadro(lote)
+    finally:
+        if sessao.tarefa is asyncio.current_task():
+            sessao.tarefa = None
+
+    # Ao final do loop, envia uma mensagem de conclusão
+    await fila.enviar(_json(
+        "trip_complete", pontuacao=int(resultado["pontuacao"]), chegada_ok=resultado["chegada_ok"]
+    ))
+    logging.info("Viagem %s transmitida (%s turnos).", dados["viagem_id"], resultado["total_turnos"])
+
+
+def publicar_evento(evento):
+    """Republica nos canais um evento lido do log do SQLite."""
+    if evento["tipo"] == "resposta_desafio":
+        mensagem = mensagem_de_resposta(evento["dados"])
+    else:
+        mensagem = {"type": evento["tipo"], **evento["dados"]}
+    return canais.publicar(mensagem, *canais_do_evento(evento["canal"]))
+
+
+async def atualizar_ranking(db):
+    """Recalcula o ranking uma vez e publica as posições que mudaram."""
+    ranking = await asyncio.to_thread(db.obter_ranking_salas_ativas, LIMITE_RANKING)
+    mensagem = placar.delta(ranking)
+    if mensagem is not None:
+        # Um delta ainda na fila é substituído pelo seguinte; o cliente percebe a
+        # lacuna de versão e pede o que falta (ranking_sync)
+        canais.publicar(mensagem, CANAL_RANKING, chave="ranking")
+        publicar_placar()
+    return mensagem
+
+
+def publicar_placar():
+    """Repassa a classificação atual aos outros processos (se houver hub)."""
+    if canais.ponte is not None:
+        canais.publicar(placar.instantaneo(), CANAL_PLACAR, chave="placar", propagar=True)
+
+
+def receber_do_hub(destinos, texto, chave=None, descartavel=False):
+    """Entrega aos assinantes locais uma mensagem de outro processo.
+
+    No canal interno `placar`, o processo que calcula o ranking responde aos
+    pedidos da classificação, e os demais adotam a que recebem e publicam o
+    delta (ou a classificação inteira, se ficaram para trás) no canal `ranking`.
+    """
+    if CANAL_PLACAR not in destinos:
+        return canais.entregar(destinos, texto, chave, descartavel)
+    mensagem = json.loads(texto)
+    if CALCULA_RANKING:
+        if mensagem.get("type") == "ranking_pedido":
+            publicar_placar()
+        return 0
+    if mensagem.get("type") != "ranking_snapshot":
+        return 0
+    mensagem = placar.adotar(mensagem)
+    return canais.publicar(mensagem, CANAL_RANKING, chave="ranking") if mensagem is not None else 0
+
+
+async def acompanhar_eventos(db, intervalo=None, aviso=None):
+    """Lê continuamente o log de eventos gravado pelo Flask e publica cada novo evento.
+
+    Começa do evento mais recente (o histórico não é reenviado), recalcula o
+    ranking uma vez por lote com respostas (só no processo que o calcula) e
+    poda o log de tempos em tempos.
+    Com `aviso` (`asyncio.Event` marcado quando o Flask do mesmo processo grava
+    um evento), lê na hora; `intervalo` vira só a sondagem de segurança.
+    """
+    intervalo = INTERVALO_EVENTOS if intervalo is None else intervalo
+    ultimo = await asyncio.to_thread(db.ultimo_evento_id)
+    if CALCULA_RANKING:
+        await atualizar_ranking(db)
+    leituras = 0
+    while True:
+        if aviso is not None:
+            aviso.clear()
+        try:
+            eventos = await asyncio.to_thread(db.eventos_desde, ultimo)
+            for evento in eventos:
+                publicar_evento(evento)
+                ultimo = evento["id"]
+            if CALCULA_RANKING and any(e["tipo"] == "resposta_desafio" for e in eventos):
+                await atualizar_ranking(db)
+            leituras += 1
+            if leituras % LEITURAS_POR_LIMPEZA == 0:
+                await asyncio.to_thread(db.limpar_eventos)
+        except Exception:
+            logging.exception("Falha ao ler o log de eventos do tempo real")
+        if aviso is None:
+            await asyncio.sleep(intervalo)
+            continue
+        try:
+            await asyncio.wait_for(aviso.wait(), intervalo)
+        except asyncio.TimeoutError:
+            pass
+
+
+def uso_do_processo():
+    """CPU consumida (segundos) e memória residente (kB, None fora do Linux) do servidor."""
+    memoria_kb = None
+    try:
+        with open("/proc/self/statm") as arquivo:
+            memoria_kb = int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"cpu_s": round(time.process_time(), 3), "memoria_kb": memoria_kb}
+
+
+def dados_metricas():
+    """Conteúdo de `GET /metricas`: filas de saída, uso do processo e id do trabalhador."""
+    return {**metricas.como_dict(), "processo": uso_do_processo(), "trabalhador": TRABALHADOR}
+
+
+def responder_metricas(connection, request):
+    """Responde `GET /metricas` (JSON) sem abrir WebSocket; demais caminhos seguem o handshake."""
+    if request.path.split("?")[0] != "/metricas":
+        return None
+    resposta = connection.respond(HTTPStatus.OK, json.dumps(dados_metricas()) + "\n")
+    resposta.headers["Content-Type"] = "application/json"
+    return resposta
+
+
 async def handler(websocket):
-    """Lida com conexões de clientes e envia os eventos da viagem."""
+    """Lida com conexões de clientes; cada uma tem no máximo uma transmissão ativa."""
     connected_clients.add(websocket)
     logging.info(f"Cliente conectado: {websocket.remote_address}")
+    fila = FilaEnvio(websocket, metricas)
+    escritor = asyncio.create_task(fila.escrever())
+    transmissao = None
+    binario = False
     try:
         # Mantém a conexão aberta para ouvir mensagens do navegador
         async for message in websocket:
             try:
                 data = json.loads(message)
-                # Verifica se a mensagem é para iniciar a simulação
-                if data.get("action") == "start_trip":
-                    diario = data.get("diario", [])
-                    logging.info(f"Recebido pedido para iniciar simulação com {len(diario)} turnos.")
-                    
-                    # Envia cada evento do diário com um intervalo de 2 segundos
-                    for item in diario:
-                        payload = json.dumps({"type": "trip_event", "data": item})
-                        await websocket.send(payload)
-                        await asyncio.sleep(2) # Pausa entre os eventos
-
-                    # Ao final do loop, envia uma mensagem de conclusão
-                    await websocket.send(json.dumps({"type": "trip_complete"}))
-                    logging.info("Simulação concluída e enviada ao cliente.")
-
             except json.JSONDecodeError:
                 logging.error("Erro: Mensagem recebida não é um JSON válido.")
-            except Exception as e:
-                logging.error(f"Erro durante a simulação: {e}")
-
+                continue
+            if not isinstance(data, dict):
+                continue
+            acao = data.get("action")
+            if acao == "hello" and aceita_binario(data):
+                # Tabelas uma vez por conexão; depois, turnos em quadros binários
+                binario = True
+                fila.colocar(mensagem_tabelas())
+            if acao == "subscribe" or (acao is None and "token" in data):
+                autorizados = ler_acesso(data.get("ticket") or data.get("token"))
+                for canal in autorizados:
+                    canais.assinar(fila, canal)
+                fila.colocar(_json("subscribed", canais=autorizados))
+            if acao == "ranking_sync" and CANAL_RANKING in canais.assinaturas.get(fila, ()):
+                mensagem = placar.desde(data.get("epoca"), data.get("versao"))
+                if mensagem is not None:
+                    fila.colocar(json.dumps(mensagem, ensure_ascii=False), chave="ranking")
+            if acao in ("start_trip", "resume_trip", "stop_trip") and transmissao is not None:
+                transmissao.cancel()
+                transmissao = None
+            if acao in ("start_trip", "resume_trip"):
+                transmissao = asyncio.create_task(transmitir_viagem(
+                    fila, data.get("ticket"), retomar=acao == "resume_trip", desde=data.get("desde"),
+                    ritmo=data.get("pace"), binario=binario
+                ))
+            if acao == "set_pace" and not definir_ritmo(data.get("ticket"), data.get("pace")):
+                fila.colocar(_json("error", erro="No voyage in progress for this ticket"))
+    except websockets.ConnectionClosed:
+        pass
     finally:
+        if transmissao is not None:
+            transmissao.cancel()
+        canais.cancelar(fila)
+        fila.fechar()
+        escritor.cancel()
         # Remove o cliente da lista quando ele se desconectar
-        connected_clients.remove(websocket)
+        connected_clients.discard(websocket)
         logging.info(f"Cliente desconectado: {websocket.remote_address}")
 
-async def main():
-    """Inicia o servidor WebSocket."""
+
+async def servir(db, reutilizar_porta=False):
+    """Atende conexões na porta e acompanha o log de eventos, para sempre."""
     # Usando '0.0.0.0' para garantir que ele aceite conexões
-    async with websockets.serve(handler, "0.0.0.0", 8765):
-        logging.info("Servidor WebSocket iniciado em ws://0.0.0.0:8765")
-        await asyncio.Future()  # Mantém o servidor rodando para sempre
+    async with websockets.serve(
+        handler, "0.0.0.0", PORTA, process_request=responder_metricas, reuse_port=reutilizar_porta
+    ):
+        logging.info(f"Servidor WebSocket iniciado em ws://0.0.0.0:{PORTA}" + (
+            f" (processo {TRABALHADOR})" if TRABALHADOR is not None else ""
+        ))
+        await acompanhar_eventos(db)
+
+
+async def trabalhador(db):
+    """Processo subordinado: liga os canais ao hub e atende na porta compartilhada."""
+    broker = await ClienteBroker(ENDERECO_BROKER, receber_do_hub).conectar()
+    canais.ponte = broker.enviar
+    recepcao = asyncio.create_task(broker.receber())
+    # Quem sobe por último acerta a classificação (e a época) entre os processos
+    if CALCULA_RANKING:
+        publicar_placar()
+    else:
+        canais.publicar({"type": "ranking_pedido"}, CANAL_PLACAR, propagar=True)
+    try:
+        await servir(db, reutilizar_porta=True)
+    finally:
+        recepcao.cancel()
+
+
+async def supervisor(quantidade):
+    """Sobe o hub e `quantidade` processos; se um deles termina, encerra todos."""
+    hub = await HubCanais(ENDERECO_BROKER).iniciar()
+    processos = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            env={**os.environ, "WS_WORKER_ID": str(i), "WS_BROKER": ENDERECO_BROKER},
+        )
+        for i in range(quantidade)
+    ]
+    logging.info(f"Supervisor: {quantidade} processos na porta {PORTA}, hub em {ENDERECO_BROKER}")
+    try:
+        while all(p.poll() is None for p in processos):
+            await asyncio.sleep(0.5)
+        logging.error("Um processo do servidor WebSocket terminou; encerrando os demais")
+    finally:
+        for p in processos:
+            if p.poll() is None:
+                p.terminate()
+        for p in processos:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        await hub.fechar()
+
+
+async def main():
+    """Inicia o servidor WebSocket (um processo, ou supervisor de vários)."""
+    from services.db import db_manager
+    if TRABALHADOR is not None:
+        await trabalhador(db_manager)
+    elif TRABALHADORES > 1 and hasattr(socket, "SO_REUSEPORT"):
+        await supervisor(TRABALHADORES)
+    else:
+        if TRABALHADORES > 1:
+            logging.warning("SO_REUSEPORT indisponível nesta plataforma; rodando um único processo")
+        await servir(db_manager)  # Mantém o servidor rodando para sempre
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())